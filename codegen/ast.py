@@ -13,22 +13,42 @@ class Parameter:
 
 
 class FunctionNotifDef:
-	def __init__(self, name, params):
+	def __init__(self, name, params, priority=None):
 		self.name = name
 		self.params = params
+		self.priority = priority
 
 
 class FunctionEvalDef:
-	def __init__(self, name, params, returns):
+	def __init__(self, name, params, returns, priority=None):
+		self.name = name
+		self.params = params
+		self.returns = returns
+		self.priority = priority
+
+
+class FunctionStreamDef:
+	def __init__(self, name, params, items, priority=None):
+		self.name = name
+		self.params = params
+		self.items = items
+		self.priority = priority
+
+
+class FunctionUploadDef:
+	def __init__(self, name, params, items, returns, priority=None):
 		self.name = name
 		self.params = params
+		self.items = items
 		self.returns = returns
+		self.priority = priority
 
 
 class ClassDef:
-	def __init__(self, name, methodList):
+	def __init__(self, name, methodList, priority=None):
 		self.name = name
 		self.methodList = methodList
+		self.priority = priority
 
 
 class ExceptionDef:
@@ -43,9 +63,10 @@ class NameReference:
 
 
 class ServiceDef:
-	def __init__(self, name, ifaceList):
+	def __init__(self, name, ifaceList, priority=None):
 		self.name = name
 		self.ifaceList = ifaceList
+		self.priority = priority
 
 
 class TypeDef:
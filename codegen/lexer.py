@@ -65,7 +65,7 @@ class RipleyLexer(object):
 	# Token specification.
 	##
 	
-	keywords = ("CLASS","SERVICE","EXCEPTION", "TYPE")
+	keywords = ("CLASS","SERVICE","EXCEPTION", "TYPE", "STREAM", "PRIORITY")
 	keywordMap = {}
 	for r in keywords:
 		keywordMap[r.lower()] = r
@@ -176,7 +176,7 @@ class RipleyParser(object, metaclass = MetaParser):
 	# Parse unit specification
 	##
 	
-	rulesWithOpt = ["params"]
+	rulesWithOpt = ["params", "priority"]
 	
 	rulesWithList = {"interface" : None,
 	                 "method" : None,
@@ -214,11 +214,24 @@ class RipleyParser(object, metaclass = MetaParser):
 		p[0] = p[1]
 	
 	def p_function_def(self, p):
-		""" function_def : ID params RARROW params
+		""" function_def : function_sig priority_opt
+		"""
+		p[0] = p[1]
+		p[0].priority = p[2]
+	
+	def p_function_sig(self, p):
+		""" function_sig : ID params RARROW params
+		                 | ID params RARROW STREAM params
+		                 | ID params LARROW STREAM params RARROW params
 		                 | ID params
 		"""
 		if len(p) == 5:
 			p[0] = FunctionEvalDef(name=p[1], params=p[2], returns=p[4])
+		elif len(p) == 6:
+			p[0] = FunctionStreamDef(name=p[1], params=p[2], items=p[5])
+		elif len(p) == 8:
+			p[0] = FunctionUploadDef(name=p[1], params=p[2], items=p[5],
+			                         returns=p[7])
 		else:
 			p[0] = FunctionNotifDef(name=p[1], params=p[2])
 	
@@ -232,6 +245,11 @@ class RipleyParser(object, metaclass = MetaParser):
 		"""
 		p[0] = ExceptionDef(name=p[2], params=p[3])
 	
+	def p_priority(self, p):
+		""" priority : PRIORITY ID
+		"""
+		p[0] = p[2]
+	
 	def p_params(self, p):
 		""" params : LPAREN param_list RPAREN
 		           | LPAREN RPAREN
@@ -251,9 +269,9 @@ class RipleyParser(object, metaclass = MetaParser):
 			p[0] = Parameter(type=p[1])
 	
 	def p_class_def(self, p):
-		""" class_def : CLASS TYPEID LBRACE method_list RBRACE
+		""" class_def : CLASS TYPEID priority_opt LBRACE method_list RBRACE
 		"""
-		p[0] = ClassDef(name=p[2], methodList=p[4])
+		p[0] = ClassDef(name=p[2], methodList=p[5], priority=p[3])
 	
 	def p_method(self, p):
 		""" method : function_def
@@ -261,9 +279,9 @@ class RipleyParser(object, metaclass = MetaParser):
 		p[0] = p[1]
 	
 	def p_service_def(self, p):
-		""" service_def : SERVICE TYPEID LBRACE serviced_list RBRACE
+		""" service_def : SERVICE TYPEID priority_opt LBRACE serviced_list RBRACE
 		"""
-		p[0] = ServiceDef(name=p[2], ifaceList=p[4])
+		p[0] = ServiceDef(name=p[2], ifaceList=p[5], priority=p[3])
 	
 	def p_serviced(self, p):
 		""" serviced : thing_ref
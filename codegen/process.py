@@ -14,6 +14,13 @@ from scope import *
 # Exports
 __all__ = ["Processed"]
 
+# Parse nodes which define a function of some kind
+functionDefs = (FunctionNotifDef, FunctionEvalDef, FunctionStreamDef,
+                FunctionUploadDef)
+
+# Priority classes in which a function may be sent
+priorities = ("control", "normal", "bulk")
+
 class Processed:
 	def __init__(self, ast, typeBaseMap, AbstractCompiler, ObjectCompiler,
 		               ExceptionCompiler):
@@ -46,19 +53,19 @@ def processRoot(ast, typeBaseMap, AbstractCompiler, ObjectCompiler,
 			abstractTypes.append(newType)
 		
 		elif isinstance(node, ClassDef):
-			newType = processClass(node.name, node.methodList, rootScope,
-			                       ObjectCompiler)
+			newType = processClass(node.name, node.methodList, node.priority,
+			                       rootScope, ObjectCompiler)
 			rootScope.addType(newType)
 			classTypes.append(newType)
 		
-		elif isinstance(node, (FunctionNotifDef, FunctionEvalDef)):
-			newFunction = functionHelper(node, scope)
+		elif isinstance(node, functionDefs):
+			newFunction = functionHelper(node, rootScope)
 			rootScope.addValue(newFunction)
 			functions.append(newFunction)
 		
 		elif isinstance(node, ServiceDef):
 			service, newFunctions = processService(node.name, node.ifaceList,
-			                                       rootScope)
+			                                       node.priority, rootScope)
 			services.append(service)
 			functions += newFunctions
 		
@@ -74,12 +81,12 @@ def processRoot(ast, typeBaseMap, AbstractCompiler, ObjectCompiler,
 	return abstractTypes, classTypes, functions, services, exceptions
 
 
-def processService(name, interfaces, scope):
+def processService(name, interfaces, priority, scope):
 	functionList = []
 	memberList = []
 	for interface in interfaces:
-		if isinstance(interface, (FunctionNotifDef,FunctionEvalDef)):
-			newFunction = functionHelper(interface, scope)
+		if isinstance(interface, functionDefs):
+			newFunction = functionHelper(interface, scope, priority)
 			functionList.append(newFunction)
 			memberList.append(newFunction)
 		elif isinstance(interface, NameReference):
@@ -98,13 +105,29 @@ def processService(name, interfaces, scope):
 	return ServiceType(name, memberList), functionList
 
 
-def functionHelper(node, scope):
+def functionHelper(node, scope, priority = None):
+	""" Process a function, which is sent in the priority class given for it,
+	    or else in that of the class or service defining it.
+	"""
 	if isinstance(node, FunctionNotifDef):
-		return processNotification(node.name, node.params, scope)
+		function = processNotification(node.name, node.params, scope)
 	elif isinstance(node, FunctionEvalDef):
-		return processEvaluation(node.name, node.params, node.returns, scope)
+		function = processEvaluation(node.name, node.params, node.returns,
+		                             scope)
+	elif isinstance(node, FunctionStreamDef):
+		function = processStream(node.name, node.params, node.items, scope)
+	elif isinstance(node, FunctionUploadDef):
+		function = processUpload(node.name, node.params, node.items,
+		                         node.returns, scope)
 	else:
 		raise(KeyError)
+	
+	if node.priority is not None:
+		priority = node.priority
+	if priority is not None and priority not in priorities:
+		raise(Exception("Priority %s was not recognized"%priority))
+	function.priority = priority
+	return function
 
 
 def processException(name, params, scope, ExceptionCompiler):
@@ -113,11 +136,11 @@ def processException(name, params, scope, ExceptionCompiler):
 	return ExceptionType(name, ExceptionCompiler(name), paramList)
 
 
-def processClass(name, methods, scope, ObjectCompiler):
+def processClass(name, methods, priority, scope, ObjectCompiler):
 	methodList = []
 	
 	for method in methods:
-		methodList.append(functionHelper(method, scope))
+		methodList.append(functionHelper(method, scope, priority))
 	
 	return ClassType(name, ObjectCompiler(name), methodList)
 
@@ -135,6 +158,21 @@ def processNotification(name, params, scope):
 	return Notification(name, paramList)
 
 
+def processStream(name, params, items, scope):
+	paramList = processParList(params, scope)
+	itemList = processParList(items, scope)
+	
+	return Stream(name, paramList, itemList)
+
+
+def processUpload(name, params, items, returns, scope):
+	paramList = processParList(params, scope)
+	itemList = processParList(items, scope)
+	returnList = processParList(returns, scope)
+	
+	return Upload(name, paramList, itemList, returnList)
+
+
 def processParList(params, scope):
 	paramList = []
 	for param in params:
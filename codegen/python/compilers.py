@@ -1,5 +1,11 @@
+fixedWidthTypes = [
+	"Int8",  "Int16",  "Int32",  "Int64",
+	"UInt8", "UInt16", "UInt32", "UInt64"
+]
+
+
 class PyCompiler:
-	pass
+	fixedWidth = False
 
 
 class ObjectCompiler(PyCompiler):
@@ -26,6 +32,7 @@ class BasicCompiler(PyCompiler):
 	"""
 	def __init__(self, name, complexType = False):
 		self.parName = name
+		self.fixedWidth = name in fixedWidthTypes
 		if complexType:
 			self.deserial = "%s = %s.deserialize(cxn, inStream)\n" % ("%s", name)
 			self.serial = "%s.serialize(%s, cxn, outStream)\n" % (name, "%s")
@@ -45,4 +52,56 @@ class BasicCompilerImplicitSerial(BasicCompiler):
 		return ""
 
 
+def groupPackedRuns(params):
+	""" Split a parameter list into runs for marshalling.
+	
+	    Returns a list of groups, each a list of (index, type) pairs. Runs of
+	    consecutive fixed-width types are collected into a single group, so
+	    that they can be marshalled through one PackedRun. All other types sit
+	    in a group of their own.
+	"""
+	groups = []
+	for idx, (_, parType) in enumerate(params):
+		if (parType.compiler.fixedWidth and groups
+		 and groups[-1][0][1].compiler.fixedWidth):
+			groups[-1].append((idx, parType))
+		else:
+			groups.append([(idx, parType)])
+	return groups
+
+
+def declarePackedRuns(substring, prefix, groups):
+	""" Declare a PackedRun class member for each multi-value group.
+	
+	    The declarations are appended to substring. A map from the index of
+	    the first value in each packed group to the name of its PackedRun is
+	    returned.
+	"""
+	packed = {}
+	for group in groups:
+		if len(group) > 1:
+			name = "%s%d" % (prefix, len(packed))
+			substring.append(outputPackedDeclaration("\t", name, group))
+			packed[group[0][0]] = name
+	return packed
 
+
+def outputPackedDeclaration(indent, name, group):
+	""" Output the class-level PackedRun definition for a group.
+	"""
+	types = ", ".join(parType.name for _, parType in group)
+	return indent + "%s = PackedRun(%s)\n" % (name, types)
+
+
+def outputPackedSerial(indent, name, group, nameFormat):
+	""" Output the single pack call for a group of fixed-width values.
+	"""
+	values = ", ".join(nameFormat % idx for idx, _ in group)
+	return indent + "self.%s.serialize((%s), outStream)\n" % (name, values)
+
+
+def outputPackedDeserial(indent, name, group, nameFormat):
+	""" Output the single unpack call for a group of fixed-width values.
+	"""
+	values = ", ".join(nameFormat % idx for idx, _ in group)
+	return indent + "%s = self.%s.deserialize(inStream)\n" % (values, name)
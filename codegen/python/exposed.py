@@ -1,4 +1,5 @@
 from scope import *
+from .compilers import *
 
 def outputExposedClass(classdef, oHandle):
 	""" Output python code for an exposed transverse class definition.
@@ -46,10 +47,12 @@ def formatExposedCall(method, post = "", indent = "", owner = None):
 	"""
 	isConstructor = False
 	hasInstanceArgument = False
+	isStream = isinstance(method, Stream)
+	isUpload = isinstance(method, Upload)
 	returnValues = -1
 	
 	# Determine properties of this function call definition.
-	if isinstance(method, Evaluation):
+	if isinstance(method, (Evaluation, Upload)):
 		returnValues = len(method.returns)
 	if owner is not None:
 		if method.name == "constructor":
@@ -63,11 +66,30 @@ def formatExposedCall(method, post = "", indent = "", owner = None):
 	          "%s\ttransverseID = b\"%s\"\n")
 	pars = [indent, method.name + post, indent, method.transverseID]
 	
-	# outStream is provided for Evaluation targets or constructors
-	if returnValues > -1:
-		substring = ["\tdef __call__(self, cxn, inStream, outStream):\n"]
+	# Replies are sent in the priority class of the call.
+	substring = []
+	if method.priority is not None:
+		substring.append("\tpriority = PRIORITY_%s\n"%method.priority.upper())
+	
+	# Consecutive fixed-width values are marshalled through PackedRuns.
+	argGroups = groupPackedRuns(method.params)
+	argPacked = declarePackedRuns(substring, "argPack", argGroups)
+	if returnValues > 0 and not isConstructor:
+		retGroups = groupPackedRuns(method.returns)
+		retPacked = declarePackedRuns(substring, "retPack", retGroups)
+	if isStream or isUpload:
+		itemGroups = groupPackedRuns(method.items)
+		itemPacked = declarePackedRuns(substring, "itemPack", itemGroups)
+	
+	# outStream is provided for Evaluation targets or constructors, and the
+	# ItemStream of the items for uploads.
+	if isUpload:
+		substring.append("\tdef __call__(self, cxn, inStream, items, "
+		                 "outStream):\n")
+	elif returnValues > -1:
+		substring.append("\tdef __call__(self, cxn, inStream, outStream):\n")
 	else:
-		substring = ["\tdef __call__(self, cxn, inStream):\n"]
+		substring.append("\tdef __call__(self, cxn, inStream):\n")
 	
 	caller = [] # Storage for argument marshalling
 	
@@ -78,36 +100,97 @@ def formatExposedCall(method, post = "", indent = "", owner = None):
 		caller.append("__self__")
 	
 	# Marshall the rest of the arguments.
-	for idx,(_,parType) in enumerate(method.params):
-		argStr = "arg%d"%idx
-		substring.append(parType.compiler.outputDeserial("\t\t",argStr))
-		caller.append(argStr)
+	for group in argGroups:
+		if group[0][0] in argPacked:
+			name = argPacked[group[0][0]]
+			substring.append(outputPackedDeserial("\t\t", name, group, "arg%d"))
+		else:
+			idx, parType = group[0]
+			argStr = "arg%d"%idx
+			substring.append(parType.compiler.outputDeserial("\t\t",argStr))
+		caller += ["arg%d"%idx for idx, _ in group]
+	
+	# The items of an upload follow the arguments.
+	if isUpload:
+		caller.append("items")
+	
+	# A stream returns the iterable of its items, which are serialized, one
+	# by one, through serializeItem.
+	if isStream:
+		argStr = ", ".join(caller)
+		substring.append("\t\treturn self.call(%s)\n"%argStr)
+		substring.append("\tdef serializeItem(self, cxn, item, outStream):\n")
+		itemStr = ", ".join("item%d"%idx for idx in range(len(method.items)))
+		if itemStr:
+			substring.append("\t\t%s = item\n"%itemStr)
+		else:
+			substring.append("\t\tpass\n")
+		for group in itemGroups:
+			if group[0][0] in itemPacked:
+				name = itemPacked[group[0][0]]
+				substring.append(outputPackedSerial("\t\t", name, group,
+				                                    "item%d"))
+			else:
+				idx, parType = group[0]
+				itemStr = "item%d"%idx
+				substring.append(parType.compiler.outputSerial("\t\t",
+				                                               itemStr))
 	
 	# Constructor returns an instance objects.
-	if isConstructor:
+	elif isConstructor:
 		argStr = ", ".join(caller)
 		substring.append("\t\t__self__ = self.call(%s)\n")
 		substring.append("\t\tcxn.serializeObject(__self__, outStream)\n")
 		pars.append(argStr)
 	
-	# Evaluation with actual return parameters returns those values.
+	# Evaluation with actual return parameters returns those values, once the
+	# implementation has them, through serializeReturn.
 	elif returnValues > 0:
 		retter = []
 		for idx,(_,parType) in enumerate(method.returns):
 			retter.append("ret%d"%idx)
 		retStr = ", ".join(retter)
 		argStr = ", ".join(caller)
-		substring.append("\t\t%s = self.call(%s)\n"%(retStr,argStr))
-		for idx,(_,parType) in enumerate(method.returns):
-			retStr = "ret%d"%idx
-			substring.append(parType.compiler.outputSerial("\t\t", retStr))
-	
-	# Notifications and nul-return evaluations do not return anything.
+		substring.append("\t\treturn self.complete(self.call(%s), cxn, "
+		                 "outStream)\n"%argStr)
+		substring.append("\tdef serializeReturn(self, cxn, ret, outStream):\n")
+		substring.append("\t\t%s = ret\n"%retStr)
+		for group in retGroups:
+			if group[0][0] in retPacked:
+				name = retPacked[group[0][0]]
+				substring.append(outputPackedSerial("\t\t", name, group,
+				                                    "ret%d"))
+			else:
+				idx, parType = group[0]
+				retStr = "ret%d"%idx
+				substring.append(parType.compiler.outputSerial("\t\t", retStr))
+	
+	# Notifications and nul-return evaluations do not return anything, but
+	# may still complete asynchronously.
 	else:
 		argStr = ", ".join(caller)
-		substring.append("\t\tself.call(%s)\n")
+		outName = "outStream" if returnValues > -1 else "None"
+		substring.append("\t\treturn self.complete(self.call(%s), cxn, "
+		                 + outName + ")\n")
 		pars.append(argStr)
 	
+	# Each item of an upload is deserialized on its own, as it arrives.
+	if isUpload:
+		substring.append("\tdef deserializeItem(self, cxn, inStream):\n")
+		itemter = []
+		for group in itemGroups:
+			if group[0][0] in itemPacked:
+				name = itemPacked[group[0][0]]
+				substring.append(outputPackedDeserial("\t\t", name, group,
+				                                      "item%d"))
+			else:
+				idx, parType = group[0]
+				itemStr = "item%d"%idx
+				substring.append(parType.compiler.outputDeserial("\t\t",
+				                                                 itemStr))
+			itemter += ["item%d"%idx for idx, _ in group]
+		substring.append("\t\treturn %s\n"%", ".join(itemter))
+	
 	# Build complete string and return it.
 	string += indent + indent.join(substring) + "\t\n"
 	return string, pars
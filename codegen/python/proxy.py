@@ -1,4 +1,5 @@
 from scope import *
+from .compilers import *
 
 def outputProxyClass(classdef, oHandle):
 	if hasConstructor(classdef):
@@ -64,31 +65,104 @@ def formatProxyCall(method, post = "", indent = "\t", isMethod = True):
 		
 	if isinstance(method, Notification):
 		substring = ["class %s%s(%sNotificationProxy):\n"]
+	elif isinstance(method, Stream):
+		substring = ["class %s%s(%sStreamProxy):\n"]
+	elif isinstance(method, Upload):
+		substring = ["class %s%s(%sUploadProxy):\n"]
 	else:
 		substring = ["class %s%s(%sEvaluationProxy):\n"]
 	pars = [method.name, post, former]
+	if method.priority is not None:
+		substring.append("\tpriority = PRIORITY_%s\n"%method.priority.upper())
+	hasReturns = isinstance(method, (Evaluation, Upload))
 	
-	substring.append("\t@staticmethod\n")
-	substring.append("\tdef serializeArguments(cxn, %sargs, outStream):\n")
+	# Consecutive fixed-width values are marshalled through PackedRuns, held
+	# as class members, so the marshalling methods need the proxy instance.
+	argGroups = groupPackedRuns(method.params)
+	argPacked = declarePackedRuns(substring, "argPack", argGroups)
+	if hasReturns:
+		retGroups = groupPackedRuns(method.returns)
+		retPacked = declarePackedRuns(substring, "retPack", retGroups)
+	if isinstance(method, (Stream, Upload)):
+		itemGroups = groupPackedRuns(method.items)
+		itemPacked = declarePackedRuns(substring, "itemPack", itemGroups)
+	
+	if argPacked:
+		substring.append("\tdef serializeArguments(self, cxn, %sargs, "
+		                 "outStream):\n")
+	else:
+		substring.append("\t@staticmethod\n")
+		substring.append("\tdef serializeArguments(cxn, %sargs, outStream):\n")
 	pars.append(instArg)
 	if isMethod:
 		substring.append("\t\tReference.serialize(inst.reference, outStream)\n")
 	inner = []
-	for idx,(_,parType) in enumerate(method.params):
-		argStr = "args[%d]"%idx
-		inner.append(parType.compiler.outputSerial("\t\t", argStr))
+	for group in argGroups:
+		if group[0][0] in argPacked:
+			name = argPacked[group[0][0]]
+			inner.append(outputPackedSerial("\t\t", name, group, "args[%d]"))
+		else:
+			idx, parType = group[0]
+			argStr = "args[%d]"%idx
+			inner.append(parType.compiler.outputSerial("\t\t", argStr))
 	if (inner == [""] or inner == []) and not isMethod:
 		inner = ["\t\tpass\n"]
 	substring += inner
 	
-	if isinstance(method, Evaluation):
-		substring.append("\t@staticmethod\n")
-		substring.append("\tdef deserializeReturn(cxn, inStream):\n")
-		retter = []
-		for idx,(_,parType) in enumerate(method.returns):
-			argStr = "ret%d"%idx
-			substring.append(parType.compiler.outputDeserial("\t\t",argStr))
-			retter.append(argStr)
-		substring.append("\t\treturn %s\n")
-		pars.append(", ".join(retter))
+	# Each item of an upload is serialized on its own, as it is sent.
+	if isinstance(method, Upload):
+		if itemPacked:
+			substring.append("\tdef serializeItem(self, cxn, item, "
+			                 "outStream):\n")
+		else:
+			substring.append("\t@staticmethod\n")
+			substring.append("\tdef serializeItem(cxn, item, outStream):\n")
+		itemFormat = "item" if len(method.items) == 1 else "item[%d]"
+		inner = []
+		for group in itemGroups:
+			if group[0][0] in itemPacked:
+				name = itemPacked[group[0][0]]
+				inner.append(outputPackedSerial("\t\t", name, group,
+				                                itemFormat))
+			else:
+				idx, parType = group[0]
+				itemStr = itemFormat.replace("%d", str(idx))
+				inner.append(parType.compiler.outputSerial("\t\t", itemStr))
+		if inner == [""] or inner == []:
+			inner = ["\t\tpass\n"]
+		substring += inner
+	
+	if hasReturns:
+		formatDeserializer(substring, pars, "deserializeReturn", "ret",
+		                   retGroups, retPacked)
+	
+	# Each item of a stream is deserialized on its own, as it arrives.
+	if isinstance(method, Stream):
+		formatDeserializer(substring, pars, "deserializeItem", "item",
+		                   itemGroups, itemPacked)
 	return indent + indent.join(substring), pars
+
+
+def formatDeserializer(substring, pars, methodName, prefix, groups, packed):
+	""" Output a method that deserializes a list of values and returns them.
+	"""
+	if packed:
+		substring.append("\tdef %s(self, cxn, inStream):\n"%methodName)
+	else:
+		substring.append("\t@staticmethod\n")
+		substring.append("\tdef %s(cxn, inStream):\n"%methodName)
+	retter = []
+	nameFormat = prefix + "%d"
+	for group in groups:
+		if group[0][0] in packed:
+			name = packed[group[0][0]]
+			substring.append(outputPackedDeserial("\t\t", name, group,
+			                                      nameFormat))
+		else:
+			idx, parType = group[0]
+			argStr = nameFormat%idx
+			substring.append(parType.compiler.outputDeserial("\t\t", argStr))
+		retter += [nameFormat%idx for idx, _ in group]
+	substring.append("\t\treturn %s\n")
+	pars.append(", ".join(retter))
+
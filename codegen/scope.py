@@ -2,7 +2,8 @@ from zlib import crc32
 
 __all__ = ["ParseScope", "BasicType", "ComplexType", "AbstractType",
            "ClassType", "ServiceType", "ExceptionType",
-           "Evaluation", "Notification", "Function", "hasConstructor"]
+           "Evaluation", "Notification", "Stream", "Upload", "Function",
+           "hasConstructor"]
 
 """
 class NameSuffix:
@@ -70,7 +71,8 @@ class Value:
 
 
 class Function(Value):
-	pass
+	# The priority class of the function, or None for the default
+	priority = None
 
 
 class Evaluation(Function):
@@ -86,6 +88,21 @@ class Notification(Function):
 		self.params = params
 
 
+class Stream(Function):
+	def __init__(self, name, params, items):
+		super().__init__(name)
+		self.params = params
+		self.items = items
+
+
+class Upload(Function):
+	def __init__(self, name, params, items, returns):
+		super().__init__(name)
+		self.params = params
+		self.items = items
+		self.returns = returns
+
+
 class ParseScope:
 	def __init__(self, parents = None, typeBaseMap = None):
 		if parents is None:
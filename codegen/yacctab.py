@@ -1,13 +1,14 @@
 
-# /home/disnesquick/Ripley/codegen/yacctab.py
+# yacctab.py
 # This file is automatically generated. Do not edit.
-_tabversion = '3.5'
+# pylint: disable=W,C,R
+_tabversion = '3.10'
 
 _lr_method = 'LALR'
 
-_lr_signature = '7EEB404CD431F4A046DD4A4297CEE143'
+_lr_signature = 'baseCLASS COLON COMMA EXCEPTION ID LARROW LBRACE LPAREN PRIORITY RARROW RBRACE RPAREN SEMI SERVICE STREAM TYPE TYPEIDparams_opt : empty\n| paramspriority_opt : empty\n| priorityinterface_list : interface_list  interface\n| interfacemethod_list : method_list  method\n| methodparam_list : param_list COMMA param\n| paramserviced_list : serviced_list  serviced\n| serviced empty :  base : interface_list\n\t\t         | empty\n\t\t interface : service_def\n\t\t              | class_def\n\t\t              | function_def\n\t\t              | exception_def\n\t\t              | type_def\n\t\t function_def : function_sig priority_opt\n\t\t function_sig : ID params RARROW params\n\t\t                 | ID params RARROW STREAM params\n\t\t                 | ID params LARROW STREAM params RARROW params\n\t\t                 | ID params\n\t\t type_def : TYPE TYPEID\n\t\t exception_def : EXCEPTION TYPEID params \n\t\t priority : PRIORITY ID\n\t\t params : LPAREN param_list RPAREN\n\t\t           | LPAREN RPAREN\n\t\t param : ID COLON TYPEID\n\t\t          | TYPEID\n\t\t class_def : CLASS TYPEID priority_opt LBRACE method_list RBRACE\n\t\t method : function_def\n\t\t service_def : SERVICE TYPEID priority_opt LBRACE serviced_list RBRACE\n\t\t serviced : thing_ref\n\t\t             | function_def\n\t\t thing_ref : ID\n\t\t              | TYPEID\n\t\t'
     
-_lr_action_items = {'TYPEID':([2,4,8,14,17,18,25,30,34,35,36,37,38,39,40,41,42,43,49,],[15,16,20,21,24,-20,-24,38,24,-23,47,-19,-33,-31,38,-10,-32,-30,-9,]),'CLASS':([0,1,6,7,9,10,11,12,16,18,19,25,29,35,37,44,48,],[2,-16,-14,2,-18,-15,-4,-17,-21,-20,-3,-24,-22,-23,-19,-27,-29,]),'RBRACE':([18,25,31,32,33,35,37,38,39,40,41,42,43,45,49,],[-20,-24,44,-28,-6,-23,-19,-33,-31,48,-10,-32,-30,-5,-9,]),'RARROW':([18,25,35,],[28,-24,-23,]),'COMMA':([23,24,26,46,47,],[-8,-26,34,-7,-25,]),'TYPE':([0,1,6,7,9,10,11,12,16,18,19,25,29,35,37,44,48,],[4,-16,-14,4,-18,-15,-4,-17,-21,-20,-3,-24,-22,-23,-19,-27,-29,]),'COLON':([27,],[36,]),'EXCEPTION':([0,1,6,7,9,10,11,12,16,18,19,25,29,35,37,44,48,],[8,-16,-14,8,-18,-15,-4,-17,-21,-20,-3,-24,-22,-23,-19,-27,-29,]),'SERVICE':([0,1,6,7,9,10,11,12,16,18,19,25,29,35,37,44,48,],[14,-16,-14,14,-18,-15,-4,-17,-21,-20,-3,-24,-22,-23,-19,-27,-29,]),'LBRACE':([15,21,],[22,30,]),'LPAREN':([5,20,28,42,],[17,17,17,17,]),'$end':([0,1,3,6,7,9,10,11,12,13,16,18,19,25,29,35,37,44,48,],[-11,-16,-13,-14,-12,-18,-15,-4,-17,0,-21,-20,-3,-24,-22,-23,-19,-27,-29,]),'ID':([0,1,6,7,9,10,11,12,16,17,18,19,22,25,29,30,31,32,33,34,35,37,38,39,40,41,42,43,44,45,48,49,],[5,-16,-14,5,-18,-15,-4,-17,-21,27,-20,-3,5,-24,-22,42,5,-28,-6,27,-23,-19,-33,-31,42,-10,-32,-30,-27,-5,-29,-9,]),'RPAREN':([17,23,24,26,46,47,],[25,-8,-26,35,-7,-25,]),}
+_lr_action_items = {'$end':([0,1,2,3,4,5,6,7,8,9,12,16,19,20,21,24,25,29,30,34,40,43,55,59,61,64,],[-13,0,-14,-15,-6,-16,-17,-18,-19,-20,-13,-5,-21,-3,-4,-26,-25,-28,-27,-30,-22,-29,-23,-35,-33,-24,]),'SERVICE':([0,2,4,5,6,7,8,9,12,16,19,20,21,24,25,29,30,34,40,43,55,59,61,64,],[10,10,-6,-16,-17,-18,-19,-20,-13,-5,-21,-3,-4,-26,-25,-28,-27,-30,-22,-29,-23,-35,-33,-24,]),'CLASS':([0,2,4,5,6,7,8,9,12,16,19,20,21,24,25,29,30,34,40,43,55,59,61,64,],[11,11,-6,-16,-17,-18,-19,-20,-13,-5,-21,-3,-4,-26,-25,-28,-27,-30,-22,-29,-23,-35,-33,-24,]),'EXCEPTION':([0,2,4,5,6,7,8,9,12,16,19,20,21,24,25,29,30,34,40,43,55,59,61,64,],[13,13,-6,-16,-17,-18,-19,-20,-13,-5,-21,-3,-4,-26,-25,-28,-27,-30,-22,-29,-23,-35,-33,-24,]),'TYPE':([0,2,4,5,6,7,8,9,12,16,19,20,21,24,25,29,30,34,40,43,55,59,61,64,],[14,14,-6,-16,-17,-18,-19,-20,-13,-5,-21,-3,-4,-26,-25,-28,-27,-30,-22,-29,-23,-35,-33,-24,]),'ID':([0,2,4,5,6,7,8,9,12,16,19,20,21,22,24,25,26,29,30,34,38,39,40,43,44,46,47,48,49,50,51,52,53,54,55,59,60,61,62,64,],[15,15,-6,-16,-17,-18,-19,-20,-13,-5,-21,-3,-4,29,-26,-25,36,-28,-27,-30,51,15,-22,-29,36,-39,51,-12,-36,-37,-38,15,-8,-34,-23,-35,-11,-33,-7,-24,]),'TYPEID':([10,11,12,13,14,19,20,21,25,26,29,34,38,40,43,44,45,46,47,48,49,50,51,55,60,64,],[17,18,-13,23,24,-21,-3,-4,-25,37,-28,-30,46,-22,-29,37,58,-39,46,-12,-36,-37,-38,-23,-11,-24,]),'RBRACE':([12,19,20,21,25,29,34,40,43,46,47,48,49,50,51,52,53,54,55,60,62,64,],[-13,-21,-3,-4,-25,-28,-30,-22,-29,-39,59,-12,-36,-37,-38,61,-8,-34,-23,-11,-7,-24,]),'PRIORITY':([12,17,18,25,34,40,43,55,64,],[22,22,22,-25,-30,-22,-29,-23,-24,]),'LPAREN':([15,23,31,41,42,51,63,],[26,26,26,26,26,26,26,]),'LBRACE':([17,18,20,21,27,28,29,],[-13,-13,-3,-4,38,39,-28,]),'RARROW':([25,34,43,56,],[31,-30,-29,63,]),'LARROW':([25,34,43,],[32,-30,-29,]),'RPAREN':([26,33,35,37,57,58,],[34,43,-10,-32,-9,-31,]),'STREAM':([31,32,],[41,42,]),'COMMA':([33,35,37,57,58,],[44,-10,-32,-9,-31,]),'COLON':([36,],[45,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -16,7 +17,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'function_def':([0,7,22,30,31,40,],[1,1,32,39,32,39,]),'empty':([0,],[3,]),'service_def':([0,7,],[6,6,]),'serviced':([30,40,],[41,49,]),'param':([17,34,],[23,46,]),'method':([22,31,],[33,45,]),'type_def':([0,7,],[9,9,]),'serviced_list':([30,],[40,]),'class_def':([0,7,],[10,10,]),'param_list':([17,],[26,]),'method_list':([22,],[31,]),'interface':([0,7,],[11,19,]),'interface_list':([0,],[7,]),'exception_def':([0,7,],[12,12,]),'base':([0,],[13,]),'thing_ref':([30,40,],[43,43,]),'params':([5,20,28,42,],[18,29,37,18,]),}
+_lr_goto_items = {'base':([0,],[1,]),'interface_list':([0,],[2,]),'empty':([0,12,17,18,],[3,20,20,20,]),'interface':([0,2,],[4,16,]),'service_def':([0,2,],[5,5,]),'class_def':([0,2,],[6,6,]),'function_def':([0,2,38,39,47,52,],[7,7,50,54,50,54,]),'exception_def':([0,2,],[8,8,]),'type_def':([0,2,],[9,9,]),'function_sig':([0,2,38,39,47,52,],[12,12,12,12,12,12,]),'priority_opt':([12,17,18,],[19,27,28,]),'priority':([12,17,18,],[21,21,21,]),'params':([15,23,31,41,42,51,63,],[25,30,40,55,56,25,64,]),'param_list':([26,],[33,]),'param':([26,44,],[35,57,]),'serviced_list':([38,],[47,]),'serviced':([38,47,],[48,60,]),'thing_ref':([38,47,],[49,49,]),'method_list':([39,],[52,]),'method':([39,52,],[53,62,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -28,35 +29,41 @@ _lr_productions = [
   ("S' -> base","S'",1,None,None,None),
   ('params_opt -> empty','params_opt',1,'p_params_opt','parser.py',66),
   ('params_opt -> params','params_opt',1,'p_params_opt','parser.py',67),
-  ('interface_list -> interface_list interface','interface_list',2,'p_interface_list','parser.py',83),
-  ('interface_list -> interface','interface_list',1,'p_interface_list','parser.py',84),
-  ('method_list -> method_list method','method_list',2,'p_method_list','parser.py',83),
-  ('method_list -> method','method_list',1,'p_method_list','parser.py',84),
-  ('param_list -> param_list COMMA param','param_list',3,'p_param_list','parser.py',83),
-  ('param_list -> param','param_list',1,'p_param_list','parser.py',84),
-  ('serviced_list -> serviced_list serviced','serviced_list',2,'p_serviced_list','parser.py',83),
-  ('serviced_list -> serviced','serviced_list',1,'p_serviced_list','parser.py',84),
-  ('empty -> <empty>','empty',0,'p_empty','parser.py',200),
-  ('base -> interface_list','base',1,'p_base','parser.py',204),
-  ('base -> empty','base',1,'p_base','parser.py',205),
-  ('interface -> service_def','interface',1,'p_interface','parser.py',210),
-  ('interface -> class_def','interface',1,'p_interface','parser.py',211),
-  ('interface -> function_def','interface',1,'p_interface','parser.py',212),
-  ('interface -> exception_def','interface',1,'p_interface','parser.py',213),
-  ('interface -> type_def','interface',1,'p_interface','parser.py',214),
-  ('function_def -> ID params RARROW params','function_def',4,'p_function_def','parser.py',219),
-  ('function_def -> ID params','function_def',2,'p_function_def','parser.py',220),
-  ('type_def -> TYPE TYPEID','type_def',2,'p_type_def','parser.py',228),
-  ('exception_def -> EXCEPTION TYPEID params','exception_def',3,'p_exception_def','parser.py',233),
-  ('params -> LPAREN param_list RPAREN','params',3,'p_params','parser.py',238),
-  ('params -> LPAREN RPAREN','params',2,'p_params','parser.py',239),
-  ('param -> ID COLON TYPEID','param',3,'p_param','parser.py',247),
-  ('param -> TYPEID','param',1,'p_param','parser.py',248),
-  ('class_def -> CLASS TYPEID LBRACE method_list RBRACE','class_def',5,'p_class_def','parser.py',256),
-  ('method -> function_def','method',1,'p_method','parser.py',261),
-  ('service_def -> SERVICE TYPEID LBRACE serviced_list RBRACE','service_def',5,'p_service_def','parser.py',266),
-  ('serviced -> thing_ref','serviced',1,'p_serviced','parser.py',271),
-  ('serviced -> function_def','serviced',1,'p_serviced','parser.py',272),
-  ('thing_ref -> ID','thing_ref',1,'p_thing_ref','parser.py',277),
-  ('thing_ref -> TYPEID','thing_ref',1,'p_thing_ref','parser.py',278),
+  ('priority_opt -> empty','priority_opt',1,'p_priority_opt','parser.py',66),
+  ('priority_opt -> priority','priority_opt',1,'p_priority_opt','parser.py',67),
+  ('interface_list -> interface_list interface','interface_list',2,'p_interface_list','parser.py',82),
+  ('interface_list -> interface','interface_list',1,'p_interface_list','parser.py',83),
+  ('method_list -> method_list method','method_list',2,'p_method_list','parser.py',82),
+  ('method_list -> method','method_list',1,'p_method_list','parser.py',83),
+  ('param_list -> param_list COMMA param','param_list',3,'p_param_list','parser.py',82),
+  ('param_list -> param','param_list',1,'p_param_list','parser.py',83),
+  ('serviced_list -> serviced_list serviced','serviced_list',2,'p_serviced_list','parser.py',82),
+  ('serviced_list -> serviced','serviced_list',1,'p_serviced_list','parser.py',83),
+  ('empty -> <empty>','empty',0,'p_empty','parser.py',198),
+  ('base -> interface_list','base',1,'p_base','parser.py',202),
+  ('base -> empty','base',1,'p_base','parser.py',203),
+  ('interface -> service_def','interface',1,'p_interface','parser.py',208),
+  ('interface -> class_def','interface',1,'p_interface','parser.py',209),
+  ('interface -> function_def','interface',1,'p_interface','parser.py',210),
+  ('interface -> exception_def','interface',1,'p_interface','parser.py',211),
+  ('interface -> type_def','interface',1,'p_interface','parser.py',212),
+  ('function_def -> function_sig priority_opt','function_def',2,'p_function_def','parser.py',217),
+  ('function_sig -> ID params RARROW params','function_sig',4,'p_function_sig','parser.py',223),
+  ('function_sig -> ID params RARROW STREAM params','function_sig',5,'p_function_sig','parser.py',224),
+  ('function_sig -> ID params LARROW STREAM params RARROW params','function_sig',7,'p_function_sig','parser.py',225),
+  ('function_sig -> ID params','function_sig',2,'p_function_sig','parser.py',226),
+  ('type_def -> TYPE TYPEID','type_def',2,'p_type_def','parser.py',239),
+  ('exception_def -> EXCEPTION TYPEID params','exception_def',3,'p_exception_def','parser.py',244),
+  ('priority -> PRIORITY ID','priority',2,'p_priority','parser.py',249),
+  ('params -> LPAREN param_list RPAREN','params',3,'p_params','parser.py',254),
+  ('params -> LPAREN RPAREN','params',2,'p_params','parser.py',255),
+  ('param -> ID COLON TYPEID','param',3,'p_param','parser.py',263),
+  ('param -> TYPEID','param',1,'p_param','parser.py',264),
+  ('class_def -> CLASS TYPEID priority_opt LBRACE method_list RBRACE','class_def',6,'p_class_def','parser.py',272),
+  ('method -> function_def','method',1,'p_method','parser.py',277),
+  ('service_def -> SERVICE TYPEID priority_opt LBRACE serviced_list RBRACE','service_def',6,'p_service_def','parser.py',282),
+  ('serviced -> thing_ref','serviced',1,'p_serviced','parser.py',287),
+  ('serviced -> function_def','serviced',1,'p_serviced','parser.py',288),
+  ('thing_ref -> ID','thing_ref',1,'p_thing_ref','parser.py',293),
+  ('thing_ref -> TYPEID','thing_ref',1,'p_thing_ref','parser.py',294),
 ]
@@ -2,5 +2,8 @@ from .serialize  import *
 #from .errors     import *
 from .core_impl   import BusMaster
 from .service     import Service
+from .executor    import ThreadExecutor, ProcessExecutor
+from .stream      import ItemStream, EndOfStream
+from .batch       import Batch, BatchCallError
 from .           import bus
 from .           import transport
@@ -0,0 +1,120 @@
+""" Module: aio
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file implements the scheduling primitives of the Ripley runtime on
+    top of the standard asyncio event loop. It is selected through the
+    `backend' module and should not be imported directly.
+
+    The blocking form of `await' can only be provided when the event loop is
+    not already running, in which case the loop is run until the awaited
+    Future completes. Code running inside the loop must instead use the
+    coroutine (.coro) or Future (.async) forms of remote calls.
+"""
+
+# System imports
+import asyncio
+
+# Exports
+__all__ = ["Future", "callSoon", "threadsafeScheduler", "RecurringEvent",
+           "async", "await", "asynchronous", "sleep", "wrapFutureErrors",
+           "cancel", "whenCancelled", "CancelledError", "StreamClosed"]
+
+
+class StreamClosed(Exception):
+	""" Raised when reading from, or writing to, a closed stream.
+	"""
+
+
+class Future(asyncio.Future):
+	""" An asyncio Future with the callback interface used by Ripley.
+	"""
+	def setResult(self, result):
+		if not self.done():
+			self.set_result(result)
+	
+	def setError(self, error):
+		if not self.done():
+			self.set_exception(error)
+	
+	setResultFast = setResult
+
+
+class RecurringEvent:
+	""" Calls func every interval seconds, once begun, until ended.
+	"""
+	def __init__(self, interval, func):
+		self.interval = interval
+		self.func = func
+		self.handle = None
+	
+	def begin(self):
+		loop = asyncio.get_event_loop()
+		self.handle = loop.call_later(self.interval, self.fire)
+	
+	def end(self):
+		if self.handle is not None:
+			self.handle.cancel()
+			self.handle = None
+	
+	def fire(self):
+		self.begin()
+		self.func()
+
+
+asynchronous = asyncio.coroutine
+sleep = asyncio.sleep
+CancelledError = asyncio.CancelledError
+
+
+def callSoon(func, *args):
+	return asyncio.get_event_loop().call_soon(func, *args)
+
+
+def threadsafeScheduler():
+	""" Return a callSoon that any thread may use to reach this loop.
+	
+	    This must be called on the thread running the event loop.
+	"""
+	return asyncio.get_event_loop().call_soon_threadsafe
+
+
+def async(coro):
+	return asyncio.ensure_future(coro)
+
+
+def await(awaitable):
+	""" Block until awaitable completes and return its result.
+	
+	    This is only possible when the event loop is not already running.
+	"""
+	loop = asyncio.get_event_loop()
+	if loop.is_running():
+		raise(RuntimeError("Cannot block inside a running asyncio loop; use "
+		                   "the coroutine or Future form of the call"))
+	return loop.run_until_complete(awaitable)
+
+
+def wrapFutureErrors(handler, fut):
+	""" Pass any exception raised by fut on to handler.
+	"""
+	def done(fut):
+		if not fut.cancelled() and fut.exception() is not None:
+			handler(fut.exception())
+	fut.add_done_callback(done)
+	return fut
+
+
+def cancel(fut):
+	""" Cancel fut, and the coroutine behind it if it is a Task.
+	"""
+	fut.cancel()
+
+
+def whenCancelled(fut, callback):
+	""" Call callback, with no arguments, if fut is cancelled.
+	"""
+	def done(fut):
+		if fut.cancelled():
+			callback()
+	fut.add_done_callback(done)
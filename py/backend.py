@@ -0,0 +1,104 @@
+""" Module: backend
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file selects the event-loop backend used by the Ripley runtime. The
+    default backend is the unstuck library. Setting the environment variable
+    RIPLEY_BACKEND to "asyncio", before ripley is first imported, selects the
+    standard asyncio event loop instead (see the `aio' module). Either way,
+    the same scheduling primitives are exported from here, so generated
+    service code is unaffected by the choice.
+"""
+
+# System imports
+import os
+
+# Exports
+__all__ = ["backendName", "Future", "callSoon", "threadsafeScheduler",
+           "RecurringEvent", "async", "await", "asynchronous", "sleep",
+           "wrapFutureErrors", "cancel", "whenCancelled", "CancelledError",
+           "StreamClosed"]
+
+backendName = os.environ.get("RIPLEY_BACKEND", "unstuck").lower()
+
+if backendName == "asyncio":
+	from .aio import *
+elif backendName == "unstuck":
+	from unstuck         import *
+	from unstuck.streams import StreamClosed
+	
+	import collections
+	import threading
+	
+	class ThreadsafeScheduler:
+		""" A callSoon that any thread may use to reach the loop thread.
+		
+		    The unstuck dispatcher cannot be woken safely from another thread,
+		    so calls from other threads are queued under a lock, and the queue
+		    is drained on the loop thread by a RecurringEvent. The poll runs
+		    only while some scheduler is alive, and ends once the last has
+		    been dropped and its calls made.
+		"""
+		pollInterval = .002
+		lock = threading.RLock()
+		calls = collections.deque()
+		live = 0
+		poll = None
+		
+		def __init__(self):
+			cls = ThreadsafeScheduler
+			self.loopThread = threading.get_ident()
+			with cls.lock:
+				cls.live += 1
+			if cls.poll is None:
+				cls.poll = RecurringEvent(cls.pollInterval, cls.drain)
+				cls.poll.begin()
+		
+		def __call__(self, func, *args):
+			if threading.get_ident() == self.loopThread:
+				callSoon(func, *args)
+			else:
+				with self.lock:
+					self.calls.append((func, args))
+		
+		def __del__(self):
+			with self.lock:
+				ThreadsafeScheduler.live -= 1
+		
+		@classmethod
+		def drain(cls):
+			with cls.lock:
+				calls = list(cls.calls)
+				cls.calls.clear()
+				idle = cls.live == 0
+			for func, args in calls:
+				callSoon(func, *args)
+			if idle:
+				cls.poll.end()
+				cls.poll = None
+	
+	def threadsafeScheduler():
+		""" Return a callSoon that any thread may use to reach this loop.
+		
+		    This must be called on the thread running the event loop.
+		"""
+		return ThreadsafeScheduler()
+	
+	class CancelledError(Exception):
+		""" The error with which a cancelled Future completes.
+		"""
+	
+	def cancel(fut):
+		""" Cancel fut, by completing it with a CancelledError.
+		"""
+		fut.setError(CancelledError())
+	
+	def whenCancelled(fut, callback):
+		""" Call callback, with no arguments, if fut is cancelled.
+		"""
+		def handler(error):
+			if isinstance(error, CancelledError):
+				callback()
+		wrapFutureErrors(handler, fut)
+else:
+	raise(ImportError("Unknown Ripley backend %s"%backendName))
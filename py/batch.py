@@ -0,0 +1,139 @@
+""" Module: batch
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file defines a single class, `Batch'. See the comments of that class
+    for further details.
+"""
+
+# System imports
+import io
+
+# Local imports
+from .backend   import *
+from .          import headers
+from .serialize import *
+from .interface import CallDeadline
+
+# Exports
+__all__ = ["Batch", "BatchCallError"]
+
+# The outcome of each call, leading its part of the reply to a batch
+ENTRY_RETURN = b"\x00"
+ENTRY_ERROR  = b"\x01"
+ENTRY_FAILED = b"\x02"
+
+
+class BatchCallError(Exception):
+	""" Raised for a batched call that failed without a TransverseException.
+	"""
+
+
+class Batch:
+	""" Evaluations on a single Route, sent together and answered together.
+	
+	    Calls are added with call, which takes a bound evaluation, such as
+	    gateway.echo or obj.method, with its arguments, and returns a Future of
+	    its return. Nothing is sent until send is called, or until the with
+	    block using the Batch exits, when every call goes out in one BATCH
+	    message and the callee answers them all in one reply. The framing and
+	    dispatch of a message are then paid once for the whole batch, and the
+	    Futures are resolved directly as the reply is read. Since the reply
+	    waits for every call, one slow call holds back the rest, and the
+	    timeout applies to the batch as a whole. For the same reason, a sent
+	    batch is cancelled at the callee only as a whole, with cancel, or
+	    once the Future of every call in it has been cancelled. The batch is
+	    sent in the most urgent priority class of its calls, and the callee
+	    replies in the same class.
+	"""
+	def __init__(self, connection, route, timeout = None):
+		self.connection = connection
+		self.route = route
+		self.timeout = CallDeadline.inherit(timeout)
+		self.entries = io.BytesIO()
+		self.calls = []
+		self.priority = headers.PRIORITY_BULK
+		self.sent = False
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, excType, excValue, traceback):
+		if excType is None:
+			self.send()
+		else:
+			self.abandon()
+	
+	def __len__(self):
+		return len(self.calls)
+	
+	def call(self, bound, *args):
+		""" Add a call to the batch, returning a Future of its return.
+		"""
+		return bound.queue(self, *args)
+	
+	def queue(self, route, transverseID, serialize, decode,
+	          priority = headers.PRIORITY_NORMAL):
+		""" Add the evaluation of a call, identified by its TransverseID.
+		
+		    The arguments are written by serialize and the return is read by
+		    decode, each given the stream. The call is made by Reference if
+		    the TransverseID is already resolved, and otherwise the callee
+		    returns the Reference with the reply so that it can be cached.
+		    priority is the class in which the call would be sent alone.
+		"""
+		if self.sent:
+			raise(Exception("Batch has already been sent"))
+		if route is not self.route:
+			raise(ValueError("Call is not on the Route of the Batch"))
+		
+		# Each call is prefixed by its length, which is filled in afterwards
+		entries = self.entries
+		start = entries.tell()
+		UInt32.serialize(0, entries)
+		callID = self.connection.getCachedTransverse(route, transverseID)
+		try:
+			if callID is None:
+				entries.write(headers.HEADER_EVAL_TRANS)
+				TransverseID.serialize(transverseID, entries)
+			else:
+				entries.write(headers.HEADER_EVAL)
+				Reference.serialize(callID, entries)
+				transverseID = None
+			serialize(entries)
+		except Exception:
+			entries.seek(start)
+			entries.truncate()
+			raise
+		end = entries.tell()
+		entries.seek(start)
+		UInt32.serialize(end - start - 4, entries)
+		entries.seek(end)
+		
+		fut = Future()
+		self.calls.append((transverseID, decode, fut))
+		self.priority = min(self.priority, priority)
+		return fut
+	
+	def send(self):
+		""" Send every call in the batch as a single message.
+		"""
+		if self.sent:
+			raise(Exception("Batch has already been sent"))
+		self.sent = True
+		if self.calls:
+			self.connection.transmitBatch(self.route, self.entries.getvalue(),
+			                              self.calls, self.timeout,
+			                              self.priority)
+	
+	def abandon(self):
+		""" Drop the batch unsent, cancelling the Future of every call.
+		"""
+		self.sent = True
+		self.cancel()
+	
+	def cancel(self):
+		""" Cancel the Future of every call, and so the batch at the callee.
+		"""
+		for _, _, fut in self.calls:
+			cancel(fut)
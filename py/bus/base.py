@@ -1,11 +1,7 @@
-# System imports
-from collections import deque
-
-# External imports
-from unstuck import *
-
 # Local imports
+from ..backend   import *
 from ..serialize import *
+from .wheel      import TimerWheel
 #from ..errors import *
 
 # Exports
@@ -35,11 +31,11 @@ class Bus:
 	def __init__(self, *, mqLen = 5, tickLen = .5):
 		# Message handling
 		self.messageCount = -1
-		self.messageQueues = deque(maxlen=mqLen)
-		for i in range(mqLen):
-			self.messageQueues.append(dict())
+		self.pendingMessages = {}
+		self.defaultTimeout = mqLen * tickLen
 		
 		# Message time-out
+		self.messageTimers = TimerWheel(tickLen)
 		self.messageQueueWatchdog = RecurringEvent(tickLen,
 		                                           self.messageQueuesTick)
 		self.messageQueueWatchdog.begin()
@@ -51,19 +47,17 @@ class Bus:
 	def messageQueuesTick(self):
 		""" Single tick for the message queue timeout accounting.
 		
-		    Messages are timed out using a shift FIFO. Each tick moves those
-		    messages which have not yet been answered on, in this queue. When a
-		    messages reaches the end of this FIFO, the message is timed out,
-		    being `answered' with a TimeoutError exception.
+		    Each outstanding message is scheduled on a TimerWheel against its
+		    own deadline. Each tick advances the wheel and those messages which
+		    have expired, without being answered, are timed out, being
+		    `answered' with a TimeoutError exception.
 		"""
-		deadQueue = self.messageQueues.pop()
-		self.messageQueues.appendleft(dict())
-		
-		for _, cbs in deadQueue.items():
-			errorCB = cbs[1]
-			errorCB(TimeoutError)
+		for messageID in self.messageTimers.tick():
+			_, errorCB, _ = self.pendingMessages.pop(messageID)
+			errorCB(TimeoutError(messageID))
 	
-	def waitForReply(self, successCallback, errorCallback, shiboleth):
+	def waitForReply(self, successCallback, errorCallback, shiboleth,
+	                 timeout = None):
 		""" Assigns callbacks and a check-value to a messageID.
 		
 		    This method assigns a messageID to a pair of callbacks. These
@@ -72,12 +66,16 @@ class Bus:
 		    response to these callbacks. In addition, a shiboleth is supplied.
 		    This is the outgoing Route and must match the incoming Route of the
 		    response, otherwise the response will be ignored. This is to prevent
-		    spoofing.
+		    spoofing. If no reply is received within timeout seconds (or the
+		    Bus default) then the error callback is called instead.
 		"""
 		self.messageCount += 1
 		messageID = SerialID.integerToBytes(self.messageCount)
-		subQueue = self.messageQueues[0]
-		subQueue[messageID] = successCallback, errorCallback, shiboleth
+		self.pendingMessages[messageID] = (successCallback, errorCallback,
+		                                   shiboleth)
+		if timeout is None:
+			timeout = self.defaultTimeout
+		self.messageTimers.schedule(messageID, timeout)
 		return messageID
 	
 	def resolveMessageID(self, messageID, shiboleth):
@@ -89,18 +87,53 @@ class Bus:
 		    method also checks the shiboleth provided as an argument to the
 		    shiboleth registered to the message.
 		"""
-		for subQueue in self.messageQueues:
-			if messageID in subQueue:
-				resultCB, errorCB, messageShiboleth = subQueue[messageID]
-				if messageShiboleth != shiboleth:
-					# An apparent attempt at message spoofing.
-					raise(UnknownMessageIDError(messageID))
-				subQueue.pop(messageID)
-				# Return the resolution callback and the exception callback
-				return resultCB, errorCB
+		try:
+			resultCB, errorCB, messageShiboleth = self.pendingMessages[messageID]
+		except KeyError:
+			# send a general error to the other-side if this message was unknown
+			raise(UnknownMessageIDError(messageID))
+		
+		if messageShiboleth != shiboleth:
+			# An apparent attempt at message spoofing.
+			raise(UnknownMessageIDError(messageID))
+		del self.pendingMessages[messageID]
+		self.messageTimers.cancel(messageID)
+		
+		# Return the resolution callback and the exception callback
+		return resultCB, errorCB
+	
+	def extendMessageID(self, messageID, shiboleth, timeout = None):
+		""" Restart the timeout of a message that is still being answered.
 		
-		# send a general error to the other-side if this message was unknown
-		raise(UnknownMessageIDError(messageID))
+		    A streamed reply arrives in several parts, and each part restarts
+		    the timeout of the message, as does each grant of credit to a
+		    stream, so that a stream only times out when it stalls. The same
+		    checks are made as by resolveMessageID, but the callbacks remain
+		    registered until the final reply.
+		"""
+		try:
+			_, _, messageShiboleth = self.pendingMessages[messageID]
+		except KeyError:
+			raise(UnknownMessageIDError(messageID))
+		
+		if messageShiboleth != shiboleth:
+			raise(UnknownMessageIDError(messageID))
+		if timeout is None:
+			timeout = self.defaultTimeout
+		self.messageTimers.cancel(messageID)
+		self.messageTimers.schedule(messageID, timeout)
+	
+	def cancelMessageID(self, messageID):
+		""" Forget a message that its sender no longer waits on.
+		
+		    The callbacks are dropped without being called, and the message is
+		    no longer timed. Returns whether the message was still pending, in
+		    which case any reply to it that arrives is rejected.
+		"""
+		if self.pendingMessages.pop(messageID, None) is None:
+			return False
+		self.messageTimers.cancel(messageID)
+		return True
 	
 	##
 	# Error handling
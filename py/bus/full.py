@@ -1,10 +1,8 @@
 # System imports
 from collections import deque
 
-# External imports
-from unstuck import *
-
 # Local imports
+from ..backend   import *
 from ..core_impl  import OpenTransport, busMasterService
 from ..transport  import LoopbackTransport
 from ..connection import Connection
@@ -45,9 +43,29 @@ class FullBus(SingleBus):
 		""" Register a Transport as the link to a remote Bus.
 		
 		    This method informs the Bus that the provided Transport connects
-		    this bus to the remote Bus identified by the BusID.
+		    this bus to the remote Bus identified by the BusID. The Transport
+		    is unregistered again once it is closed.
 		"""
 		self.transports[busID] = transport
+		transport.whenClosed(lambda: self.transportClosed(busID, transport))
+	
+	def unregisterTransport(self, busID):
+		""" Remove the Transport linking this Bus to a remote Bus.
+		
+		    Any TransverseIDs resolved across the Transport are invalidated, so
+		    that they are resolved afresh if the remote Bus is reached again.
+		"""
+		transport = self.transports.pop(busID)
+		transport.invalidateCaches()
+		return transport
+	
+	def transportClosed(self, busID, transport):
+		""" Unregister a Transport whose stream has been lost.
+		
+		    A newer Transport since registered for the same Bus is left alone.
+		"""
+		if self.transports.get(busID) is transport:
+			self.unregisterTransport(busID)
 	
 	def resolveTransport(self, busID):
 		""" Resolve an endpoint Bus to the appropriate Transport.
@@ -76,7 +94,8 @@ class FullBus(SingleBus):
 			code = server.connectionURI
 		self.busMaster.registerServer(server, code)
 	
-	def bootstrapOnTransport(self, transport):
+	@asynchronous
+	def bootstrapOnTransportCoro(self, transport):
 		""" Connects a neonate Bus to a remote BusMaster through a Transport.
 		
 		    This method is used to connect a new FullBus into a broader network
@@ -86,10 +105,11 @@ class FullBus(SingleBus):
 		    via the BootstrapTransport protocol to get a Connection, with
 		    a MasterService registered on it, along with the remoteBusID of the
 		    BusMaster bus. The connectionID of the new Connection will be the
-		    BusID for this Bus.
+		    BusID for this Bus. The blocking form, bootstrapOnTransport, is
+		    inherited from SingleBus.
 		"""
 		(connection, busMaster,
-		 remoteBusID              ) = self.getBootstrapConnection(transport)
+		 remoteBusID ) = yield from self.getBootstrapConnection(transport)
 		self.busMaster = busMaster
 		self.engageBus(connection.connectionID)
 		self.registerTransport(remoteBusID, transport)
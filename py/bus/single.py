@@ -1,4 +1,5 @@
 # Local imports
+from ..backend import *
 from ..connection import Connection
 from ..core_impl import OpenRoute, BusMasterService, busClientService
 from .base import Bus
@@ -24,9 +25,15 @@ class SingleBus(Bus):
 		    MasterService over the BootstrapTransport. It then sets the
 		    supplied transport as the Bus's only Transport, sets the master
 		    and returns the Connection for Services to be discovered on.
+		    This blocks, so code on the event loop must instead use the
+		    coroutine form, bootstrapOnTransportCoro.
 		"""
+		return await(self.bootstrapOnTransportCoro(transport))
+	
+	@asynchronous
+	def bootstrapOnTransportCoro(self, transport):
 		(connection, busMaster,
-		 remoteBusID            ) = self.getBootstrapConnection(transport)
+		 remoteBusID ) = yield from self.getBootstrapConnection(transport)
 		self.busMaster = busMaster
 		self.onlyTransport = transport
 		return connection
@@ -49,6 +56,7 @@ class SingleBus(Bus):
 	# Code for bootstrapping
 	##
 	
+	@asynchronous
 	def getBootstrapConnection(self, transport):
 		""" Use a BootstrapTransport to create a Connection.
 		
@@ -63,7 +71,7 @@ class SingleBus(Bus):
 		
 		# Derive the tokens from the bootstrap protocol
 		(routeCode, connectionID,
-		 masterID, masterBusID  ) = transport.bootstrap(routeToken)
+		 masterID, masterBusID ) = yield from transport.bootstrapCoro(routeToken)
 		
 		# Create the Connection and complete the Route on it
 		connection = Connection(self, connectionID)
@@ -73,7 +81,7 @@ class SingleBus(Bus):
 		
 		# Get the BusMaster and register this connection as a BusClient
 		service = BusMasterService(route)
-		busMaster = service.getBusMaster(None)
+		busMaster = yield from service.getBusMaster.coro(None)
 		connection.addTransverseMap(busClientService.exposedTransverse)
 		#connection.addTransverseMap(basicErrorService.exposedTransverse)
 		
@@ -0,0 +1,86 @@
+# System imports
+import math
+
+# Exports
+__all__ = ["TimerWheel"]
+
+
+class TimerWheel:
+	""" A hierarchical timing wheel for expiring keys at per-key deadlines.
+	
+	    The wheel is advanced one tick at a time by its owner. Each level of
+	    the wheel is a ring of buckets, with each bucket on a level spanning as
+	    many ticks as the entire level below it. A key is placed on the lowest
+	    level whose span covers its deadline and is cascaded down towards the
+	    finest level as its deadline approaches. Scheduling, cancellation and
+	    expiry are therefore constant time per key, regardless of how many keys
+	    are outstanding.
+	"""
+	def __init__(self, tickLen, slotBits = 6, levels = 4):
+		self.tickLen = tickLen
+		self.slotBits = slotBits
+		self.slotMask = (1 << slotBits) - 1
+		self.levels = [[dict() for _ in range(1 << slotBits)]
+		               for _ in range(levels)]
+		self.maxTicks = (1 << (slotBits * levels)) - 1
+		self.now = 0
+		self.locations = {}
+	
+	def schedule(self, key, delay):
+		""" Schedule key to expire after delay seconds.
+		
+		    The delay is rounded up to a whole number of ticks, of at least one
+		    tick. Delays beyond the span of the wheel are clamped to it.
+		"""
+		ticks = max(1, math.ceil(delay / self.tickLen))
+		self.insert(key, self.now + min(ticks, self.maxTicks))
+	
+	def insert(self, key, expiry):
+		""" Place key in the correct bucket for an absolute expiry tick.
+		"""
+		delta = expiry - self.now
+		level = 0
+		topLevel = len(self.levels) - 1
+		while level < topLevel and delta >> (self.slotBits * (level + 1)):
+			level += 1
+		slot = (expiry >> (self.slotBits * level)) & self.slotMask
+		bucket = self.levels[level][slot]
+		bucket[key] = expiry
+		self.locations[key] = bucket
+	
+	def cancel(self, key):
+		""" Remove key from the wheel, if it is present.
+		"""
+		bucket = self.locations.pop(key, None)
+		if bucket is not None:
+			del bucket[key]
+	
+	def tick(self):
+		""" Advance the wheel by a single tick and return the expired keys.
+		
+		    Buckets on the coarser levels that have come due are first
+		    cascaded down, coarsest first, so that a key which cascades
+		    through several levels in one tick still expires on time.
+		"""
+		self.now += 1
+		now = self.now
+		for level in range(len(self.levels) - 1, 0, -1):
+			shift = self.slotBits * level
+			if now & ((1 << shift) - 1) == 0:
+				ring = self.levels[level]
+				slot = (now >> shift) & self.slotMask
+				cascade = ring[slot]
+				ring[slot] = dict()
+				for key, expiry in cascade.items():
+					self.insert(key, expiry)
+		
+		ring = self.levels[0]
+		slot = now & self.slotMask
+		expired = ring[slot]
+		ring[slot] = dict()
+		for key in expired:
+			del self.locations[key]
+		return list(expired)
+	
+	def __len__(self):
+		return len(self.locations)
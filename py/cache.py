@@ -0,0 +1,76 @@
+""" Module: cache
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file defines a single class, `ResolutionCache'. See the comments of
+    that class for further details.
+"""
+
+# System imports
+from collections import OrderedDict
+
+# Exports
+__all__ = ["ResolutionCache"]
+
+
+class ResolutionCache:
+	""" A bounded cache of the References that TransverseIDs resolve to.
+	
+	    Entries are keyed by the BusID of the remote Bus and the TransverseID
+	    resolved on it. The least recently used entry is evicted once the cache
+	    holds maxSize entries. Entries are also indexed by Bus so that every
+	    entry for a Bus can be dropped at once, when the Transport to that Bus
+	    is unregistered. The hits, misses and evictions counters record how
+	    well the cache is serving.
+	"""
+	def __init__(self, maxSize = 4096):
+		self.maxSize = maxSize
+		self.entries = OrderedDict()
+		self.busEntries = {}
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+	
+	def get(self, busID, transverseID):
+		""" Return the cached Reference, or None if there is none.
+		"""
+		key = busID, transverseID
+		try:
+			reference = self.entries[key]
+		except KeyError:
+			self.misses += 1
+			return None
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return reference
+	
+	def put(self, busID, transverseID, reference):
+		""" Cache a Reference, evicting the least recently used if full.
+		"""
+		key = busID, transverseID
+		self.entries[key] = reference
+		self.entries.move_to_end(key)
+		self.busEntries.setdefault(busID, set()).add(transverseID)
+		while len(self.entries) > self.maxSize:
+			(oldBusID, oldID), _ = self.entries.popitem(last = False)
+			self.forgetBusEntry(oldBusID, oldID)
+			self.evictions += 1
+	
+	def invalidateBus(self, busID):
+		""" Drop every entry resolved on the Bus identified by busID.
+		"""
+		for transverseID in self.busEntries.pop(busID, ()):
+			del self.entries[busID, transverseID]
+	
+	def forgetBusEntry(self, busID, transverseID):
+		transverseIDs = self.busEntries[busID]
+		transverseIDs.discard(transverseID)
+		if not transverseIDs:
+			del self.busEntries[busID]
+	
+	def clear(self):
+		self.entries.clear()
+		self.busEntries.clear()
+	
+	def __len__(self):
+		return len(self.entries)
@@ -6,13 +6,22 @@
     class for further details.
 """
 
-# External imports
-from unstuck import *
+# System imports
+import functools
+import io
+import time
+import weakref
 
 # Local imports
+from .backend   import *
 from .          import headers
+from .cache     import ResolutionCache
+from .exports   import ExportTable
 from .serialize import *
-from .interface import ExposedCall
+from .interface import ExposedCall, CallDeadline
+from .batch     import *
+from .batch     import ENTRY_RETURN, ENTRY_ERROR, ENTRY_FAILED
+from .stream    import ItemStream, StreamPump
 #from .errors    import *
 from .filter    import *
 
@@ -23,6 +32,20 @@ __all__ = ["Connection"]
 class TransverseException:
 	pass
 
+
+class HeldReference:
+	""" The References to a remote object held through a single proxy.
+	
+	    The count is released to the owning Connection when the proxy is
+	    garbage-collected, unless the proxy has been pinned by passing its
+	    Reference on to a third party.
+	"""
+	def __init__(self, destination, objectID):
+		self.destination = destination
+		self.objectID = objectID
+		self.count = 0
+		self.pinned = False
+
 class Connection:
 	""" This class reifies an encapsulated process on a Bus.
 	
@@ -31,20 +54,84 @@ class Connection:
 	    Finally it contains the processing methods for handling incoming binary
 	    message streams and the calling of appropriate local methods
 	"""
+	# Methods handling each type of incoming message, by header byte
+	messageHandlers = {
+		headers.HEADER_RESOLVE       : "receiveResolve",
+		headers.HEADER_RESOLVE_BULK  : "receiveResolveBulk",
+		headers.HEADER_NOTIFY        : "receiveNotify",
+		headers.HEADER_EVAL          : "receiveEval",
+		headers.HEADER_NOTIFY_TRANS  : "receiveNotifyTransverse",
+		headers.HEADER_EVAL_TRANS    : "receiveEvalTransverse",
+		headers.HEADER_REPLY         : "receiveReply",
+		headers.HEADER_MESSAGE_ERROR : "receiveMessageError",
+		headers.HEADER_GENERAL_ERROR : "receiveGeneralError",
+		headers.HEADER_TIME          : "receiveTime",
+		headers.HEADER_FILTER_IN     : "modifyIOFilterInput",
+		headers.HEADER_FILTER_OUT    : "modifyIOFilterOutput",
+		headers.HEADER_RELEASE       : "receiveRelease",
+		headers.HEADER_STREAM        : "receiveStream",
+		headers.HEADER_STREAM_ITEM   : "receiveStreamItem",
+		headers.HEADER_STREAM_CREDIT : "receiveStreamCredit",
+		headers.HEADER_UPLOAD        : "receiveUpload",
+		headers.HEADER_UPLOAD_ITEM   : "receiveUploadItem",
+		headers.HEADER_UPLOAD_END    : "receiveUploadEnd",
+		headers.HEADER_UPLOAD_CREDIT : "receiveUploadCredit",
+		headers.HEADER_CANCEL        : "receiveCancel",
+		headers.HEADER_BATCH         : "receiveBatch"}
+	
+	# Number of resolved TransverseIDs cached before the oldest are evicted
+	transverseCacheSize = 4096
+	
+	# Seconds for which a Reference handed out remains valid without renewal,
+	# or None to keep References until they are released. Where this is set,
+	# it must be set on both ends.
+	referenceLease = None
+	
+	# Number of items of a stream that may be in flight to this end, for the
+	# streaming calls made here and for the uploads made to here
+	streamWindow = 16
+	uploadWindow = 16
+	
 	def __init__(self, bus, connectionID):
 		# Object brokering
-		self.objectToObjectID = {}
-		self.objectIDToObject = {}
-		self.objectCount = -1
+		self.exportedObjects = ExportTable()
 		self.transverseMaps = []
+		self.transverseIndex = {}
 		self.proxyTokens = {}
+		self.proxyCache = weakref.WeakValueDictionary()
 		
 		# Connection to bus
 		self.bus = bus
 		self.connectionID = connectionID
 		
 		# Transverse caching
-		self.cachedTransverse = {}
+		self.cachedTransverse = ResolutionCache(self.transverseCacheSize)
+		
+		# Deadline of the message currently being processed
+		self.incomingDeadline = None
+		
+		# Incoming message dispatch
+		self.bindMessageHandlers()
+		
+		# Distributed reference counting
+		self.objectRefCounts = {}
+		self.objectLeases = {}
+		self.pinnedObjects = set()
+		self.heldReferences = set()
+		self.pendingReleases = {}
+		if self.referenceLease is not None:
+			self.leaseKeeper = RecurringEvent(self.referenceLease / 3,
+			                                  self.keepLeases)
+			self.leaseKeeper.begin()
+		
+		# Calls made to here whose replies are waiting on their completion
+		self.runningCalls = {}
+		
+		# Streamed calls, made from here and to here
+		self.incomingStreams = {}
+		self.outgoingStreams = {}
+		self.incomingUploads = {}
+		self.outgoingUploads = {}
 	
 	def handleLocalException(self, error):
 		raise error
@@ -53,66 +140,76 @@ class Connection:
 	# Code for handling object caching
 	##
 	
-	def generateObjectID(self):
-		""" Generates an object ID in the form of a SerialID.
-		
-		    Referencess are transfered in the form of a connection-specific
-		    unique identifier plus an identifier for the connection itself.
-		    However, this connectionID is handled elsewhere.
-		"""
-		self.objectCount += 1
-		return SerialID.integerToBytes(self.objectCount)
-	
 	def objectToReference(self, obj):
 		""" Obtains a reference identifier for an object.
 		
 		    If the object has been shared previously then the previous reference
-		    is returned, otherwise a reference is generated and marked against
-		    the object.  The connection ID is added for local objects to create
-		    a complete reference.
+		    is returned, otherwise the object is exported under a new object
+		    ID. The connection ID is added for local objects to create a
+		    complete reference.
 		"""
 		if isinstance(obj, ObjectProxy):
 			return obj.reference
 		
-		if obj in self.objectToObjectID:
-			objectID = self.objectToObjectID[obj]
-		else:
-			# This is a new object so generate the reference and store them
-			objectID = self.generateObjectID()
-			self.objectIDToObject[objectID] = obj
-			self.objectToObjectID[obj] = objectID
-			
-		return self.connectionID, objectID
+		return self.connectionID, self.exportedObjects.export(obj)
 	
-	def referenceToObject(self, reference, typ):
+	def referenceToObject(self, reference, typ, counted = False):
 		""" Maps an incoming object reference to a python object.
 		
 		    Local objects will be mapped to their local python object whereas
-		    remote objects will be wrapped in an object proxy.
+		    remote objects will be wrapped in an object proxy. Proxies are
+		    interned, so that a remote object arriving repeatedly is always
+		    wrapped by the same proxy for as long as that proxy lives. A
+		    counted Reference is one that was counted by its owner when sent,
+		    which must be released again when it is no longer held.
 		"""
 		connectionID, objectID = reference
 		
 		if connectionID == self.connectionID:
-			if not objectID in self.objectIDToObject:
+			try:
+				obj = self.exportedObjects.lookup(objectID)
+			except KeyError:
 				raise(UnknownObjectIDError(objectID))
-			obj = self.objectIDToObject[objectID]
 			if not isinstance(obj, typ):
 				raise(TypeMismatchError(type(obj), typ))
+			if counted:
+				self.releaseObject(objectID, 1)
 		else:
 			try:
 				destination = self.proxyTokens[connectionID]
 			except:
 				raise(UnknownReferenceError(reference))
-			obj = typ.getProxyClass()(destination, reference)
+			proxyClass = typ.getProxyClass()
+			key = connectionID, objectID, proxyClass
+			obj = self.proxyCache.get(key)
+			if obj is None:
+				obj = proxyClass(destination, reference)
+				self.proxyCache[key] = obj
+			if counted:
+				self.holdReference(obj, destination, objectID)
 		return obj
 	
 	def serializeObject(self, obj, outStream):
 		""" Serializes a PassByReference object.
 		
 		    This function obtains a reference to the supplied object and writes
-		    it to the outputStream. No type checking is performed.
+		    it to the outputStream. No type checking is performed. Each local
+		    object sent is counted against its eventual release. A proxy passed
+		    on to a third party is pinned instead, so that it never releases
+		    the remote object, since the owner cannot count such a Reference.
+		    A proxy passed back to the owner is neither pinned nor counted,
+		    since the owner resolves it to the object itself.
 		"""
-		ref = self.objectToReference(obj)
+		if isinstance(obj, ObjectProxy):
+			ref = obj.reference
+			held = getattr(obj, "heldReference", None)
+			destination = getattr(outStream, "destination", None)
+			if held is not None and getattr(destination, "endID",
+			                                None) != ref[0]:
+				held.pinned = True
+		else:
+			ref = self.objectToReference(obj)
+			self.acquireObject(ref[1])
 		Reference.serialize(ref, outStream)
 	
 	def deserializeObject(self, inStream, typeCheck):
@@ -121,9 +218,117 @@ class Connection:
 		    This function deserializes a reference from inStream and matches
 		    it to an object in the local cache (or creates a proxy object).
 		    Type checking on local objects is performed to prevent spoofing.
+		    Only References received directly from their owner are counted.
 		"""
 		ref = Reference.deserialize(inStream)
-		return self.referenceToObject(ref, typeCheck)
+		origin = getattr(inStream, "origin", None)
+		counted = getattr(origin, "endID", None) == ref[0]
+		return self.referenceToObject(ref, typeCheck, counted)
+	
+	def pinnedReference(self, obj):
+		""" Obtains a reference for an object that is never to be released.
+		
+		    This is used for References handed out by transverse resolution,
+		    which are cached by the remote end for the life of the Connection.
+		"""
+		ref = self.objectToReference(obj)
+		self.pinnedObjects.add(ref[1])
+		return ref
+	
+	##
+	# Distributed reference counting
+	##
+	
+	def acquireObject(self, objectID):
+		""" Count a Reference to a local object as it is sent.
+		"""
+		self.objectRefCounts[objectID] = self.objectRefCounts.get(objectID,
+		                                                          0) + 1
+		if self.referenceLease is not None:
+			self.objectLeases[objectID] = (time.monotonic() +
+			                               self.referenceLease)
+	
+	def releaseObject(self, objectID, count):
+		""" Release a number of the References counted to a local object.
+		
+		    The object is dropped from the object tables once the count falls
+		    to zero. A count of zero just renews the lease on the object.
+		"""
+		if objectID in self.objectLeases:
+			self.objectLeases[objectID] = (time.monotonic() +
+			                               self.referenceLease)
+		if not count:
+			return
+		remaining = self.objectRefCounts.get(objectID, 0) - count
+		if remaining > 0:
+			self.objectRefCounts[objectID] = remaining
+		else:
+			self.forgetObject(objectID)
+	
+	def forgetObject(self, objectID):
+		""" Drop a local object from the object tables, unless it is pinned.
+		"""
+		self.objectRefCounts.pop(objectID, None)
+		self.objectLeases.pop(objectID, None)
+		if objectID in self.pinnedObjects:
+			return
+		self.exportedObjects.remove(objectID)
+	
+	def holdReference(self, proxy, destination, objectID):
+		""" Arrange for a counted Reference to be released with its proxy.
+		
+		    An interned proxy accumulates the count of every counted Reference
+		    it has been returned for and releases them all when it dies.
+		"""
+		held = getattr(proxy, "heldReference", None)
+		if held is None:
+			held = HeldReference(destination, objectID)
+			proxy.heldReference = held
+			self.heldReferences.add(held)
+			finalizer = weakref.finalize(proxy, self.dropReference, held)
+			finalizer.atexit = False
+		held.count += 1
+	
+	def dropReference(self, held):
+		""" Called when a proxy holding counted References has been collected.
+		"""
+		self.heldReferences.discard(held)
+		if not held.pinned:
+			self.queueRelease(held.destination, held.objectID, held.count)
+	
+	def queueRelease(self, destination, objectID, count):
+		""" Queue a release, to be sent with the others made this tick.
+		"""
+		if not self.pendingReleases:
+			callSoon(self.flushReleases)
+		releases = self.pendingReleases.setdefault(destination, {})
+		releases[objectID] = releases.get(objectID, 0) + count
+	
+	def flushReleases(self):
+		""" Send the releases queued during the last tick, one per Route.
+		"""
+		pending = self.pendingReleases
+		self.pendingReleases = {}
+		for destination, releases in pending.items():
+			self.transmitRelease(destination, releases)
+	
+	def keepLeases(self):
+		""" Renew the leases on held References and expire those handed out.
+		
+		    This runs periodically when referenceLease is set. Each Reference
+		    held is renewed by a release with a count of zero, so that the
+		    References held by a peer which has died expire with their leases.
+		"""
+		now = time.monotonic()
+		for objectID, expiry in list(self.objectLeases.items()):
+			if expiry <= now:
+				self.forgetObject(objectID)
+		
+		renewals = {}
+		for held in self.heldReferences:
+			renewals.setdefault(held.destination, {})[held.objectID] = 0
+		for destination, releases in renewals.items():
+			self.transmitRelease(destination, releases)
 	
 	##
 	# Function related to transverse object resolution
@@ -136,9 +341,38 @@ class Connection:
 		    is offered on a Connection. The list of TransverseID -> Object
 		    mappings is added to this Connection so that future transverse
 		    resolutions will return the objects in question (or rather, the
-		    references to them).
+		    references to them). The mappings are merged into a single index,
+		    in which those of maps added earlier take precedence, so the map
+		    should be complete before it is added.
 		"""
 		self.transverseMaps.append(transverseMap)
+		index = self.transverseIndex
+		for transverseID, obj in transverseMap.items():
+			if not transverseID in index:
+				index[transverseID] = obj
+	
+	def removeTransverseMap(self, transverseMap):
+		""" Removes a dictionary of transverse mappings from the Connection.
+		
+		    This is the reverse of addTransverseMap, applied when a service is
+		    withdrawn. Only the entries of the index for the TransverseIDs in
+		    the removed map are recomputed, from whichever remaining map now
+		    takes precedence.
+		"""
+		for i, candidate in enumerate(self.transverseMaps):
+			if candidate is transverseMap:
+				del self.transverseMaps[i]
+				break
+		else:
+			raise(ValueError("Transverse map was not added"))
+		
+		index = self.transverseIndex
+		for transverseID in transverseMap:
+			del index[transverseID]
+			for remaining in self.transverseMaps:
+				if transverseID in remaining:
+					index[transverseID] = remaining[transverseID]
+					break
 	
 	def transverseIDToReference(self, transverseID):
 		""" Maps a TransverseID to a Reference to the appropriate object.
@@ -148,22 +382,30 @@ class Connection:
 		    to a Reference, for transmission over the wire.
 		"""
 		obj = self.transverseIDToObject(transverseID)
-		ref = self.objectToReference(obj)
+		ref = self.pinnedReference(obj)
 		return ref
 	
 	def transverseIDToObject(self, transverseID):
 		""" Maps a TransverseID to the appropriate object.
 		
-		    Looks through the handled transvese maps to find the object
-		    corresponding to the TransverseID supplied.
+		    Looks up the object corresponding to the TransverseID supplied in
+		    the merged index of the handled transverse maps.
 		"""
-		for transverseMap in self.transverseMaps:
-			try:
-				obj = transverseMap[transverseID]
-				return obj
-			except KeyError:
-				pass
-		raise(UnknownTransverseIDError(transverseID))
+		try:
+			return self.transverseIndex[transverseID]
+		except KeyError:
+			raise(UnknownTransverseIDError(transverseID))
+	
+	def transverseIDToCall(self, transverseID):
+		""" Maps a TransverseID to an ExposedCall.
+		
+		    Used for transverse-addressed calls, where the type check that
+		    deserializeObject would otherwise perform must be made here.
+		"""
+		call = self.transverseIDToObject(transverseID)
+		if not isinstance(call, ExposedCall):
+			raise(TypeMismatchError(type(call), ExposedCall))
+		return call
 	
 	##
 	# Incoming message routing
@@ -174,29 +416,53 @@ class Connection:
 		
 		    This procedure retrieves a message packet from inStream and acts
 		    according to the header byte received (the first byte read) to pass
-		    further processing to the appropriate subprocedure.
+		    further processing to the appropriate subprocedure, as given by the
+		    messageHandlers table. Replies, being the most common message, are
+		    handled inline unless receiveReply has been overridden. The origin
+		    is recorded on the stream, so that References deserialized from it
+		    can be attributed to the sender.
 		"""
+		inStream.origin = origin
 		header = inStream.read(1)
-		if header == headers.HEADER_RESOLVE:
-			self.receiveResolve(origin, inStream)
-		elif header == headers.HEADER_NOTIFY:
-			self.receiveNotify(origin, inStream)
-		elif header == headers.HEADER_EVAL:
-			self.receiveEval(origin, inStream)
-		elif header == headers.HEADER_REPLY:
-			self.receiveReply(origin, inStream)
-		elif header == headers.HEADER_MESSAGE_ERROR:
-			self.receiveMessageError(origin, inStream)
-		elif header == headers.HEADER_GENERAL_ERROR:
-			self.receiveGeneralError(origin, inStream)
-		elif header == headers.HEADER_FILTER_IN:
-			self.modifyIOFilterInput(origin, inStream)
-		elif header == headers.HEADER_FILTER_OUT:
-			self.modifyIOFilterOutput(origin, inStream)
-		elif header == headers.HEADER_RELEASE:
-			self.receiveRelease(origin, inStream)
-		else:
+		if header == headers.HEADER_REPLY and self.fastReply:
+			messageID = MessageID.deserialize(inStream)
+			doneCall, _ = self.bus.resolveMessageID(messageID, origin)
+			doneCall(inStream)
+			return
+		
+		try:
+			handler = self.dispatch[header]
+		except KeyError:
 			raise(DecodingError("Unrecognized header %s"%header))
+		handler(origin, inStream)
+	
+	@classmethod
+	def registerMessageHandler(cls, header, handler):
+		""" Register the handler for messages starting with a header byte.
+		
+		    The handler is either the name of a method, so that subclasses may
+		    override it, or a function taking the Connection, the origin Route
+		    and the incoming stream. Registering on a subclass leaves the table
+		    of its parent untouched. Handlers are bound when a Connection is
+		    created, so only Connections created afterwards will use it.
+		"""
+		if not "messageHandlers" in cls.__dict__:
+			cls.messageHandlers = dict(cls.messageHandlers)
+		cls.messageHandlers[header] = handler
+	
+	def bindMessageHandlers(self):
+		""" Build the dispatch table of bound handlers for this Connection.
+		"""
+		self.dispatch = {}
+		for header, handler in self.messageHandlers.items():
+			if isinstance(handler, str):
+				handler = getattr(self, handler)
+			else:
+				handler = functools.partial(handler, self)
+			self.dispatch[header] = handler
+		handler = self.messageHandlers.get(headers.HEADER_REPLY)
+		self.fastReply = (handler == "receiveReply" and
+		                  type(self).receiveReply is Connection.receiveReply)
 	
 	def receiveResolve(self, origin, inStream):
 		""" Process a resolution request.
@@ -214,7 +480,7 @@ class Connection:
 			reference = self.transverseIDToReference(transverseID)
 			
 			# Create the response object
-			outStream = origin.getOutputBuffer()
+			outStream = origin.getOutputBuffer(headers.PRIORITY_CONTROL)
 			outStream.write(headers.HEADER_REPLY)
 			MessageID.serialize(messageID, outStream)
 			Reference.serialize(reference, outStream)
@@ -225,6 +491,43 @@ class Connection:
 		except Exception as te:
 			self.handleIncomingMessageError(origin, messageID, te)
 	
+	def receiveResolveBulk(self, origin, inStream):
+		""" Process a request to resolve several TransverseIDs at once.
+		
+		    The request consists of a message ID, a count and that many
+		    TransverseIDs. Each is answered in turn in a single reply, by a
+		    flag byte, which is set if the TransverseID was resolved, followed
+		    by the Reference if it was. An unresolvable TransverseID does not
+		    fail the others, since the caller may simply not need it.
+		"""
+		# Strip out the message ID for response tagging
+		messageID = MessageID.deserialize(inStream)
+		
+		try:
+			count = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			
+			# Create the response object
+			outStream = origin.getOutputBuffer(headers.PRIORITY_CONTROL)
+			outStream.write(headers.HEADER_REPLY)
+			MessageID.serialize(messageID, outStream)
+			
+			# Resolve each of the transverse object identifiers
+			for _ in range(count):
+				transverseID = TransverseID.deserialize(inStream)
+				try:
+					reference = self.transverseIDToReference(transverseID)
+				except Exception:
+					outStream.write(b"\x00")
+				else:
+					outStream.write(b"\x01")
+					Reference.serialize(reference, outStream)
+			
+			# Transmit the response
+			outStream.commit()
+		
+		except Exception as te:
+			self.handleIncomingMessageError(origin, messageID, te)
+	
 	def receiveNotify(self, origin, inStream):
 		""" Process a notification.
 		
@@ -233,11 +536,17 @@ class Connection:
 		    must be local and a function/callable), followed by the serialized
 		    arguments for that function call.
 		"""
+		# Drop the notification if its deadline has already passed
+		if self.deadlinePassed():
+			return
+		
 		#First argument --must-- be a sharedObjectID and local
 		call = self.deserializeObject(inStream, ExposedCall)
 		
 		# Make the call
-		call(self, inStream)
+		pending = self.executeCall(call, inStream)
+		if pending is not None:
+			self.notifyLater(origin, pending)
 	
 	def receiveEval(self, origin, inStream):
 		""" Process a function-evaluation request.
@@ -249,24 +558,181 @@ class Connection:
 		# Strip out the message ID for response tagging
 		messageID = MessageID.deserialize(inStream)
 		
+		# Nobody is waiting for the reply if the deadline has passed
+		if self.deadlinePassed():
+			return
+		
 		try:
 			#First argument --must-- be an ExposedCallable object
 			call = self.deserializeObject(inStream, ExposedCall)
 			
-			# Create the response object
-			outStream = origin.getOutputBuffer()
+			# Create the response object, sent in the class of the call
+			outStream = origin.getOutputBuffer(call.priority)
 			outStream.write(headers.HEADER_REPLY)
 			MessageID.serialize(messageID, outStream)
 			
-			# Make the call			
-			call(self, inStream, outStream)
+			# Make the call, replying now unless the call completes later
+			pending = self.executeCall(call, inStream, outStream)
+			if pending is None:
+				outStream.commit()
+			else:
+				self.replyLater(origin, messageID, pending, outStream)
+		
+		except Exception as te:
+			self.handleIncomingMessageError(origin, messageID, te)
+	
+	def receiveNotifyTransverse(self, origin, inStream):
+		""" Process a notification addressed by TransverseID.
+		
+		    This is identical to a notification except that the callable is
+		    identified by its TransverseID rather than by a Reference, so that
+		    the caller need not have resolved it first.
+		"""
+		# Drop the notification if its deadline has already passed
+		if self.deadlinePassed():
+			return
+		
+		transverseID = TransverseID.deserialize(inStream)
+		call = self.transverseIDToCall(transverseID)
+		
+		# Make the call
+		pending = self.executeCall(call, inStream)
+		if pending is not None:
+			self.notifyLater(origin, pending)
+	
+	def receiveEvalTransverse(self, origin, inStream):
+		""" Process a function-evaluation request addressed by TransverseID.
+		
+		    This is identical to an evaluation request except that the callable
+		    is identified by its TransverseID rather than by a Reference. The
+		    Reference that the TransverseID resolves to is prepended to the
+		    reply so that the caller can use the Reference form from then on.
+		"""
+		# Strip out the message ID for response tagging
+		messageID = MessageID.deserialize(inStream)
+		
+		# Nobody is waiting for the reply if the deadline has passed
+		if self.deadlinePassed():
+			return
+		
+		try:
+			# Resolve the callable and obtain the Reference to return with it
+			transverseID = TransverseID.deserialize(inStream)
+			call = self.transverseIDToCall(transverseID)
+			reference = self.pinnedReference(call)
+			
+			# Create the response object, sent in the class of the call
+			outStream = origin.getOutputBuffer(call.priority)
+			outStream.write(headers.HEADER_REPLY)
+			MessageID.serialize(messageID, outStream)
+			Reference.serialize(reference, outStream)
 			
-			# Send the message
-			outStream.commit()
+			# Make the call, replying now unless the call completes later
+			pending = self.executeCall(call, inStream, outStream)
+			if pending is None:
+				outStream.commit()
+			else:
+				self.replyLater(origin, messageID, pending, outStream)
 		
 		except Exception as te:
 			self.handleIncomingMessageError(origin, messageID, te)
 	
+	def receiveRelease(self, origin, inStream):
+		""" Process the release of References to local objects.
+		
+		    A release consists of a count followed by that many pairs of an
+		    object ID and the number of References to it being released. A
+		    number of zero renews the lease on the object instead.
+		"""
+		count = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+		for _ in range(count):
+			objectID = SerialID.deserialize(inStream)
+			released = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			self.releaseObject(objectID, released)
+	
+	def receiveTime(self, origin, inStream):
+		""" Process a deadline applied to the message that follows.
+		
+		    The deadline is sent as the number of milliseconds remaining to the
+		    caller, and is counted from the arrival of the packet, where the
+		    transport has recorded it. It applies only to the message wrapped
+		    inside this one, which is processed immediately.
+		"""
+		budget = UInt32.deserialize(inStream)
+		received = getattr(inStream, "received", None)
+		if received is None:
+			received = time.monotonic()
+		
+		previous = self.incomingDeadline
+		self.incomingDeadline = received + budget / 1000
+		try:
+			self.handleReceived(origin, inStream)
+		finally:
+			self.incomingDeadline = previous
+	
+	def deadlinePassed(self):
+		""" Check whether the message being processed has expired.
+		"""
+		deadline = self.incomingDeadline
+		return deadline is not None and deadline <= time.monotonic()
+	
+	def executeCall(self, call, *streams):
+		""" Make an ExposedCall under the deadline of the current message.
+		
+		    The deadline is made available through CallDeadline for the
+		    duration of the call, so that any calls made by the implementation
+		    are limited to whatever time remains. If the call completes later,
+		    then the coroutine that completes it is returned, and otherwise
+		    None is.
+		"""
+		previous = CallDeadline.set(self.incomingDeadline)
+		try:
+			return call(self, *streams)
+		finally:
+			CallDeadline.set(previous)
+	
+	def replyLater(self, origin, messageID, pending, outStream):
+		""" Send the reply to an evaluation once its call has completed.
+		
+		    Replies are sent as the calls complete, and so may be sent in a
+		    different order to that in which the evaluations arrived. The
+		    caller matches each reply to its evaluation by the message ID.
+		    Until then, the call may be cancelled by the caller.
+		"""
+		# The call is registered before its task is scheduled, since a backend
+		# may run the task, and so complete it, before async returns
+		key = origin, messageID
+		self.runningCalls[key] = pending
+		task = async(self.completeReply(origin, messageID, pending, outStream,
+		                                self.incomingDeadline))
+		if self.runningCalls.get(key) is pending:
+			self.runningCalls[key] = task
+	
+	@asynchronous
+	def completeReply(self, origin, messageID, pending, outStream, deadline):
+		key = origin, messageID
+		try:
+			yield from pending
+		except CancelledError:
+			return
+		except Exception as te:
+			if self.runningCalls.pop(key, None) is not None:
+				self.handleIncomingMessageError(origin, messageID, te)
+			return
+		
+		# Nobody is waiting for the reply if the call was cancelled or if the
+		# deadline has passed meanwhile
+		if self.runningCalls.pop(key, None) is None:
+			return
+		if deadline is None or deadline > time.monotonic():
+			outStream.commit()
+	
+	def notifyLater(self, origin, pending):
+		""" Run a notification whose call completes later to its end.
+		"""
+		handler = lambda error: self.bus.handleLocalException(origin, error)
+		wrapFutureErrors(handler, async(pending))
+	
 	def receiveReply(self, origin, inStream):
 		""" Process a response to a function evaluation.
 		
@@ -326,7 +792,7 @@ class Connection:
 		# Apply to the stream to generate a new stream
 		filteredStream = io.BytesIO()
 		filterElement.transcode(inStream, filteredStream)
-		filteredStream.seek(0)
+		filteredStream = ReadBuffer(filteredStream.getvalue())
 		
 		self.handleReceived(origin, filteredStream)
 	
@@ -344,6 +810,503 @@ class Connection:
 		                                  filterElementRemoteRef)
 		self.handleReceived(subOrigin, inStream)
 	
+	##
+	# Batched calls
+	##
+	
+	def batch(self, route, timeout = None):
+		""" Start a Batch of evaluations to be sent over route together.
+		"""
+		return Batch(self, route, timeout)
+	
+	def receiveBatch(self, origin, inStream):
+		""" Process a batch of evaluations, answered by a single reply.
+		
+		    A batch consists of a message ID, the priority class in which it
+		    was sent and a count, followed by that many calls, each prefixed
+		    by its length. Each call is an evaluation without a message ID of
+		    its own, in either the Reference or the TransverseID form. The
+		    calls are all made at once and the reply, which holds the outcome
+		    of each call in turn, is sent in the class of the batch once every
+		    one of them has completed. A call that fails fails alone.
+		"""
+		# Strip out the message ID for response tagging
+		messageID = MessageID.deserialize(inStream)
+		
+		# Nobody is waiting for the reply if the deadline has passed
+		if self.deadlinePassed():
+			return
+		
+		try:
+			priority = UInt8.deserialize(inStream)
+			if priority > headers.PRIORITY_BULK:
+				raise(DecodingError("Unrecognized priority class %d"%priority))
+			count = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			
+			# Create the response object, sent in the class of the batch
+			outStream = origin.getOutputBuffer(priority)
+			outStream.write(headers.HEADER_REPLY)
+			MessageID.serialize(messageID, outStream)
+			
+			# Make every call, replying now unless some complete later
+			results = []
+			for _ in range(count):
+				size = UInt32.deserialize(inStream)
+				results.append(self.executeBatchCall(origin,
+				                                     inStream.split(size)))
+			if all(pending is None for _, pending in results):
+				self.writeBatchReply(results, outStream)
+				outStream.commit()
+			else:
+				pending = self.completeBatch(origin, results, outStream)
+				self.replyLater(origin, messageID, pending, outStream)
+		
+		except Exception as te:
+			self.handleIncomingMessageError(origin, messageID, te)
+	
+	def executeBatchCall(self, origin, inStream):
+		""" Make a single call of a batch.
+		
+		    Returns the buffer holding the outcome of the call and the task
+		    completing it, if it completes later, or else None.
+		"""
+		entryOut = io.BytesIO()
+		entryOut.write(ENTRY_RETURN)
+		try:
+			header = inStream.read(1)
+			if header == headers.HEADER_EVAL_TRANS:
+				transverseID = TransverseID.deserialize(inStream)
+				call = self.transverseIDToCall(transverseID)
+				Reference.serialize(self.pinnedReference(call), entryOut)
+			elif header == headers.HEADER_EVAL:
+				call = self.deserializeObject(inStream, ExposedCall)
+			else:
+				raise(DecodingError("Unrecognized batched call %s"%header))
+			pending = self.executeCall(call, inStream, entryOut)
+		except Exception as te:
+			return self.batchCallError(origin, te), None
+		
+		# Calls completing later run alongside each other
+		if pending is not None:
+			pending = async(pending)
+		return entryOut, pending
+	
+	def batchCallError(self, origin, error):
+		""" Produce the outcome of a batched call that raised error.
+		"""
+		entryOut = io.BytesIO()
+		if isinstance(error, TransverseException):
+			entryOut.write(ENTRY_ERROR)
+			error.serializeConstructor(self, entryOut)
+		else:
+			self.bus.handleLocalException(origin, error)
+			entryOut.write(ENTRY_FAILED)
+		return entryOut
+	
+	@asynchronous
+	def completeBatch(self, origin, results, outStream):
+		try:
+			for index, (entryOut, pending) in enumerate(results):
+				if pending is None:
+					continue
+				try:
+					yield from pending
+				except CancelledError:
+					raise
+				except Exception as te:
+					results[index] = self.batchCallError(origin, te), None
+		except (CancelledError, GeneratorExit):
+			# The whole batch was cancelled, and every call still running with
+			# it, whether the cancellation was thrown in or the task closed
+			for _, pending in results:
+				if pending is not None:
+					cancel(pending)
+			raise
+		self.writeBatchReply(results, outStream)
+	
+	def writeBatchReply(self, results, outStream):
+		for entryOut, _ in results:
+			data = entryOut.getvalue()
+			UInt32.serialize(len(data), outStream)
+			outStream.write(data)
+	
+	def transmitBatch(self, destination, entries, calls, timeout = None,
+	                  priority = headers.PRIORITY_NORMAL):
+		""" Send the calls of a Batch and fan the reply out to their Futures.
+		
+		    calls holds, for each call, the TransverseID it was sent by, if
+		    it was not yet resolved, the function decoding its return and its
+		    Future. If the batch as a whole fails, so does every call. Once
+		    the Future of every call has been cancelled, the batch is
+		    cancelled at the callee and its message ID freed. The batch is
+		    sent in the priority class given by priority, which it carries so
+		    that the callee replies in the same class.
+		"""
+		def reply(inStream):
+			for transverseID, decode, fut in calls:
+				size = UInt32.deserialize(inStream)
+				self.resolveBatchCall(destination, inStream.split(size),
+				                      transverseID, decode, fut)
+		
+		def error(error):
+			for _, _, fut in calls:
+				fut.setError(error)
+		
+		messageID = self.bus.waitForReply(reply, error, destination, timeout)
+		
+		remaining = [len(calls)]
+		def cancelled():
+			remaining[0] -= 1
+			if remaining[0] == 0:
+				self.cancelCall(destination, messageID, priority)
+		for _, _, fut in calls:
+			whenCancelled(fut, cancelled)
+		
+		outStream = self.openOutputBuffer(destination, timeout, priority)
+		outStream.write(headers.HEADER_BATCH)
+		MessageID.serialize(messageID, outStream)
+		UInt8.serialize(priority, outStream)
+		SerialID.serialize(SerialID.integerToBytes(len(calls)), outStream)
+		outStream.write(entries)
+		outStream.commit()
+	
+	def resolveBatchCall(self, destination, inStream, transverseID, decode,
+	                     fut):
+		""" Resolve the Future of a batched call from its part of the reply.
+		"""
+		try:
+			outcome = inStream.read(1)
+			if outcome == ENTRY_RETURN:
+				if transverseID is not None:
+					resolved = Reference.deserialize(inStream)
+					self.cacheTransverse(destination, transverseID, resolved)
+				fut.setResult(decode(inStream))
+			elif outcome == ENTRY_ERROR:
+				errorID = TransverseID.deserialize(inStream)
+				obj = self.transverseIDToObject(errorID)
+				fut.setError(obj.handleFetch(self, inStream))
+			else:
+				fut.setError(BatchCallError())
+		except Exception as e:
+			fut.setError(e)
+	
+	##
+	# Streamed calls
+	##
+	
+	def receiveStream(self, origin, inStream):
+		""" Process a streaming call request.
+		
+		    A streaming call request consists of a message ID, the TransverseID
+		    of the call and the window of the caller, followed by the serialized
+		    arguments. Each item produced by the call is sent in a STREAM_ITEM
+		    message of its own, while the caller has credit for it, and the
+		    end of the stream is marked by an empty reply.
+		"""
+		# Strip out the message ID for response tagging
+		messageID = MessageID.deserialize(inStream)
+		
+		# Nobody is waiting for the stream if the deadline has passed
+		if self.deadlinePassed():
+			return
+		
+		try:
+			transverseID = TransverseID.deserialize(inStream)
+			call = self.transverseIDToCall(transverseID)
+			window = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			
+			# Make the call to obtain the items, which are sent as they come
+			items = self.executeCall(call, inStream)
+			send = lambda item: self.transmitStreamItem(origin, messageID,
+			                                            call, item)
+			pump = StreamPump(items, send, window)
+		
+		except Exception as te:
+			self.handleIncomingMessageError(origin, messageID, te)
+			return
+		
+		self.outgoingStreams[origin, messageID] = pump
+		async(self.runStream(origin, messageID, pump, call.priority))
+	
+	@asynchronous
+	def runStream(self, origin, messageID, pump, priority):
+		try:
+			finished = yield from pump.run()
+		except Exception as te:
+			self.handleIncomingMessageError(origin, messageID, te)
+			return
+		finally:
+			self.outgoingStreams.pop((origin, messageID), None)
+		
+		# Mark the end of the stream, after the items in the same class
+		if finished:
+			outStream = origin.getOutputBuffer(priority)
+			outStream.write(headers.HEADER_REPLY)
+			MessageID.serialize(messageID, outStream)
+			outStream.commit()
+	
+	def receiveStreamItem(self, origin, inStream):
+		""" Process an item of the stream of a streaming call made here.
+		
+		    The item consists of the message ID of the streaming call followed
+		    by the serialized item. Items arriving after the stream has been
+		    closed or cancelled here are dropped.
+		"""
+		messageID = MessageID.deserialize(inStream)
+		entry = self.incomingStreams.get(messageID)
+		if entry is None:
+			return
+		stream, timeout = entry
+		self.bus.extendMessageID(messageID, origin, timeout)
+		stream.receive(inStream)
+	
+	def receiveStreamCredit(self, origin, inStream):
+		""" Process a grant of credit to a stream being sent from here.
+		"""
+		messageID = MessageID.deserialize(inStream)
+		count = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+		pump = self.outgoingStreams.get((origin, messageID))
+		if pump is not None:
+			pump.addCredit(count)
+	
+	def receiveUpload(self, origin, inStream):
+		""" Process an upload request.
+		
+		    An upload request consists of a message ID and the TransverseID of
+		    the call, followed by the serialized arguments. The items follow
+		    in UPLOAD_ITEM messages of their own, as this end grants credit for
+		    them, up to an UPLOAD_END message. The call is made at once, with
+		    an ItemStream of the items, and its return sent as for an EVAL.
+		"""
+		# Strip out the message ID for response tagging
+		messageID = MessageID.deserialize(inStream)
+		
+		# Nobody is waiting for the reply if the deadline has passed
+		if self.deadlinePassed():
+			return
+		
+		key = origin, messageID
+		try:
+			transverseID = TransverseID.deserialize(inStream)
+			call = self.transverseIDToCall(transverseID)
+			
+			# Receive the items into an ItemStream, granting the initial credit
+			grant = lambda count: self.transmitCredit(
+			                   origin, headers.HEADER_UPLOAD_CREDIT, messageID,
+			                   count)
+			decode = lambda itemStream: call.deserializeItem(self, itemStream)
+			items = ItemStream(self.uploadWindow, grant, decode)
+			self.incomingUploads[key] = items
+			grant(self.uploadWindow)
+			
+			# Create the response object, sent in the class of the call
+			outStream = origin.getOutputBuffer(call.priority)
+			outStream.write(headers.HEADER_REPLY)
+			MessageID.serialize(messageID, outStream)
+			
+			# Make the call, replying now unless the call completes later
+			pending = self.executeCall(call, inStream, items, outStream)
+			if pending is None:
+				self.incomingUploads.pop(key, None)
+				outStream.commit()
+			else:
+				self.replyLater(origin, messageID,
+				                self.closeUpload(key, pending), outStream)
+		
+		except Exception as te:
+			self.incomingUploads.pop(key, None)
+			self.handleIncomingMessageError(origin, messageID, te)
+	
+	@asynchronous
+	def closeUpload(self, key, pending):
+		try:
+			yield from pending
+		finally:
+			self.incomingUploads.pop(key, None)
+	
+	def receiveUploadItem(self, origin, inStream):
+		""" Process an item of an upload made to here.
+		
+		    The item consists of the message ID of the upload followed by the
+		    serialized item. Items arriving after the call has returned are
+		    dropped.
+		"""
+		messageID = MessageID.deserialize(inStream)
+		items = self.incomingUploads.get((origin, messageID))
+		if items is not None:
+			items.receive(inStream)
+	
+	def receiveUploadEnd(self, origin, inStream):
+		""" Process the end of the items of an upload made to here.
+		"""
+		messageID = MessageID.deserialize(inStream)
+		items = self.incomingUploads.pop((origin, messageID), None)
+		if items is not None:
+			items.finish()
+	
+	def receiveUploadCredit(self, origin, inStream):
+		""" Process a grant of credit to an upload being sent from here.
+		
+		    Credit for an upload that has already finished is dropped.
+		"""
+		messageID = MessageID.deserialize(inStream)
+		count = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+		entry = self.outgoingUploads.get(messageID)
+		if entry is None:
+			return
+		pump, timeout = entry
+		self.bus.extendMessageID(messageID, origin, timeout)
+		pump.addCredit(count)
+	
+	def receiveCancel(self, origin, inStream):
+		""" Process the cancellation of a call made to here.
+		
+		    A cancellation consists of the message ID of the call. Whatever
+		    remains of the call is abandoned and nothing more is sent for it,
+		    whether a reply or the rest of a stream. Cancelling a call that
+		    has already completed does nothing.
+		"""
+		messageID = MessageID.deserialize(inStream)
+		key = origin, messageID
+		
+		pump = self.outgoingStreams.pop(key, None)
+		if pump is not None:
+			pump.close()
+		items = self.incomingUploads.pop(key, None)
+		if items is not None:
+			items.fail(CancelledError())
+		task = self.runningCalls.pop(key, None)
+		if task is not None:
+			cancel(task)
+	
+	def transceiveStream(self, destination, transverseID, decode,
+	                     timeout = None, window = None,
+	                     priority = headers.PRIORITY_NORMAL):
+		""" Make a streaming call, by TransverseID, and receive its items.
+		
+		    Returns the output stream, for the arguments to be serialized to
+		    and committed, and the ItemStream through which the items, each
+		    deserialized by decode, are taken. The timeout applies to each
+		    wait for an item rather than to the whole stream, and window sets
+		    the credit granted to the callee, by default streamWindow items.
+		"""
+		if window is None:
+			window = self.streamWindow
+		
+		# Grant credit back to the callee as items are taken
+		def grant(count):
+			self.bus.extendMessageID(messageID, destination, timeout)
+			self.transmitCredit(destination, headers.HEADER_STREAM_CREDIT,
+			                    messageID, count)
+		abandon = lambda: self.cancelCall(destination, messageID, priority)
+		stream = ItemStream(window, grant, decode, abandon)
+		
+		# The stream ends with the reply, or with an error
+		def done(inStream):
+			self.incomingStreams.pop(messageID, None)
+			stream.finish()
+		def error(error):
+			self.incomingStreams.pop(messageID, None)
+			stream.fail(error)
+		
+		messageID = self.bus.waitForReply(done, error, destination, timeout)
+		self.incomingStreams[messageID] = stream, timeout
+		
+		outStream = self.openOutputBuffer(destination, timeout, priority)
+		outStream.write(headers.HEADER_STREAM)
+		MessageID.serialize(messageID, outStream)
+		TransverseID.serialize(transverseID, outStream)
+		SerialID.serialize(SerialID.integerToBytes(window), outStream)
+		
+		return outStream, stream
+	
+	def transceiveUpload(self, destination, transverseID, items,
+	                     serializeItem, timeout = None,
+	                     priority = headers.PRIORITY_NORMAL):
+		""" Make an upload, by TransverseID, and retrieve the reply.
+		
+		    Returns the output stream, for the arguments to be serialized to
+		    and committed, and the Future of the reply. Each of the items is
+		    serialized by serializeItem and sent as the callee grants credit.
+		    The timeout applies to each wait for credit, and to the wait for
+		    the reply, rather than to the whole upload. The items are sent in
+		    the same priority class as the call.
+		"""
+		send = lambda item: self.transmitUploadItem(destination, messageID,
+		                                            serializeItem, item,
+		                                            priority)
+		pump = StreamPump(items, send)
+		fut = Future()
+		
+		# The callee may reply before it has taken every item
+		def done(inStream):
+			self.outgoingUploads.pop(messageID, None)
+			pump.close()
+			fut.setResult(inStream)
+		def error(error):
+			self.outgoingUploads.pop(messageID, None)
+			pump.close()
+			fut.setError(error)
+		
+		messageID = self.bus.waitForReply(done, error, destination, timeout)
+		self.outgoingUploads[messageID] = pump, timeout
+		whenCancelled(fut, lambda: self.cancelCall(destination, messageID,
+		                                           priority))
+		
+		outStream = self.openOutputBuffer(destination, timeout, priority)
+		outStream.write(headers.HEADER_UPLOAD)
+		MessageID.serialize(messageID, outStream)
+		TransverseID.serialize(transverseID, outStream)
+		
+		async(self.runUpload(destination, messageID, pump, priority))
+		return outStream, fut
+	
+	@asynchronous
+	def runUpload(self, destination, messageID, pump, priority):
+		try:
+			finished = yield from pump.run()
+		except Exception as error:
+			# The items could not be drawn, so the upload fails here and is
+			# cancelled at the callee.
+			try:
+				_, errorCall = self.bus.resolveMessageID(messageID, destination)
+			except Exception:
+				return
+			self.transmitCancel(destination, messageID, priority)
+			errorCall(error)
+			return
+		
+		# Mark the end of the items
+		if finished:
+			outStream = destination.getOutputBuffer(priority)
+			outStream.write(headers.HEADER_UPLOAD_END)
+			MessageID.serialize(messageID, outStream)
+			outStream.commit()
+	
+	def transmitStreamItem(self, destination, messageID, call, item):
+		outStream = destination.getOutputBuffer(call.priority)
+		outStream.write(headers.HEADER_STREAM_ITEM)
+		MessageID.serialize(messageID, outStream)
+		call.serializeItem(self, item, outStream)
+		outStream.commit()
+	
+	def transmitUploadItem(self, destination, messageID, serializeItem, item,
+	                       priority = headers.PRIORITY_NORMAL):
+		outStream = destination.getOutputBuffer(priority)
+		outStream.write(headers.HEADER_UPLOAD_ITEM)
+		MessageID.serialize(messageID, outStream)
+		serializeItem(item, outStream)
+		outStream.commit()
+	
+	def transmitCredit(self, destination, header, messageID, count):
+		""" Grant credit for count more items to the producer of a stream.
+		"""
+		outStream = destination.getOutputBuffer(headers.PRIORITY_CONTROL)
+		outStream.write(header)
+		MessageID.serialize(messageID, outStream)
+		SerialID.serialize(SerialID.integerToBytes(count), outStream)
+		outStream.commit()
+	
 	##
 	# Outgoing message routing
 	##
@@ -358,18 +1321,16 @@ class Connection:
 		"""
 		fut = Future()
 		
-		cacheID = destination.transport.remoteBusID, transverseID
-		try:
-			fut.setResult(self.cachedTransverse[cacheID])	
+		cached = self.getCachedTransverse(destination, transverseID)
+		if cached is not None:
+			fut.setResult(cached)
 			return fut
-		except KeyError:
-			pass
 		
 		# Create the response listener for the remote resolution.
 		def reply(inStream):
 			try:
 				resolved = Reference.deserialize(inStream)
-				self.cachedTransverse[cacheID] = resolved
+				self.cacheTransverse(destination, transverseID, resolved)
 				fut.setResult(resolved)
 			except Exception as e:
 				fut.setError(e)
@@ -378,7 +1339,7 @@ class Connection:
 		                                  destination)
 		
 		# Format the outgoing message to the wire
-		outStream = destination.getOutputBuffer()
+		outStream = destination.getOutputBuffer(headers.PRIORITY_CONTROL)
 		outStream.write(headers.HEADER_RESOLVE)
 		MessageID.serialize(messageID, outStream)
 		TransverseID.serialize(transverseID, outStream)
@@ -386,35 +1347,230 @@ class Connection:
 		
 		return fut
 	
-	def transmitNotify(self, destination, callID):
+	def transceiveResolveBulk(self, destination, transverseIDs):
+		""" Request the remote References for several TransverseIDs at once.
+		
+		    Those TransverseIDs which are not already cached are sent in a
+		    single bulk resolution request and the resolved References are
+		    cached as they arrive. The returned Future gives the References in
+		    the order requested, with None for any that the remote end could
+		    not resolve.
+		"""
+		fut = Future()
+		resolved = [self.getCachedTransverse(destination, transverseID)
+		            for transverseID in transverseIDs]
+		missing = [transverseID
+		           for transverseID, reference in zip(transverseIDs, resolved)
+		           if reference is None]
+		if not missing:
+			fut.setResult(resolved)
+			return fut
+		
+		# Create the response listener for the remote resolution.
+		def reply(inStream):
+			try:
+				answers = {}
+				for transverseID in missing:
+					if inStream.read(1) == b"\x01":
+						reference = Reference.deserialize(inStream)
+						self.cacheTransverse(destination, transverseID,
+						                     reference)
+						answers[transverseID] = reference
+				fut.setResult([answers.get(transverseID, reference)
+				               for transverseID, reference
+				               in zip(transverseIDs, resolved)])
+			except Exception as e:
+				fut.setError(e)
+		
+		messageID = self.bus.waitForReply(reply, fut.setError,
+		                                  destination)
+		
+		# Format the outgoing message to the wire
+		outStream = destination.getOutputBuffer(headers.PRIORITY_CONTROL)
+		outStream.write(headers.HEADER_RESOLVE_BULK)
+		MessageID.serialize(messageID, outStream)
+		SerialID.serialize(SerialID.integerToBytes(len(missing)), outStream)
+		for transverseID in missing:
+			TransverseID.serialize(transverseID, outStream)
+		outStream.commit()
+		
+		return fut
+	
+	def getCachedTransverse(self, destination, transverseID):
+		""" Retrieve a previously resolved Reference for a TransverseID.
+		
+		    Returns None if the TransverseID has not yet been resolved on the
+		    remote end of the destination Route.
+		"""
+		busID = destination.transport.remoteBusID
+		return self.cachedTransverse.get(busID, transverseID)
+	
+	def cacheTransverse(self, destination, transverseID, reference):
+		""" Cache the Reference a TransverseID resolved to on a Route.
+		
+		    The cache is registered with the Transport of the Route, so that
+		    its entries for the remote Bus are dropped if the Transport is
+		    unregistered or lost.
+		"""
+		transport = destination.transport
+		transport.resolutionCaches.add(self.cachedTransverse)
+		self.cachedTransverse.put(transport.remoteBusID, transverseID,
+		                          reference)
+	
+	def openOutputBuffer(self, destination, timeout = None,
+	                     priority = headers.PRIORITY_NORMAL):
+		""" Get an output buffer on destination, under an optional timeout.
+		
+		    Where a timeout (in seconds) is supplied, the message is prefixed
+		    with a HEADER_TIME message so that the remote end can drop it once
+		    the caller has stopped waiting. The message is sent in the priority
+		    class given by priority.
+		"""
+		outStream = destination.getOutputBuffer(priority)
+		if timeout is not None:
+			budget = min(max(int(timeout * 1000), 0), 0xFFFFFFFF)
+			outStream.write(headers.HEADER_TIME)
+			UInt32.serialize(budget, outStream)
+		return outStream
+	
+	def transmitNotifyTransverse(self, destination, transverseID,
+	                             timeout = None,
+	                             priority = headers.PRIORITY_NORMAL):
+		""" Call a remote function, by TransverseID, without any response.
+		
+		    If the TransverseID has already been resolved then the notification
+		    is sent in the Reference form. Otherwise, the TransverseID itself is
+		    sent, saving a resolution round-trip.
+		"""
+		callID = self.getCachedTransverse(destination, transverseID)
+		if callID is not None:
+			return self.transmitNotify(destination, callID, timeout, priority)
+		
+		outStream = self.openOutputBuffer(destination, timeout, priority)
+		outStream.write(headers.HEADER_NOTIFY_TRANS)
+		TransverseID.serialize(transverseID, outStream)
+		return outStream
+	
+	def transceiveEvalTransverse(self, destination, transverseID,
+	                             timeout = None,
+	                             priority = headers.PRIORITY_NORMAL):
+		""" Call a remote function, by TransverseID, and retrieve the reply.
+		
+		    If the TransverseID has already been resolved then the evaluation
+		    is sent in the Reference form. Otherwise, the TransverseID itself is
+		    sent and the remote end prepends the resolved Reference to the
+		    reply. This is cached before the reply is passed on, so that
+		    subsequent calls use the Reference form.
+		"""
+		callID = self.getCachedTransverse(destination, transverseID)
+		if callID is not None:
+			return self.transceiveEval(destination, callID, timeout,
+			                           priority)
+		
+		fut = Future()
+		
+		# Strip the resolved Reference from the reply before passing it on.
+		def reply(inStream):
+			try:
+				resolved = Reference.deserialize(inStream)
+				self.cacheTransverse(destination, transverseID, resolved)
+				fut.setResult(inStream)
+			except Exception as e:
+				fut.setError(e)
+		
+		messageID = self.bus.waitForReply(reply, fut.setError, destination,
+		                                  timeout)
+		whenCancelled(fut, lambda: self.cancelCall(destination, messageID,
+		                                           priority))
+		
+		outStream = self.openOutputBuffer(destination, timeout, priority)
+		outStream.write(headers.HEADER_EVAL_TRANS)
+		MessageID.serialize(messageID, outStream)
+		TransverseID.serialize(transverseID, outStream)
+		
+		return outStream, fut
+	
+	def transmitNotify(self, destination, callID, timeout = None,
+	                   priority = headers.PRIORITY_NORMAL):
 		""" Call a remote function without any response.
 		
 		    This function prepares an output stream connected to the destination
 		    Route provided. The message type will be tagged as a notification so
 		    no reply is expected.
 		"""
-		outStream = destination.getOutputBuffer()
+		outStream = self.openOutputBuffer(destination, timeout, priority)
 		outStream.write(headers.HEADER_NOTIFY)
 		Reference.serialize(callID, outStream)
 		return outStream
 	
-	def transceiveEval(self, destination, callID):
+	def transceiveEval(self, destination, callID, timeout = None,
+	                   priority = headers.PRIORITY_NORMAL):
 		""" Call a remote function and retrieve the reply.
 		
 		    transceiveEval is responsible for sending out the EVAL message and
-		    then waiting for the response from the server. 
+		    then waiting for the response from the server. If a timeout is
+		    given, it bounds both the local wait and the remote execution.
 		"""
 		fut = Future()
 		messageID = self.bus.waitForReply(fut.setResult, fut.setError,
-		                                  destination)
+		                                  destination, timeout)
+		whenCancelled(fut, lambda: self.cancelCall(destination, messageID,
+		                                           priority))
 		
-		outStream = destination.getOutputBuffer()
+		outStream = self.openOutputBuffer(destination, timeout, priority)
 		outStream.write(headers.HEADER_EVAL)
 		MessageID.serialize(messageID, outStream)
 		Reference.serialize(callID, outStream)
 		
 		return outStream, fut
 	
+	def cancelCall(self, destination, messageID,
+	               priority = headers.PRIORITY_NORMAL):
+		""" Abandon a call made from here, and cancel it at the callee.
+		
+		    The message ID is freed on the Bus at once, so any reply that
+		    still arrives is rejected, and any stream flowing to or from the
+		    call is stopped. The cancellation is sent in the priority class of
+		    the call, so that it cannot overtake the call itself.
+		"""
+		if not self.bus.cancelMessageID(messageID):
+			return
+		self.incomingStreams.pop(messageID, None)
+		upload = self.outgoingUploads.pop(messageID, None)
+		if upload is not None:
+			upload[0].close()
+		self.transmitCancel(destination, messageID, priority)
+	
+	def transmitCancel(self, destination, messageID, priority):
+		try:
+			outStream = destination.getOutputBuffer(priority)
+		except Exception:
+			# The Route is gone, and the call with it
+			return
+		outStream.write(headers.HEADER_CANCEL)
+		MessageID.serialize(messageID, outStream)
+		outStream.commit()
+	
+	def transmitRelease(self, destination, releases):
+		""" Release References to remote objects held over a Route.
+		
+		    releases maps each object ID to the number of References to it
+		    being released, or to zero to renew its lease. Releases are sent
+		    as bulk, behind any message still queued that refers to the
+		    objects released.
+		"""
+		try:
+			outStream = destination.getOutputBuffer(headers.PRIORITY_BULK)
+		except Exception:
+			# The Route is gone, and any remote objects held over it with it
+			return
+		outStream.write(headers.HEADER_RELEASE)
+		SerialID.serialize(SerialID.integerToBytes(len(releases)), outStream)
+		for objectID, count in releases.items():
+			SerialID.serialize(objectID, outStream)
+			SerialID.serialize(SerialID.integerToBytes(count), outStream)
+		outStream.commit()
+	
 	def transmitMessageError(self, destination, messageID, error):
 		""" Transmit an exception to a destination as a message response.
 		
@@ -48,6 +48,7 @@ class BusMaster(PassByReference):
 @implements(OpenTransport)
 class OpenTransportProxy(ObjectProxy):
 	class accept(MethodNotificationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -57,6 +58,7 @@ class OpenTransportProxy(ObjectProxy):
 	accept = accept(b"OpenTransport::accept")
 	
 	class connect(MethodNotificationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -70,6 +72,7 @@ class OpenTransportProxy(ObjectProxy):
 @implements(OpenRoute)
 class OpenRouteProxy(ObjectProxy):
 	class supplyEndpointBus(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -82,6 +85,7 @@ class OpenRouteProxy(ObjectProxy):
 	supplyEndpointBus = supplyEndpointBus(b"OpenRoute::supplyEndpointBus")
 	
 	class completeRoute(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -94,6 +98,7 @@ class OpenRouteProxy(ObjectProxy):
 	completeRoute = completeRoute(b"OpenRoute::completeRoute")
 	
 	class getConnectionID(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -109,6 +114,7 @@ class OpenRouteProxy(ObjectProxy):
 @implements(ServiceOffering)
 class ServiceOfferingProxy(ObjectProxy):
 	class request(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -124,6 +130,7 @@ class ServiceOfferingProxy(ObjectProxy):
 @implements(BusMaster)
 class BusMasterProxy(ObjectProxy):
 	class getNeonateID(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -135,6 +142,7 @@ class BusMasterProxy(ObjectProxy):
 	getNeonateID = getNeonateID(b"BusMaster::getNeonateID")
 	
 	class offer(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -147,6 +155,7 @@ class BusMasterProxy(ObjectProxy):
 	offer = offer(b"BusMaster::offer")
 	
 	class discover(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -159,6 +168,7 @@ class BusMasterProxy(ObjectProxy):
 	discover = discover(b"BusMaster::discover")
 	
 	class connect(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -171,6 +181,7 @@ class BusMasterProxy(ObjectProxy):
 	connect = connect(b"BusMaster::connect")
 	
 	class requestConnection(MethodNotificationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -180,6 +191,7 @@ class BusMasterProxy(ObjectProxy):
 	requestConnection = requestConnection(b"BusMaster::requestConnection")
 	
 	class registerServer(MethodEvaluationProxy):
+		priority = PRIORITY_CONTROL
 		@staticmethod
 		def serializeArguments(cxn, inst, args, outStream):
 			Reference.serialize(inst.reference, outStream)
@@ -194,6 +206,7 @@ class BusMasterProxy(ObjectProxy):
 
 
 class getBusMasterProxy(EvaluationProxy):
+	priority = PRIORITY_CONTROL
 	@staticmethod
 	def serializeArguments(cxn, args, outStream):
 		pass
@@ -206,19 +219,21 @@ class getBusMasterProxy(EvaluationProxy):
 class OpenTransportExposed(ExposedObject):
 	class accept(ExposedCall):
 		transverseID = b"OpenTransport::accept"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream):
 			__self__ = cxn.deserializeObject(inStream, OpenTransport)
 			arg0 = cxn.deserializeObject(inStream, TransportServer)
 			arg1 = TransverseID.deserialize(inStream)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, None)
 	
 	class connect(ExposedCall):
 		transverseID = b"OpenTransport::connect"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream):
 			__self__ = cxn.deserializeObject(inStream, OpenTransport)
 			arg0 = URI.deserialize(inStream)
 			arg1 = TransverseID.deserialize(inStream)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, None)
 	
 	exposedMethods = {
 		"accept" : accept,
@@ -229,25 +244,32 @@ class OpenTransportExposed(ExposedObject):
 class OpenRouteExposed(ExposedObject):
 	class supplyEndpointBus(ExposedCall):
 		transverseID = b"OpenRoute::supplyEndpointBus"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, OpenRoute)
 			arg0 = BusID.deserialize(inStream)
-			ret0 = self.call(__self__, arg0)
+			return self.complete(self.call(__self__, arg0), cxn, outStream)
+		def serializeReturn(self, cxn, ret, outStream):
+			ret0 = ret
 			RouteToken.serialize(ret0, outStream)
 	
 	class completeRoute(ExposedCall):
 		transverseID = b"OpenRoute::completeRoute"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, OpenRoute)
 			arg0 = RouteToken.deserialize(inStream)
 			arg1 = ConnectionID.deserialize(inStream)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, outStream)
 	
 	class getConnectionID(ExposedCall):
 		transverseID = b"OpenRoute::getConnectionID"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, OpenRoute)
-			ret0 = self.call(__self__)
+			return self.complete(self.call(__self__), cxn, outStream)
+		def serializeReturn(self, cxn, ret, outStream):
+			ret0 = ret
 			ConnectionID.serialize(ret0, outStream)
 	
 	exposedMethods = {
@@ -260,9 +282,12 @@ class OpenRouteExposed(ExposedObject):
 class ServiceOfferingExposed(ExposedObject):
 	class request(ExposedCall):
 		transverseID = b"ServiceOffering::request"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, ServiceOffering)
-			ret0 = self.call(__self__)
+			return self.complete(self.call(__self__), cxn, outStream)
+		def serializeReturn(self, cxn, ret, outStream):
+			ret0 = ret
 			cxn.serializeObject(ret0, outStream)
 	
 	exposedMethods = {
@@ -273,50 +298,60 @@ class ServiceOfferingExposed(ExposedObject):
 class BusMasterExposed(ExposedObject):
 	class getNeonateID(ExposedCall):
 		transverseID = b"BusMaster::getNeonateID"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, BusMaster)
-			ret0 = self.call(__self__)
+			return self.complete(self.call(__self__), cxn, outStream)
+		def serializeReturn(self, cxn, ret, outStream):
+			ret0 = ret
 			ConnectionID.serialize(ret0, outStream)
 	
 	class offer(ExposedCall):
 		transverseID = b"BusMaster::offer"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, BusMaster)
 			arg0 = cxn.deserializeObject(inStream, ServiceOffering)
 			arg1 = TransverseID.deserialize(inStream)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, outStream)
 	
 	class discover(ExposedCall):
 		transverseID = b"BusMaster::discover"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, BusMaster)
 			arg0 = TransverseID.deserialize(inStream)
-			ret0 = self.call(__self__, arg0)
+			return self.complete(self.call(__self__, arg0), cxn, outStream)
+		def serializeReturn(self, cxn, ret, outStream):
+			ret0 = ret
 			cxn.serializeObject(ret0, outStream)
 	
 	class connect(ExposedCall):
 		transverseID = b"BusMaster::connect"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, BusMaster)
 			arg0 = cxn.deserializeObject(inStream, OpenRoute)
 			arg1 = cxn.deserializeObject(inStream, ProspectiveRoute)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, outStream)
 	
 	class requestConnection(ExposedCall):
 		transverseID = b"BusMaster::requestConnection"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream):
 			__self__ = cxn.deserializeObject(inStream, BusMaster)
 			arg0 = cxn.deserializeObject(inStream, OpenTransport)
 			arg1 = BusID.deserialize(inStream)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, None)
 	
 	class registerServer(ExposedCall):
 		transverseID = b"BusMaster::registerServer"
+		priority = PRIORITY_CONTROL
 		def __call__(self, cxn, inStream, outStream):
 			__self__ = cxn.deserializeObject(inStream, BusMaster)
 			arg0 = cxn.deserializeObject(inStream, TransportServer)
 			arg1 = URI.deserialize(inStream)
-			self.call(__self__, arg0, arg1)
+			return self.complete(self.call(__self__, arg0, arg1), cxn, outStream)
 	
 	exposedMethods = {
 		"getNeonateID" : getNeonateID,
@@ -330,9 +365,12 @@ class BusMasterExposed(ExposedObject):
 
 class getBusMasterExposed(ExposedCall):
 	transverseID = b"::getBusMaster"
+	priority = PRIORITY_CONTROL
 	def __call__(self, cxn, inStream, outStream):
 		arg0 = GetMyConnection.deserialize(cxn, inStream)
-		ret0 = self.call(arg0)
+		return self.complete(self.call(arg0), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
 		cxn.serializeObject(ret0, outStream)
 
 
@@ -5,19 +5,18 @@
     This file implements the Ripley core interface given by core.idl
 """
 
-# External imports
-from unstuck import *
-
 # Local imports
+from .backend import *
 from . import core
 from .core import BusMasterService, BusClientService
+from .interface import isPending
 from .route import *
 from .serialize import *
 
 # Exports
 __all__ = ["TransportServer", "OpenRoute", "OpenTransport", "BusMaster",
            "busMasterService", "busClientService", "BusMasterService",
-           "BusClientService", "ServiceOffering"]
+           "BusClientService", "ServiceOffering", "callCoro"]
 
 @implements(core.TransportServer)
 class TransportServer:
@@ -218,43 +217,54 @@ class BusMaster:
 			fut.setResult(shiboleth)
 			return shiboleth
 	
+	@asynchronous
 	def connect(self, routeA, routeBWrapped):
+		""" Complete a Route between the two OpenRoutes.
+		
+		    Either OpenRoute may be on this Bus or a remote one, so each is
+		    called through callCoro, without blocking the event loop. Both are
+		    supplied their endpoint Bus at once, as a Transport between the
+		    two Busses may have to be opened from both ends.
+		"""
 		routeB = routeBWrapped.remote
 		
 		if isinstance(routeA, ObjectProxy):
-			transportA = routeA.destination.transport
-			transportTokenA = transportA.remoteBusID
+			transportTokenA = routeA.destination.transport.remoteBusID
 		else:
-			transportA = None
 			transportTokenA = self.bus.busID
-		connectionIDA = routeA.getConnectionID()
+		connectionIDA = yield from callCoro(routeA, "getConnectionID")
 		
 		if isinstance(routeB, ObjectProxy):
-			transportB = routeB.destination.transport
-			transportTokenB = transportB.remoteBusID
+			transportTokenB = routeB.destination.transport.remoteBusID
 		else:
-			transportB = None
 			transportTokenB = self.bus.busID
-		connectionIDB = routeB.getConnectionID()
+		connectionIDB = yield from callCoro(routeB, "getConnectionID")
 		
-		if isinstance(routeA, ObjectProxy) and isinstance(routeB, ObjectProxy):
-			localTokenA = routeA.supplyEndpointBus.async(transportTokenB)
-			localTokenB = routeB.supplyEndpointBus.async(transportTokenA)
-			localTokenA = await(localTokenA)
-			localTokenB = await(localTokenB)
-		elif isinstance(routeB, ObjectProxy):
-			localTokenB = routeB.supplyEndpointBus.async(transportTokenA)
-			localTokenA = routeA.supplyEndpointBus(transportTokenB)
-			localTokenB = await(localTokenB)
-		elif isinstance(routeA, ObjectProxy):
-			localTokenA = routeA.supplyEndpointBus.async(transportTokenB)
-			localTokenB = routeB.supplyEndpointBus(transportTokenA)
-			localTokenA = await(localTokenA)
-		else:
-			localTokenA = routeA.supplyEndpointBus(transportTokenB)
-			localTokenB = routeB.supplyEndpointBus(transportTokenA)
-		routeA.completeRoute(localTokenB, connectionIDB)
-		routeB.completeRoute(localTokenA, connectionIDA)
+		localTokenA = async(callCoro(routeA, "supplyEndpointBus",
+		                             transportTokenB))
+		localTokenB = async(callCoro(routeB, "supplyEndpointBus",
+		                             transportTokenA))
+		localTokenA = yield from localTokenA
+		localTokenB = yield from localTokenB
+		yield from callCoro(routeA, "completeRoute", localTokenB, connectionIDB)
+		yield from callCoro(routeB, "completeRoute", localTokenA, connectionIDA)
+
+
+@asynchronous
+def callCoro(target, name, *args):
+	""" Call the method name of target as a coroutine.
+	
+	    The target may be a local object or an ObjectProxy for a remote one.
+	    A remote call is made through its coroutine form, so that the event
+	    loop is not blocked waiting for the reply, and a local call that
+	    returns a coroutine or a Future is waited for.
+	"""
+	if isinstance(target, ObjectProxy):
+		return (yield from getattr(target, name).coro(*args))
+	ret = getattr(target, name)(*args)
+	if isPending(ret):
+		ret = yield from ret
+	return ret
 
 
 def getBusMaster(connection):
@@ -0,0 +1,164 @@
+""" Module: executor
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file defines the executors on which service implementations may be
+    run away from the event loop: `ThreadExecutor', for implementations that
+    block on I/O, and `ProcessExecutor', for those that are CPU-bound. An
+    executor is given to Service.implementation, for the whole service or for
+    single calls, and the replies to calls made through it are committed as
+    the calls complete.
+"""
+
+# System imports
+import concurrent.futures
+import io
+
+# Local imports
+from .backend   import *
+from .interface import ExposedCall, CallDeadline
+from .serialize import ReadBuffer
+
+# Exports
+__all__ = ["ThreadExecutor", "ProcessExecutor"]
+
+
+class ThreadExecutor:
+	""" Runs implementations on a bounded pool of threads.
+	
+	    Arguments are deserialized, and returns serialized, on the event loop
+	    as usual. Only the implementation itself runs on a worker thread, and
+	    its result is handed back to the event loop through a Future. At most
+	    maxWorkers implementations run at once and the rest wait their turn.
+	"""
+	def __init__(self, maxWorkers = 4):
+		self.pool = concurrent.futures.ThreadPoolExecutor(maxWorkers)
+	
+	def expose(self, iface, func):
+		""" Produce the ExposedCall for func that runs on this executor.
+		"""
+		return iface(lambda *args: self.submit(func, *args))
+	
+	exposeMethod = expose
+	
+	def submit(self, func, *args):
+		""" Run func on the pool and return a Future of its result.
+		
+		    The deadline of the call being serviced, if any, is made active on
+		    the worker thread for as long as func runs. This must be called on
+		    the thread running the event loop.
+		"""
+		fut = Future()
+		schedule = threadsafeScheduler()
+		def done(job):
+			if job.cancelled():
+				schedule(fut.setError, concurrent.futures.CancelledError())
+			elif job.exception() is not None:
+				schedule(fut.setError, job.exception())
+			else:
+				schedule(fut.setResult, job.result())
+		job = self.pool.submit(callWithin, CallDeadline.get(), func, *args)
+		job.add_done_callback(done)
+		
+		# A job that has not yet started is dropped if the call is cancelled
+		whenCancelled(fut, job.cancel)
+		return fut
+	
+	def shutdown(self, wait = True):
+		self.pool.shutdown(wait)
+
+
+class ProcessExecutor(ThreadExecutor):
+	""" Runs implementations on a pool of worker processes.
+	
+	    The arguments of each call are passed to the worker in the serialized
+	    form in which they arrived, and the worker deserializes them, makes
+	    the call and passes back the serialized return, which is copied
+	    straight into the reply. The event loop therefore does no more than
+	    move bytes. Since the worker has no Connection, only calls whose
+	    arguments and returns are values can be run this way, and neither
+	    objects nor their methods can. The implementation must be picklable,
+	    as a function defined at module level is, and must return its result
+	    directly.
+	"""
+	def __init__(self, maxWorkers = None):
+		self.pool = concurrent.futures.ProcessPoolExecutor(maxWorkers)
+	
+	def expose(self, iface, func):
+		if needsConnection(iface):
+			raise(TypeError("%s passes objects by reference or needs its "
+			                "Connection, so cannot be run in a ProcessExecutor"
+			                % iface.__name__))
+		return SerializedCall(self, iface, func)
+	
+	def exposeMethod(self, iface, func):
+		raise(TypeError("Objects cannot be run in a ProcessExecutor"))
+
+
+class SerializedCall(ExposedCall):
+	""" An ExposedCall that is made, serialized, in a worker process.
+	"""
+	def __init__(self, executor, iface, func):
+		super().__init__(func)
+		self.executor = executor
+		self.iface = iface
+		self.transverseID = iface.transverseID
+		self.priority = iface.priority
+	
+	def __call__(self, cxn, inStream, outStream = None):
+		job = self.executor.submit(callSerialized, self.iface, self.call,
+		                           inStream.read(), outStream is not None)
+		return self.completeLater(job, cxn, outStream)
+	
+	def serializeReturn(self, cxn, ret, outStream):
+		if outStream is not None:
+			outStream.write(ret)
+
+
+def needsConnection(iface):
+	""" Whether the marshalling of a call reaches its Connection.
+	
+	    Objects passed by reference, and the Connection itself, are only
+	    reached through the Connection the call was made on, which a worker
+	    process does not have. The generated marshalling names them, so the
+	    names it refers to tell whether it would need the Connection.
+	"""
+	for method in (iface.__call__, iface.serializeReturn):
+		code = getattr(method, "__code__", None)
+		if code is not None and not connectionNames.isdisjoint(code.co_names):
+			return True
+	return False
+
+
+# The names through which generated marshalling reaches the Connection
+connectionNames = {"deserializeObject", "serializeObject", "GetMyConnection"}
+
+
+def callWithin(deadline, func, *args):
+	""" Make a call with deadline active, on whichever thread makes it.
+	"""
+	previous = CallDeadline.set(deadline)
+	try:
+		return func(*args)
+	finally:
+		CallDeadline.set(previous)
+
+
+def callSerialized(iface, func, data, hasReturn):
+	""" Make a call from its serialized arguments, in a worker process.
+	
+	    Returns the serialized return of the call, which is empty for a
+	    notification or a nul-return evaluation.
+	"""
+	call = iface(func)
+	inStream = ReadBuffer(data)
+	if hasReturn:
+		outStream = io.BytesIO()
+		pending = call(None, inStream, outStream)
+	else:
+		outStream = None
+		pending = call(None, inStream)
+	if pending is not None:
+		raise(TypeError("Implementations run in a ProcessExecutor must "
+		                "return their results directly"))
+	return b"" if outStream is None else outStream.getvalue()
@@ -0,0 +1,84 @@
+""" Module: exports
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file defines a single class, `ExportTable'. See the comments of that
+    class for further details.
+"""
+
+# System imports
+from collections import deque
+
+# Local imports
+from .serialize import SerialID
+
+# Exports
+__all__ = ["ExportTable"]
+
+# Marks a slot whose object has been removed
+FREE = object()
+
+
+class ExportTable:
+	""" The local objects a Connection has exported, indexed by object ID.
+	
+	    Objects are found by identity, through id(), rather than by hash and
+	    equality, so that lookups never run user-defined __hash__ or __eq__
+	    methods and unhashable objects can be exported too. The table holds
+	    each exported object, so its id() cannot be reused while exported.
+	
+	    Each object ID is the index of the slot holding the object, so IDs
+	    stay small on the wire. Slots are kept in a list, alongside their
+	    encoded IDs, and the slots of removed objects are reused, oldest
+	    first, to delay for as long as possible the reuse of any one ID.
+	"""
+	def __init__(self):
+		self.slots = []
+		self.slotIDs = []
+		self.identities = {}
+		self.freeSlots = deque()
+	
+	def export(self, obj):
+		""" Return the object ID of obj, exporting it if it is not already.
+		"""
+		slot = self.identities.get(id(obj))
+		if slot is None:
+			if self.freeSlots:
+				slot = self.freeSlots.popleft()
+				self.slots[slot] = obj
+			else:
+				slot = len(self.slots)
+				self.slots.append(obj)
+				self.slotIDs.append(SerialID.integerToBytes(slot))
+			self.identities[id(obj)] = slot
+		return self.slotIDs[slot]
+	
+	def lookup(self, objectID):
+		""" Return the object exported under objectID.
+		
+		    Raises KeyError if there is no such object.
+		"""
+		slot = SerialID.bytesToInteger(objectID)
+		if slot >= len(self.slots) or self.slots[slot] is FREE:
+			raise(KeyError(objectID))
+		return self.slots[slot]
+	
+	def remove(self, objectID):
+		""" Remove the object exported under objectID, freeing its slot.
+		"""
+		slot = SerialID.bytesToInteger(objectID)
+		if slot >= len(self.slots) or self.slots[slot] is FREE:
+			return
+		del self.identities[id(self.slots[slot])]
+		self.slots[slot] = FREE
+		self.freeSlots.append(slot)
+	
+	def __contains__(self, objectID):
+		try:
+			self.lookup(objectID)
+		except KeyError:
+			return False
+		return True
+	
+	def __len__(self):
+		return len(self.identities)
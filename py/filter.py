@@ -4,6 +4,7 @@ import io
 # Local imports
 from .serialize import *
 from .route     import *
+from .headers   import PRIORITY_NORMAL
 
 # Exports
 __all__ = ["FilterElement", "FilteredResponseRoute"]
@@ -24,7 +25,7 @@ class FilteredResponseRoute(Route):
 		self.localElement = localElement
 		self.remoteReference = remoteReference
 	
-	def getOutputBuffer(self):
+	def getOutputBuffer(self, priority = PRIORITY_NORMAL):
 		""" Called to get a writeable buffer-filter kludge.
 		
 		    The writeable buffer represents a filtering of data through to an
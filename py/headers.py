@@ -12,3 +12,18 @@ HEADER_FILTER_IN     = b"\x1A"
 HEADER_FILTER_OUT    = b"\x1B"
 HEADER_FILTER_ERR    = b"\x1C"
 HEADER_RELEASE       = b"\x1D"
+HEADER_RESOLVE_BULK  = b"\x1E"
+HEADER_STREAM        = b"\x1F"
+HEADER_STREAM_ITEM   = b"\x20"
+HEADER_STREAM_CREDIT = b"\x21"
+HEADER_UPLOAD        = b"\x22"
+HEADER_UPLOAD_ITEM   = b"\x23"
+HEADER_UPLOAD_END    = b"\x24"
+HEADER_UPLOAD_CREDIT = b"\x25"
+HEADER_CANCEL        = b"\x26"
+HEADER_BATCH         = b"\x27"
+
+# Priority classes of messages, in the order in which Transports send them
+PRIORITY_CONTROL = 0
+PRIORITY_NORMAL  = 1
+PRIORITY_BULK    = 2
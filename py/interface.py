@@ -1,11 +1,166 @@
-from unstuck import *
+# System imports
+import inspect
+import threading
+import time
+import types
+
+# Local imports
+from .backend import *
+from .headers import PRIORITY_CONTROL, PRIORITY_NORMAL, PRIORITY_BULK
+
+
+class CallDeadline:
+	""" The deadline of the evaluation currently being serviced, if any.
+	
+	    A Connection sets the deadline, as a time.monotonic() value, for the
+	    duration of an ExposedCall made under a HEADER_TIME message. Calls made
+	    from within the implementation, without a timeout of their own, inherit
+	    whatever remains of it. The deadline is held per thread, so that an
+	    implementation run on an executor's thread sees only its own.
+	"""
+	local = threading.local()
+	
+	@classmethod
+	def get(cls):
+		""" Return the active deadline of this thread, or None.
+		"""
+		return getattr(cls.local, "active", None)
+	
+	@classmethod
+	def set(cls, deadline):
+		""" Make deadline the active deadline of this thread.
+		
+		    Returns the previously active deadline, for it to be restored.
+		"""
+		previous = cls.get()
+		cls.local.active = deadline
+		return previous
+	
+	@classmethod
+	def inherit(cls, timeout):
+		""" Resolve the timeout for an outgoing call.
+		"""
+		active = cls.get()
+		if timeout is None and active is not None:
+			return active - time.monotonic()
+		return timeout
+	
+	@classmethod
+	def within(cls, deadline, pending):
+		""" Run pending with deadline active around each of its resumes.
+		
+		    An implementation that returned a coroutine runs on long after the
+		    Connection has reset the active deadline, so it is set again each
+		    time the coroutine is resumed and reset each time it suspends.
+		"""
+		if deadline is None or isinstance(pending, Future):
+			return pending
+		if isinstance(pending, types.GeneratorType):
+			steps = pending
+		else:
+			steps = pending.__await__()
+		return cls.resume(deadline, steps)
+	
+	@classmethod
+	def resume(cls, deadline, steps):
+		value = error = None
+		while True:
+			previous = cls.set(deadline)
+			try:
+				if error is None:
+					waiting = steps.send(value)
+				else:
+					waiting = steps.throw(error)
+			except StopIteration as stop:
+				return stop.value
+			finally:
+				cls.set(previous)
+			
+			try:
+				value = yield waiting
+				error = None
+			except GeneratorExit:
+				steps.close()
+				raise
+			except BaseException as thrown:
+				value, error = None, thrown
+
+
+def isPending(value):
+	""" Check whether an implementation returned work yet to complete.
+	
+	    Futures, generator-based coroutines and any other awaitable are taken
+	    to be pending, and their results are returned once they complete.
+	"""
+	return (isinstance(value, (Future, types.GeneratorType))
+	        or inspect.isawaitable(value))
+
+
+def startCall(call):
+	""" Start a call coroutine and return the Future of its result.
+	
+	    Cancelling the Future closes the coroutine, should the backend not
+	    have done so already, so that the call is abandoned and cancelled
+	    at the remote end.
+	"""
+	task = async(call)
+	whenCancelled(task, call.close)
+	return task
+
+
+@asynchronous
+def awaitReply(outStream, responseFuture):
+	""" Commit a call and wait for the reply to it.
+	
+	    If the call is abandoned meanwhile, whether held back by congestion
+	    or waiting for its reply, then its reply Future is cancelled, which
+	    frees its message ID and cancels it at the remote end. So is it if
+	    the call cannot be sent at all.
+	"""
+	try:
+		room = outStream.commit()
+	except Exception:
+		cancel(responseFuture)
+		raise
+	try:
+		if room is not None:
+			yield from room
+		return (yield from responseFuture)
+	except (CancelledError, GeneratorExit):
+		cancel(responseFuture)
+		raise
+
 
 class ExposedCall:
+	# The priority class in which replies to the call are sent
+	priority = PRIORITY_NORMAL
+	
 	def __init__(self, func):
 		self.call = func
 	
 	def __call__(self, *args, **kwargs):
 		raise(NotImplementedError)
+	
+	def complete(self, ret, cxn, outStream):
+		""" Serialize what the implementation returned into outStream.
+		
+		    If the implementation returned a pending result, then nothing is
+		    serialized yet. Instead a coroutine is returned which will wait
+		    for the result and then serialize it, and the caller must commit
+		    the reply only once that coroutine has finished.
+		"""
+		if isPending(ret):
+			pending = CallDeadline.within(CallDeadline.get(), ret)
+			return self.completeLater(pending, cxn, outStream)
+		self.serializeReturn(cxn, ret, outStream)
+	
+	@asynchronous
+	def completeLater(self, pending, cxn, outStream):
+		ret = yield from pending
+		self.serializeReturn(cxn, ret, outStream)
+	
+	def serializeReturn(self, cxn, ret, outStream):
+		pass
 
 
 class ExposedObject:
@@ -19,14 +174,20 @@ class BoundMethod:
 		self.instance = instance
 		self.proxy = proxy
 	
-	def __call__(self, *args):
-		return await(self.proxy.handleCall(self.instance, args))
+	def __call__(self, *args, timeout = None):
+		timeout = CallDeadline.inherit(timeout)
+		return await(self.proxy.handleCall(self.instance, args, timeout))
 	
-	def async(self, *args):
-		return async(self.proxy.handleCall(self.instance, args))
+	def async(self, *args, timeout = None):
+		timeout = CallDeadline.inherit(timeout)
+		return startCall(self.proxy.handleCall(self.instance, args, timeout))
 	
-	def coro(self, *args):
-		return self.proxy.handleCall(self.instance, args)
+	def coro(self, *args, timeout = None):
+		timeout = CallDeadline.inherit(timeout)
+		return self.proxy.handleCall(self.instance, args, timeout)
+	
+	def queue(self, batch, *args):
+		return self.proxy.queueCall(batch, self.instance, args)
 
 
 class BoundCall:
@@ -34,94 +195,218 @@ class BoundCall:
 		self.route = route
 		self.proxy = proxy
 	
-	def __call__(self, *args):
-		return await(self.proxy.handleCall(self.route, args))
+	def __call__(self, *args, timeout = None):
+		timeout = CallDeadline.inherit(timeout)
+		return await(self.proxy.handleCall(self.route, args, timeout))
+	
+	def async(self, *args, timeout = None):
+		timeout = CallDeadline.inherit(timeout)
+		return startCall(self.proxy.handleCall(self.route, args, timeout))
 	
-	def async(self, *args):
-		return async(self.proxy.handleCall(self.route, args))
+	def coro(self, *args, timeout = None):
+		timeout = CallDeadline.inherit(timeout)
+		return self.proxy.handleCall(self.route, args, timeout)
 	
-	def coro(self, *args):
-		return self.proxy.handleCall(self.route, args)
+	def queue(self, batch, *args):
+		return self.proxy.queueCall(batch, self.route, args)
+
+
+class BoundStream:
+	""" A streaming call bound to its Route, or to its instance.
+	
+	    Calling it makes the call and returns the ItemStream of its items at
+	    once. The timeout applies to each wait for an item, and window sets
+	    how many items may be in flight at any time.
+	"""
+	def __init__(self, target, proxy):
+		self.target = target
+		self.proxy = proxy
+	
+	def __call__(self, *args, timeout = None, window = None):
+		timeout = CallDeadline.inherit(timeout)
+		return self.proxy.handleCall(self.target, args, timeout, window)
 
 
 class MethodProxy:
+	# The priority class in which the call is sent
+	priority = PRIORITY_NORMAL
+	
 	def __init__(self, transverseID):
 		self.transverseID = transverseID
 	
 	def __get__(self, instance, owner):
 		return BoundMethod(instance, self)
+	
+	def queueCall(self, batch, instance, args):
+		raise(TypeError("Only evaluations can be batched"))
 
 
 class CallProxy:
+	# The priority class in which the call is sent
+	priority = PRIORITY_NORMAL
+	
 	def __init__(self, transverseID):
 		self.transverseID = transverseID
 	
 	def __get__(self, instance, owner):
 		return BoundCall(instance.destination, self)
+	
+	def queueCall(self, batch, route, args):
+		raise(TypeError("Only evaluations can be batched"))
 
 
 class NotificationProxy(CallProxy):
 	@asynchronous
-	def handleCall(self, route, args):
+	def handleCall(self, route, args, timeout = None):
 		connection = route.connection
-		objectID = yield from connection.transceiveResolve(
-		                                      route, self.transverseID)
-		outStream = connection.transmitNotify(route, objectID)
+		outStream = connection.transmitNotifyTransverse(route,
+		                                                self.transverseID,
+		                                                timeout, self.priority)
 		self.serializeArguments(connection, args, outStream)
-		outStream.commit()
+		
+		# Hold back the caller while the Transport is congested
+		room = outStream.commit()
+		if room is not None:
+			yield from room
 
 
 class MethodNotificationProxy(MethodProxy):
 	@asynchronous
-	def handleCall(self, instance, args):
+	def handleCall(self, instance, args, timeout = None):
 		route = instance.destination
 		connection = route.connection
-		objectID = yield from connection.transceiveResolve(
-		                                      route, self.transverseID)
-		outStream = connection.transmitNotify(route, objectID)
+		outStream = connection.transmitNotifyTransverse(route,
+		                                                self.transverseID,
+		                                                timeout, self.priority)
 		self.serializeArguments(connection, instance, args, outStream)
-		outStream.commit()
+		room = outStream.commit()
+		if room is not None:
+			yield from room
 
 
 class EvaluationProxy(CallProxy):
 	@asynchronous
-	def handleCall(self, route, args):
+	def handleCall(self, route, args, timeout = None):
 		connection = route.connection
 		
-		# Resolve the TransverseID to a CallID
-		objectID = yield from connection.transceiveResolve(
-		                                      route, self.transverseID)
-		
-		# Transmit the remote call
-		outStream, responseFuture = connection.transceiveEval(route, objectID)
+		# Transmit the remote call, by TransverseID if it is not yet resolved
+		outStream, responseFuture = connection.transceiveEvalTransverse(
+		                       route, self.transverseID, timeout, self.priority)
 		self.serializeArguments(connection, args, outStream)
-		outStream.commit()
 		
 		# Wait for the reply and deserialize the return or throw an exception
 		# if this failed.
-		inStream = yield from responseFuture
+		inStream = yield from awaitReply(outStream, responseFuture)
 		return self.deserializeReturn(connection, inStream)
+	
+	def queueCall(self, batch, route, args):
+		""" Add the argument-bound call to a Batch, returning its Future.
+		"""
+		connection = route.connection
+		serialize = lambda outStream: self.serializeArguments(connection, args,
+		                                                      outStream)
+		decode = lambda inStream: self.deserializeReturn(connection, inStream)
+		return batch.queue(route, self.transverseID, serialize, decode,
+		                   self.priority)
 
 
 class MethodEvaluationProxy(MethodProxy):
 	@asynchronous
-	def handleCall(self, instance, args):
+	def handleCall(self, instance, args, timeout = None):
 		""" Sends the argument-bound call to a specific gateway for execution
 		    on the remote end.
 		"""
 		route = instance.destination
 		connection = route.connection
 		
-		# Resolve the TransverseID to a CallID
-		objectID = yield from connection.transceiveResolve(
-		                                      route, self.transverseID)
-		
-		# Transmit the remote call
-		outStream, responseFuture = connection.transceiveEval(route, objectID)
+		# Transmit the remote call, by TransverseID if it is not yet resolved
+		outStream, responseFuture = connection.transceiveEvalTransverse(
+		                       route, self.transverseID, timeout, self.priority)
 		self.serializeArguments(connection, instance, args, outStream)
-		outStream.commit()
 		
 		# Wait for the reply and deserialize the return or throw an exception
 		# if this failed.
-		inStream = yield from responseFuture
+		inStream = yield from awaitReply(outStream, responseFuture)
+		return self.deserializeReturn(connection, inStream)
+	
+	def queueCall(self, batch, instance, args):
+		route = instance.destination
+		connection = route.connection
+		serialize = lambda outStream: self.serializeArguments(
+		                                   connection, instance, args, outStream)
+		decode = lambda inStream: self.deserializeReturn(connection, inStream)
+		return batch.queue(route, self.transverseID, serialize, decode,
+		                   self.priority)
+
+
+class StreamProxy(CallProxy):
+	def __get__(self, instance, owner):
+		return BoundStream(instance.destination, self)
+	
+	def handleCall(self, route, args, timeout = None, window = None):
+		connection = route.connection
+		decode = lambda inStream: self.deserializeItem(connection, inStream)
+		outStream, items = connection.transceiveStream(route,
+		                                               self.transverseID,
+		                                               decode, timeout, window,
+		                                               self.priority)
+		self.serializeArguments(connection, args, outStream)
+		outStream.commit()
+		return items
+
+
+class MethodStreamProxy(MethodProxy):
+	def __get__(self, instance, owner):
+		return BoundStream(instance, self)
+	
+	def handleCall(self, instance, args, timeout = None, window = None):
+		route = instance.destination
+		connection = route.connection
+		decode = lambda inStream: self.deserializeItem(connection, inStream)
+		outStream, items = connection.transceiveStream(route,
+		                                               self.transverseID,
+		                                               decode, timeout, window,
+		                                               self.priority)
+		self.serializeArguments(connection, instance, args, outStream)
+		outStream.commit()
+		return items
+
+
+class UploadProxy(CallProxy):
+	@asynchronous
+	def handleCall(self, route, args, timeout = None):
+		""" Sends the call, with its items as the last argument, and waits
+		    for the reply once the items have been taken.
+		"""
+		connection = route.connection
+		args, items = args[:-1], args[-1]
+		serializeItem = lambda item, outStream: self.serializeItem(
+		                                         connection, item, outStream)
+		
+		# Transmit the upload, after which the items follow as credit allows
+		outStream, responseFuture = connection.transceiveUpload(
+		                 route, self.transverseID, items, serializeItem, timeout,
+		                 self.priority)
+		self.serializeArguments(connection, args, outStream)
+		
+		inStream = yield from awaitReply(outStream, responseFuture)
+		return self.deserializeReturn(connection, inStream)
+
+
+class MethodUploadProxy(MethodProxy):
+	@asynchronous
+	def handleCall(self, instance, args, timeout = None):
+		route = instance.destination
+		connection = route.connection
+		args, items = args[:-1], args[-1]
+		serializeItem = lambda item, outStream: self.serializeItem(
+		                                         connection, item, outStream)
+		
+		# Transmit the upload, after which the items follow as credit allows
+		outStream, responseFuture = connection.transceiveUpload(
+		                 route, self.transverseID, items, serializeItem, timeout,
+		                 self.priority)
+		self.serializeArguments(connection, instance, args, outStream)
+		
+		inStream = yield from awaitReply(outStream, responseFuture)
 		return self.deserializeReturn(connection, inStream)
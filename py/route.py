@@ -1,3 +1,6 @@
+# Local imports
+from .headers import PRIORITY_NORMAL
+
 # Exports
 __all__ = ["Route"]
 
@@ -29,15 +32,20 @@ class Route:
 		    Connection by the remote Transport.
 		"""
 		self.shiboleth = shiboleth
+		self.endID = endID
 		self.connection.proxyTokens[endID] = self
 	
-	def getOutputBuffer(self):
+	def getOutputBuffer(self, priority = PRIORITY_NORMAL):
 		""" Called to get a writeable buffer on this Route.
 		
 		    The writeable buffer represents a data transfer to the endpoint of
 		    this Route, which, when committed, will transfer the package to the
-		    correct destination for this Route.
+		    correct destination for this Route. The Transport sends it in the
+		    priority class given by priority. The buffer records this Route
+		    as its destination, for the References serialized to it.
 		"""
 		if self.transport is None:
 			raise(Exception("Route was disconnected"))
-		return self.transport.openBuffer(self.shiboleth)
+		outStream = self.transport.openBuffer(self.shiboleth, priority)
+		outStream.destination = self
+		return outStream
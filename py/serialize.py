@@ -11,6 +11,146 @@ def implements(interface):
 	return inner
 
 
+class DecodingError(Exception):
+	""" Raised for a message that cannot be decoded, such as a truncated one.
+	"""
+
+
+class ReadBuffer:
+	""" A read cursor over a single, complete, received packet.
+	
+	    Incoming packets are always received whole, so rather than wrapping
+	    them in a BytesIO and pulling fields out a byte at a time, the packet is
+	    held as a memoryview with an offset cursor. NUL-terminated fields are
+	    located with bytes.find and SerialIDs are scanned in a single pass. The
+	    file-like `read' interface is retained so that any code expecting a
+	    stream will continue to work unaltered. A ReadBuffer may be bounded by
+	    `end', so that several messages packed into one frame can share the
+	    frame's memory. Transports record the time of arrival in `received'
+	    and Connections record the Route it arrived on in `origin'.
+	"""
+	def __init__(self, data, offset = 0, end = None):
+		if not isinstance(data, (bytes, bytearray)):
+			data = bytes(data)
+		if end is None:
+			end = len(data)
+		self.data = data
+		self.view = memoryview(data)
+		self.offset = offset
+		self.end = end
+		self.received = None
+		self.origin = None
+	
+	def read(self, size = -1):
+		""" Read up to size bytes from the cursor, as with a file object.
+		"""
+		start = self.offset
+		if size < 0:
+			end = self.end
+		else:
+			end = min(start + size, self.end)
+		self.offset = end
+		return self.data[start:end]
+	
+	def readTerminated(self):
+		""" Read a NUL-terminated field, consuming but excluding the NUL.
+		
+		    The field is returned as a memoryview on the packet so that no copy
+		    is made until the caller decides on the final type. A missing
+		    terminator consumes the remainder of the packet.
+		"""
+		start = self.offset
+		end = self.data.find(b"\x00", start, self.end)
+		if end < 0:
+			end = self.end
+			self.offset = end
+		else:
+			self.offset = end + 1
+		return self.view[start:end]
+	
+	def readSerial(self):
+		""" Read the raw bytes of a single SerialID in one pass.
+		
+		    Raises DecodingError if the SerialID runs past the end of the
+		    buffer.
+		"""
+		data = self.data
+		start = end = self.offset
+		limit = self.end
+		while end < limit and data[end] & 0x80:
+			end += 1
+		if end >= limit:
+			raise(DecodingError("SerialID truncated at %d"%start))
+		end += 1
+		self.offset = end
+		return data[start:end]
+	
+	def readStruct(self, packer):
+		""" Unpack a precompiled Struct directly from the packet.
+		
+		    Raises DecodingError if the Struct runs past the end of the
+		    buffer.
+		"""
+		offset = self.offset
+		if offset + packer.size > self.end:
+			raise(DecodingError("Struct truncated at %d"%offset))
+		values = packer.unpack_from(self.data, offset)
+		self.offset = offset + packer.size
+		return values
+	
+	def split(self, size):
+		""" Split the next size bytes off into a ReadBuffer of their own.
+		
+		    The new ReadBuffer shares the memory of this one, and is attributed
+		    to the same origin, so that the parts of a message can be read
+		    independently of each other.
+		"""
+		start = self.offset
+		end = min(start + size, self.end)
+		self.offset = end
+		part = type(self)(self.data, start, end)
+		part.received = self.received
+		part.origin = self.origin
+		return part
+	
+	def tell(self):
+		return self.offset
+	
+	def seek(self, offset):
+		self.offset = offset
+		return offset
+
+
+class ReassembledBuffer(ReadBuffer):
+	""" A ReadBuffer over a message reassembled in place in a bytearray.
+	
+	    Fields are read as bytes, as from any other ReadBuffer, so that they
+	    can be compared and hashed as usual, while the message itself is
+	    never copied out of the bytearray.
+	"""
+	def read(self, size = -1):
+		return bytes(super().read(size))
+	
+	def readSerial(self):
+		return bytes(super().readSerial())
+
+
+def readTerminated(inStream):
+	""" Read a NUL-terminated field from any input stream.
+	
+	    ReadBuffers use their own fast path. Any other stream is read a byte at
+	    a time, accumulating into a bytearray.
+	"""
+	if isinstance(inStream, ReadBuffer):
+		return inStream.readTerminated()
+	accum = bytearray()
+	b = inStream.read(1)
+	while b != b"\x00" and b != b"":
+		accum += b
+		b = inStream.read(1)
+	return accum
+
+
 class PassByReference(metaclass = ABCMeta):
 	""" Base class for types that can be transmitted by reference.
 	
@@ -96,15 +236,98 @@ class MetaTuple(type):
 		return super().__new__(mcls, "DerivedTuple", (Tuple,), {"subTypes":subTypes})
 
 
-class Int32(PassByValue):
-	@staticmethod
-	def serialize(value, outStream):
-		outStream.write(struct.pack(">i",value))
+class FixedWidth(PassByValue):
+	""" Base class for fixed-width numeric types.
 	
-	@staticmethod
-	def deserialize(inStream):
-		return struct.unpack(">i", inStream.read(4))[0]
+	    Each sub-class supplies the struct format character for its type as
+	    `structCode'. The Struct used for single values is compiled once, when
+	    the class is defined, and the code is also used to build PackedRuns.
+	"""
+	@classmethod
+	def serialize(cls, value, outStream):
+		outStream.write(cls.packer.pack(value))
 	
+	@classmethod
+	def deserialize(cls, inStream):
+		packer = cls.packer
+		if isinstance(inStream, ReadBuffer):
+			return inStream.readStruct(packer)[0]
+		return packer.unpack(inStream.read(packer.size))[0]
+
+
+def fixedWidth(structCode):
+	""" Class decorator to compile the Struct for a FixedWidth type.
+	"""
+	def inner(cls):
+		cls.structCode = structCode
+		cls.packer = struct.Struct(">" + structCode)
+		return cls
+	return inner
+
+
+@fixedWidth("b")
+class Int8(FixedWidth):
+	pass
+
+
+@fixedWidth("h")
+class Int16(FixedWidth):
+	pass
+
+
+@fixedWidth("i")
+class Int32(FixedWidth):
+	pass
+
+
+@fixedWidth("q")
+class Int64(FixedWidth):
+	pass
+
+
+@fixedWidth("B")
+class UInt8(FixedWidth):
+	pass
+
+
+@fixedWidth("H")
+class UInt16(FixedWidth):
+	pass
+
+
+@fixedWidth("I")
+class UInt32(FixedWidth):
+	pass
+
+
+@fixedWidth("Q")
+class UInt64(FixedWidth):
+	pass
+
+
+class PackedRun:
+	""" A precompiled marshaller for a run of FixedWidth arguments.
+	
+	    Generated proxies and ExposedCalls group consecutive fixed-width
+	    arguments (and return values) into a single PackedRun, so that the
+	    whole run is encoded with one pack_into, into a buffer allocated when
+	    the run is defined, and decoded with one unpack_from.
+	"""
+	def __init__(self, *types):
+		self.packer = struct.Struct(">" + "".join(typ.structCode
+		                                          for typ in types))
+		self.buffer = bytearray(self.packer.size)
+	
+	def serialize(self, values, outStream):
+		self.packer.pack_into(self.buffer, 0, *values)
+		outStream.write(self.buffer)
+	
+	def deserialize(self, inStream):
+		packer = self.packer
+		if isinstance(inStream, ReadBuffer):
+			return inStream.readStruct(packer)
+		return packer.unpack(inStream.read(packer.size))
+
 
 class UnicodeString(PassByValue):
 	@staticmethod
@@ -114,12 +337,7 @@ class UnicodeString(PassByValue):
 
 	@staticmethod
 	def deserialize(inStream):
-		b = inStream.read(1)
-		a = b""
-		while b != b"\x00" and b!=b"":
-			a = a + b
-			b = inStream.read(1)
-		return a.decode("UTF-8")
+		return str(readTerminated(inStream), "UTF-8")
 
 
 class URI(UnicodeString):
@@ -134,12 +352,7 @@ class TransverseID(PassByValue):
 
 	@staticmethod
 	def deserialize(inStream):
-		b = inStream.read(1)
-		a = b""
-		while b != b"\x00" and b!=b"":
-			a = a + b
-			b = inStream.read(1)
-		return a
+		return bytes(readTerminated(inStream))
 
 class SerialID(PassByValue):
 	@staticmethod
@@ -159,7 +372,7 @@ class SerialID(PassByValue):
 		output = 0
 		while b & 0x80:
 			b = next(curByte)
-			output += b << shift
+			output += (b & 0x7F) << shift
 			shift += 7
 		return output
 
@@ -169,6 +382,8 @@ class SerialID(PassByValue):
 
 	@staticmethod
 	def deserialize(inStream):
+		if isinstance(inStream, ReadBuffer):
+			return inStream.readSerial()
 		c = b = inStream.read(1)
 		while b[0] & 0x80:
 			b = inStream.read(1)
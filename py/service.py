@@ -1,4 +1,4 @@
-from unstuck import *
+from .backend import *
 from .interface import *
 
 class Service:
@@ -8,34 +8,83 @@ class Service:
 		self.destination = destination
 	
 	@classmethod
-	def implementation(cls, *args, **kwargs):
+	def implementation(cls, *args, executor = None, executors = None,
+	                   **kwargs):
 		""" Produce a ServiceImplementation object.
 		
 		    A ServiceImplementation object is produced from the current service
 		    name, and member name/interface pairs. The names are used to match
 		    the interfaces against the implementations, supplied as keyword
 		    arguments.
+		    
+		    The implementations run on the event loop unless an executor (see
+		    the `executor' module) is given, either for the whole service, or
+		    for single members through executors, a dictionary mapping member
+		    names to executors.
 		"""
 		for arg in args:
 			kwargs[arg.__name__] = arg
 		return ServiceImplementation(cls.transverseID, cls.getExposed(),
-		                             **kwargs)
+		                             executor, executors, **kwargs)
 	
 	@classmethod
 	def on(cls, connection):
-		from .core_impl import OpenRoute
+		""" Open a Route from connection to the Service and return a gateway.
+		
+		    This blocks until the BusMaster has connected the Route, so code
+		    running on the event loop must instead use onCoro.
+		"""
+		return await(cls.onCoro(connection))
+	
+	@classmethod
+	@asynchronous
+	def onCoro(cls, connection):
+		""" Coroutine form of on.
+		"""
+		from .core_impl import OpenRoute, callCoro
 		master = connection.bus.busMaster
-		busRemoteToken = master.discover(cls.transverseID)
+		busRemoteToken = yield from callCoro(master, "discover",
+		                                     cls.transverseID)
 		localRoute = OpenRoute(connection)
-		master.connect(localRoute, busRemoteToken)
+		yield from callCoro(master, "connect", localRoute, busRemoteToken)
 		
-		return cls(localRoute.route)
+		route = localRoute.route
+		cls.prefetch(route)
+		return cls(route)
+	
+	@classmethod
+	def getTransverseIDs(cls):
+		""" List the TransverseIDs of every call exposed by the service.
+		"""
+		transverseIDs = []
+		for iface in cls.getExposed().values():
+			if issubclass(iface, ExposedObject):
+				for member in iface.exposedMethods.values():
+					transverseIDs.append(member.transverseID)
+			else:
+				transverseIDs.append(iface.transverseID)
+		return transverseIDs
+	
+	@classmethod
+	def prefetch(cls, route):
+		""" Resolve every TransverseID of the service in one round trip.
+		
+		    The resolution is not waited for. Calls made before it completes
+		    are simply sent by TransverseID, and any failure only means that
+		    the TransverseIDs are resolved by the first call to each instead.
+		"""
+		fut = route.connection.transceiveResolveBulk(route,
+		                                             cls.getTransverseIDs())
+		wrapFutureErrors(lambda error: None, fut)
 
 
 class ServiceImplementation:
-	def __init__(self, transverseID, exposedInterfaces, **kwargs):
+	def __init__(self, transverseID, exposedInterfaces, executor = None,
+	             executors = None, **kwargs):
 		self.transverseID = transverseID
 		self.exposedTransverse = {}
+		if executors is None:
+			executors = {}
 		
 		# Check that the objects provided as implementations and those present
 		# as interfaces correspond to each other
@@ -45,32 +94,36 @@ class ServiceImplementation:
 		for name in exposedInterfaces:
 			if not name in kwargs:
 				raise(NotImplementedError(name))
+		for name in executors:
+			if not name in exposedInterfaces:
+				raise(NotImplementedError(name))
 		
 		for name, obj in kwargs.items():
 			# Grab the interface from the Service class
 			iface = exposedInterfaces[name]
+			memberExecutor = executors.get(name, executor)
 			
 			# A TransverseObjectInterface should be exposed as an object
 			# implementation.
 			if issubclass(iface, ExposedObject):
-				self.exposeObjectImplementation(iface, obj)
+				self.exposeObjectImplementation(iface, obj, memberExecutor)
 			
 			# A TransverseCallableInterface should be exposed as a call
 			# implementation.
 			elif issubclass(iface, ExposedCall):
-				self.exposeCallImplementation(iface, obj)
+				self.exposeCallImplementation(iface, obj, memberExecutor)
 			
 			# Anything else cannot be exposed and results in an error.
 			else:
 				raise(TypeError(iface))
 	
-	def exposeObjectImplementation(self, iface, objcls):
+	def exposeObjectImplementation(self, iface, objcls, executor = None):
 		""" Exposes an ExposedObject on this Service.
 		    
 		    Exposes a python object that has been marked as an implementation of
 		    an object to the other side(s) of the transport. If the interface is
 		    marked as non-constructable, then no constructor method will be made
-		    available.
+		    available. If an executor is given then the methods are run on it.
 		"""
 		for name, member in iface.exposedMethods.items():
 			# If the object has a constructor then expose the object class
@@ -80,12 +133,24 @@ class ServiceImplementation:
 			else:	
 				call = getattr(objcls, name)
 			transverseID = member.transverseID
-			self.exposeTransverse(transverseID, member(call))
+			# Constructors always complete immediately, so they are not run
+			# on the executor.
+			if executor is None or name == "constructor":
+				self.exposeTransverse(transverseID, member(call))
+			else:
+				self.exposeTransverse(transverseID,
+				                      executor.exposeMethod(member, call))
 	
-	def exposeCallImplementation(self, iface, func):
+	def exposeCallImplementation(self, iface, func, executor = None):
 		""" Exposes a function call func that conforms to the interface iface.
+		    
+		    If an executor is given then the call is run on it.
 		"""
-		self.exposeTransverse(iface.transverseID, iface(func))
+		if executor is None:
+			self.exposeTransverse(iface.transverseID, iface(func))
+		else:
+			self.exposeTransverse(iface.transverseID,
+			                      executor.expose(iface, func))
 	
 	def exposeTransverse(self, transverseID, obj):
 		""" Exposes an object through a transverseID.
@@ -101,3 +166,9 @@ class ServiceImplementation:
 		master = connection.bus.busMaster
 		offering = ServiceOffering(connection, useSameConnection)
 		master.offer(offering, self.transverseID)
+	
+	def withdrawFrom(self, connection):
+		""" Stops the service implementation from being resolved on a
+		    connection to which it was previously offered.
+		"""
+		connection.removeTransverseMap(self.exposedTransverse)
@@ -0,0 +1,199 @@
+""" Module: stream
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file defines the two ends of a streamed call: `ItemStream', through
+    which the consumer takes the items of a stream as they arrive, and
+    `StreamPump', which sends the items of the producer as the consumer grants
+    it credit. A stream flows from the callee to the caller for a streaming
+    call, and from the caller to the callee for an upload.
+"""
+
+# System imports
+import collections
+import types
+
+# Local imports
+from .backend import *
+
+# Exports
+__all__ = ["EndOfStream", "ItemStream", "StreamPump"]
+
+
+class EndOfStream(Exception):
+	""" Raised by ItemStream.next once every item has been taken.
+	"""
+
+
+class ItemStream:
+	""" The items of a stream, taken in order as they arrive.
+	
+	    The producer starts with credit for `window' items and is granted more,
+	    through grant, as items are taken, half a window at a time. No more
+	    than a window of items is therefore ever held, however long the stream.
+	    Items are decoded from their messages as they arrive, and are taken
+	    with the coroutine next, by blocking iteration or, with the asyncio
+	    backend, by `async for'. If the stream fails, the items that arrived
+	    before the failure are taken first and then the error is raised. A
+	    stream that is no longer wanted is closed, which calls abandon so that
+	    the producer may be told to stop.
+	"""
+	def __init__(self, window, grant, decode, abandon = None):
+		self.window = window
+		self.grant = grant
+		self.decode = decode
+		self.abandon = abandon
+		self.items = collections.deque()
+		self.taken = 0
+		self.waiter = None
+		self.finished = False
+		self.error = None
+	
+	def receive(self, inStream):
+		""" Decode and queue the item held in inStream.
+		"""
+		self.items.append(self.decode(inStream))
+		self.wake()
+	
+	def finish(self, inStream = None):
+		""" Mark the end of the stream, once the producer has sent every item.
+		"""
+		self.finished = True
+		self.wake()
+	
+	def fail(self, error):
+		if not self.finished:
+			self.error = error
+			self.finished = True
+			self.wake()
+	
+	def close(self):
+		""" Abandon the stream, dropping any items not yet taken.
+		"""
+		if self.finished:
+			return
+		self.finished = True
+		self.items.clear()
+		if self.abandon is not None:
+			self.abandon()
+		self.wake()
+	
+	def wake(self):
+		waiter = self.waiter
+		self.waiter = None
+		if waiter is not None:
+			waiter.setResult(None)
+	
+	@asynchronous
+	def next(self):
+		""" Take the next item, raising EndOfStream if there are no more.
+		"""
+		while not self.items:
+			if self.error is not None:
+				raise(self.error)
+			if self.finished:
+				raise(EndOfStream)
+			self.waiter = Future()
+			yield from self.waiter
+		
+		# Grant credit back to the producer for the items taken, in batches
+		item = self.items.popleft()
+		self.taken += 1
+		if self.taken >= max(1, self.window // 2) and not self.finished:
+			self.grant(self.taken)
+			self.taken = 0
+		return item
+	
+	def __iter__(self):
+		return self
+	
+	def __next__(self):
+		try:
+			return await(self.next())
+		except EndOfStream:
+			raise(StopIteration)
+	
+	def __aiter__(self):
+		return self
+	
+	def __anext__(self):
+		return async(self.nextOrStop())
+	
+	@asynchronous
+	def nextOrStop(self):
+		try:
+			return (yield from self.next())
+		except EndOfStream:
+			raise(StopAsyncIteration)
+
+
+class StreamPump:
+	""" Sends the items of an iterable as the consumer grants credit.
+	
+	    Each item is passed to send only while credit remains, so that the
+	    producer never runs more than the window of the consumer ahead of it.
+	    Items are drawn from an ItemStream, from an asynchronous iterator with
+	    the asyncio backend, or else from a plain iterable, such as a
+	    generator, which is then drawn from on the event loop.
+	"""
+	def __init__(self, items, send, credit = 0):
+		self.items = items
+		self.send = send
+		self.credit = credit
+		self.waiter = None
+		self.closed = False
+	
+	def addCredit(self, count):
+		self.credit += count
+		self.wake()
+	
+	def close(self):
+		""" Stop sending items, closing the iterable if it is a generator.
+		"""
+		self.closed = True
+		if isinstance(self.items, types.GeneratorType):
+			self.items.close()
+		self.wake()
+	
+	def wake(self):
+		waiter = self.waiter
+		self.waiter = None
+		if waiter is not None:
+			waiter.setResult(None)
+	
+	@asynchronous
+	def run(self):
+		""" Send every item, returning whether the iterable was exhausted.
+		
+		    False is returned if the pump was closed before it could finish.
+		"""
+		items = self.items
+		if isinstance(items, ItemStream):
+			take, end = items.next, EndOfStream
+		elif hasattr(items, "__anext__"):
+			take, end = lambda: async(items.__anext__()), StopAsyncIteration
+		else:
+			iterator = iter(items)
+			take = None
+		
+		while not self.closed:
+			if take is None:
+				try:
+					item = next(iterator)
+				except StopIteration:
+					return True
+			else:
+				try:
+					item = yield from take()
+				except end:
+					return True
+			
+			# Wait for credit before sending
+			while self.credit <= 0 and not self.closed:
+				self.waiter = Future()
+				yield from self.waiter
+			if self.closed:
+				break
+			self.credit -= 1
+			self.send(item)
+		return False
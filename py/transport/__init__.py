@@ -1,4 +1,10 @@
+from ..backend import backendName
 from .bootstrap import *
 from .loopback import *
-from .socket import *
-from .websocket import *
+
+if backendName == "asyncio":
+	from .aiostream import *
+	from .shm import *
+else:
+	from .socket import *
+	from .websocket import *
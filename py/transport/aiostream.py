@@ -0,0 +1,242 @@
+# System imports
+import asyncio
+import collections
+import socket
+import struct
+
+# Local imports
+from ..backend   import *
+from ..core_impl import TransportServer, OpenTransport
+from .base       import removeStaleSocket
+from .packet     import PacketTransport
+
+# Exports
+__all__ = ["PacketProtocol", "AsyncioStreamServer", "AsyncioStreamTransport",
+           "SocketPair"]
+
+lengthPacker = struct.Struct(">I")
+
+
+class PacketProtocol(asyncio.Protocol):
+	""" An asyncio Protocol carrying packets with a 4-byte length prefix.
+	
+	    Incoming data is split into packets as it arrives and queued for
+	    readPacket. writePacket only waits when the underlying transport has
+	    asked for writing to be paused, so that a slow peer exerts backpressure
+	    on the writer. If onConnect is supplied then it is called with the
+	    protocol when the connection is made.
+	"""
+	def __init__(self, onConnect = None):
+		self.onConnect = onConnect
+		self.transport = None
+		self.buffer = bytearray()
+		self.packets = collections.deque()
+		self.waiter = None
+		self.writable = None
+		self.closed = False
+	
+	def connection_made(self, transport):
+		self.transport = transport
+		if self.onConnect is not None:
+			self.onConnect(self)
+	
+	def data_received(self, data):
+		buffer = self.buffer
+		buffer += data
+		offset = 0
+		while len(buffer) - offset >= 4:
+			length, = lengthPacker.unpack_from(buffer, offset)
+			end = offset + 4 + length
+			if len(buffer) < end:
+				break
+			self.packets.append(bytes(buffer[offset + 4:end]))
+			offset = end
+		if offset:
+			del buffer[:offset]
+			self.wakeReader()
+	
+	def connection_lost(self, error):
+		self.closed = True
+		self.wakeReader()
+		self.resume_writing()
+	
+	def pause_writing(self):
+		self.writable = Future()
+	
+	def resume_writing(self):
+		writable = self.writable
+		self.writable = None
+		if writable is not None:
+			writable.setResult(None)
+	
+	def wakeReader(self):
+		waiter = self.waiter
+		self.waiter = None
+		if waiter is not None:
+			waiter.setResult(None)
+	
+	@asynchronous
+	def readPacket(self):
+		while not self.packets:
+			if self.closed:
+				raise(StreamClosed)
+			self.waiter = Future()
+			yield from self.waiter
+		return self.packets.popleft()
+	
+	@asynchronous
+	def writePacket(self, packet):
+		if self.closed:
+			raise(StreamClosed)
+		self.transport.write(lengthPacker.pack(len(packet)) + packet)
+		if self.writable is not None:
+			yield from self.writable
+	
+	def close(self):
+		if self.transport is not None:
+			self.transport.close()
+
+
+class AsyncioStreamServer(TransportServer):
+	""" A TransportServer listening with asyncio on TCP or a Unix socket.
+	
+	    The listen address is a port number, a (host, port) pair, or a string
+	    giving the filesystem path of a Unix socket.
+	"""
+	def __init__(self, listenAddress, connectionURI = None, backlog = 100):
+		loop = asyncio.get_event_loop()
+		factory = lambda: PacketProtocol(self.acceptClient)
+		if isinstance(listenAddress, int):
+			listenAddress = ("localhost", listenAddress)
+		
+		if isinstance(listenAddress, str):
+			if connectionURI is None:
+				connectionURI = "unix://%s"%listenAddress
+			removeStaleSocket(listenAddress)
+			listening = loop.create_unix_server(factory, listenAddress,
+			                                    backlog = backlog)
+		else:
+			if connectionURI is None:
+				connectionURI = "tcp://%s:%d"%listenAddress
+			host, port = listenAddress
+			listening = loop.create_server(factory, host, port,
+			                               backlog = backlog,
+			                               reuse_address = True)
+		super().__init__(connectionURI)
+		self.worker = async(listening)
+	
+	def connect(self, remoteAddress, shiboleth):
+		return AsyncioStreamTransport.oneStepConnect(remoteAddress, shiboleth)
+	
+	def acceptClient(self, protocol):
+		async(self.__acceptClient(protocol))
+	
+	@asynchronous
+	def __acceptClient(self, protocol):
+		shiboleth = yield from protocol.readPacket()
+		
+		if shiboleth != self.entryShiboleth:
+			retries = 10
+			while not shiboleth in self.acceptanceTokens and retries > 0:
+				yield from sleep(0.1)
+				retries -= 1
+			if retries <= 0:
+				protocol.close()
+				return
+			fut = self.acceptanceTokens.pop(shiboleth)
+			
+			transport = AsyncioStreamTransport(protocol)
+			fut.setResult(transport)
+		
+		elif self.entryShiboleth is not None:
+			transport = AsyncioStreamTransport(protocol)
+			yield from transport.awaitClientCoro(self.entryConnection)
+
+
+class AsyncioStreamTransport(PacketTransport):
+	""" A PacketTransport over an asyncio stream connection.
+	"""
+	def __init__(self, protocol, coalesce = False):
+		self.protocol = protocol
+		super().__init__(protocol.readPacket, protocol.writePacket, coalesce)
+	
+	@asynchronous
+	def release(self):
+		self.protocol.close()
+		yield from self.worker
+	
+	@classmethod
+	def protocolConnect(cls, straddr, shiboleth):
+		addr, port = straddr.split(":")
+		port = int(port)
+		return cls.oneStepConnect((addr,port), shiboleth)
+	
+	@classmethod
+	def protocolConnectUnix(cls, path, shiboleth):
+		return cls.oneStepConnect(path, shiboleth)
+	
+	@classmethod
+	def oneStepConnect(cls, address, shiboleth):
+		""" Connect to an entry server, blocking until connected.
+		
+		    This runs the event loop, so it is for use at the top level only.
+		    Code already running on the loop must use connectCoro.
+		"""
+		return await(cls.connectCoro(address, shiboleth))
+	
+	@classmethod
+	def fromSocket(cls, sock):
+		""" Wrap an already connected plain socket as a Transport.
+		
+		    As for oneStepConnect, this blocks and is for use at the top level
+		    only. The coroutine form is fromSocketCoro.
+		"""
+		return await(cls.fromSocketCoro(sock))
+	
+	@classmethod
+	@asynchronous
+	def fromSocketCoro(cls, sock):
+		loop = asyncio.get_event_loop()
+		_, protocol = yield from loop.create_connection(PacketProtocol,
+		                                                sock = sock)
+		return cls(protocol)
+	
+	@classmethod
+	@asynchronous
+	def connectCoro(cls, remoteAddress, shiboleth):
+		loop = asyncio.get_event_loop()
+		if isinstance(remoteAddress, str):
+			_, protocol = yield from loop.create_unix_connection(
+			                                  PacketProtocol, remoteAddress)
+		else:
+			host, port = remoteAddress
+			_, protocol = yield from loop.create_connection(PacketProtocol,
+			                                                host, port)
+		yield from protocol.writePacket(shiboleth)
+		return cls(protocol)
+
+
+class SocketPair:
+	""" A connected pair of sockets for a parent and a child process.
+	
+	    The SocketPair is created before forking. Afterwards, the parent calls
+	    parent() and the child calls child() to obtain its Transport, which
+	    closes the other process's end. No entry server or shiboleth is
+	    involved: the parent offers a master Connection with awaitClient and
+	    the child passes its Transport to Bus.bootstrapOnTransport.
+	"""
+	def __init__(self):
+		self.parentSocket, self.childSocket = socket.socketpair()
+	
+	def parent(self):
+		self.childSocket.close()
+		return AsyncioStreamTransport.fromSocket(self.parentSocket)
+	
+	def child(self):
+		self.parentSocket.close()
+		return AsyncioStreamTransport.fromSocket(self.childSocket)
+
+
+OpenTransport.registerProtocol("tcp", AsyncioStreamTransport.protocolConnect)
+OpenTransport.registerProtocol("unix",
+                               AsyncioStreamTransport.protocolConnectUnix)
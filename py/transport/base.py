@@ -1,11 +1,26 @@
 # System imports
 import os
+import stat
+import weakref
 
 # Local imports
 from ..serialize import *
 
 # Exports
-__all__ = ["Transport"]
+__all__ = ["Transport", "removeStaleSocket"]
+
+
+def removeStaleSocket(path):
+	""" Remove a Unix socket left behind at path by an earlier server.
+	
+	    Only a socket file is removed, so that a mistaken path cannot delete
+	    anything else.
+	"""
+	try:
+		if stat.S_ISSOCK(os.stat(path).st_mode):
+			os.unlink(path)
+	except FileNotFoundError:
+		pass
 
 
 class Transport:
@@ -26,6 +41,8 @@ class Transport:
 	def __init__(self):
 		self.routeCount = -1
 		self.routeEndpoints = {}
+		self.resolutionCaches = weakref.WeakSet()
+		self.closeCallbacks = []
 	
 	def getRoutingToken(self):
 		self.routeCount += 1
@@ -38,8 +55,35 @@ class Transport:
 	def unregisterRoute(self, route):
 		del self.routeEndpoints[route.token]
 	
+	def invalidateCaches(self):
+		""" Drop the TransverseIDs resolved across this Transport.
+		
+		    This is called when the Transport is unregistered or its stream is
+		    lost, since the remote Bus may since have been restarted and its
+		    References reassigned.
+		"""
+		for cache in list(self.resolutionCaches):
+			cache.invalidateBus(self.remoteBusID)
+		self.resolutionCaches.clear()
+	
+	def whenClosed(self, callback):
+		""" Call callback, with no arguments, once the Transport is closed.
+		"""
+		self.closeCallbacks.append(callback)
+	
+	def transportClosed(self):
+		""" Called once the stream under the Transport has been lost.
+		
+		    The caches are invalidated and then each close callback is called,
+		    so that, for instance, the Bus can unregister the Transport.
+		"""
+		self.invalidateCaches()
+		callbacks, self.closeCallbacks = self.closeCallbacks, []
+		for callback in callbacks:
+			callback()
+	
 	def engageTransport(self, remoteID):
 		raise NotImplementedError
 	
-	def openBuffer(self, shiboleth):
+	def openBuffer(self, shiboleth, priority):
 		raise NotImplementedError
@@ -1,11 +1,9 @@
 # System imports
 import os
 
-# External imports
-from unstuck import *
-
 # Local imports
-from ..core_impl import OpenRoute
+from ..backend   import *
+from ..core_impl import OpenRoute, callCoro
 from .base       import Transport
 
 # Exports
@@ -13,14 +11,28 @@ __all__ = ["BootstrapTransport"]
 
 
 class BootstrapTransport(Transport):
+	""" A Transport over which a neonate Bus can be bootstrapped.
+	
+	    The blocking awaitClient and bootstrap are for use at the top level
+	    only. Code already running on the event loop, such as an entry
+	    server accepting a client, must use the coroutine forms.
+	"""
+	@asynchronous
 	def masterBootstrapIO(self, neonateID, masterToken, masterID):
 		raise NotImplementedError
 	
+	@asynchronous
 	def clientBootstrapIO(self, clientToken):
 		raise NotImplementedError
 	
 	def awaitClient(self, connection):
-		""" Instructs the transport to wait for 
+		""" Instructs the transport to wait for a neonate client to bootstrap.
+		"""
+		return await(self.awaitClientCoro(connection))
+	
+	@asynchronous
+	def awaitClientCoro(self, connection):
+		""" Coroutine form of awaitClient.
 		"""
 		bus = connection.bus
 		
@@ -32,9 +44,9 @@ class BootstrapTransport(Transport):
 		
 		# Create a connection ID for the bootstrapping neonate and then complete
 		# the routing on both sides of the transport.
-		neonateID = bus.busMaster.getNeonateID()
-		remoteToken = self.masterBootstrapIO(bus.busID, neonateID,
-		                                     masterToken, masterID)
+		neonateID = yield from callCoro(bus.busMaster, "getNeonateID")
+		remoteToken = yield from self.masterBootstrapIO(bus.busID, neonateID,
+		                                                masterToken, masterID)
 		openMaster.bootstrap(self, masterToken, remoteToken, neonateID)
 		
 		# Register the transport on the bus as connecting to the remote bus
@@ -44,7 +56,13 @@ class BootstrapTransport(Transport):
 		self.engageTransport(neonateID)
 	
 	def bootstrap(self, clientToken):
+		return await(self.bootstrapCoro(clientToken))
+	
+	@asynchronous
+	def bootstrapCoro(self, clientToken):
+		""" Coroutine form of bootstrap.
+		"""
 		(clientID, masterToken,
-		 masterID, remoteBusID) = self.clientBootstrapIO(clientToken)
+		 masterID, remoteBusID) = yield from self.clientBootstrapIO(clientToken)
 		self.engageTransport(remoteBusID)
 		return masterToken, clientID, masterID, remoteBusID
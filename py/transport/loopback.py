@@ -1,6 +1,7 @@
 import io
 
-from unstuck import *
+from ..backend import *
+from ..serialize import *
 from .base import *
 
 __all__ = ["LoopbackTransport"]
@@ -12,11 +13,12 @@ class LoopbackTransport(Transport):
 	def engageTransport(self, remoteID):
 		self.remoteBusID = remoteID
 	
-	def openBuffer(self, shiboleth):
+	def openBuffer(self, shiboleth, priority = None):
 		return LoopbackBuffer(self, shiboleth)
 	
-	def commitPacket(self, inStream):
-		route = self.routeEndpoints[inStream.dc]
+	def commitPacket(self, outStream):
+		route = self.routeEndpoints[outStream.dc]
+		inStream = ReadBuffer(outStream.getvalue())
 		callSoon(route.connection.handleReceived, route, inStream)
 
 
@@ -27,5 +29,4 @@ class LoopbackBuffer(io.BytesIO):
 		self.transport = transport
 	
 	def commit(self):
-		self.seek(0)
 		self.transport.commitPacket(self)
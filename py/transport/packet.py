@@ -1,17 +1,40 @@
 # System imports
+import collections
 import io, os
 import struct
-
-# External imports
-from unstuck.streams import *
-from unstuck         import *
+import time
 
 # Local imports
+from ..backend   import *
+from ..headers   import PRIORITY_CONTROL, PRIORITY_NORMAL, PRIORITY_BULK
 from .bootstrap  import BootstrapTransport
 from ..serialize import *
 
 # Exports
-__all__ = ["PacketTransport"]
+__all__ = ["PacketTransport", "MessageTooLarge"]
+
+# Route code marking a frame of several messages. A SerialID never ends with a
+# nul continuation, so this cannot collide with a real route code.
+BATCH_CODE = b"\x80\x00"
+
+# Route code marking a frame that grants the peer credit to send more. Such
+# frames carry no messages and are not themselves charged against credit.
+CREDIT_CODE = b"\x81\x00"
+
+# Route codes marking the frames that hold the first, a middle and the last
+# fragment of a larger message
+FRAGMENT_START_CODE = b"\x82\x00"
+FRAGMENT_CODE = b"\x83\x00"
+FRAGMENT_END_CODE = b"\x84\x00"
+FRAGMENT_CODES = FRAGMENT_START_CODE, FRAGMENT_CODE, FRAGMENT_END_CODE
+
+# Bytes that either end may send before the first grant of credit arrives
+INITIAL_CREDIT = 1 << 20
+
+
+class MessageTooLarge(Exception):
+	""" Raised on committing a message larger than its Transport carries.
+	"""
 
 
 class PacketTransport(BootstrapTransport):
@@ -22,39 +45,128 @@ class PacketTransport(BootstrapTransport):
 	    resectively. These can represent a connection across different machines
 	    or between processes on the same machine. These two functions must be
 	    coroutines.
-	""" 
-	def __init__(self, readPacket, writePacket):
+	    
+	    If coalesce is set, then messages queued together are packed into
+	    one frame, as route-coded sub-messages, and written together. Frames
+	    of this kind are always understood on receipt, so only the sending
+	    side need enable it.
+	    
+	    Sending is flow-controlled by credit. Each end may send only as many
+	    bytes as the other has granted it, starting from INITIAL_CREDIT, and
+	    grants credit back as the frames it receives are handled, half of its
+	    receiveWindow at a time. Committed messages are queued until there is
+	    credit to write them. Once more than highWater bytes are queued, or
+	    more than routeHighWater bytes for a single Route, commit returns a
+	    Future which is done only once the queue has drained to lowWater, or
+	    routeLowWater, so that producers waiting on it are held to the pace
+	    at which the peer handles their messages. Once the stream is lost,
+	    whatever is still queued is dropped, and the held commits fail with
+	    the error that ended it.
+	    
+	    Each message is sent in a priority class, and is queued with the
+	    other messages of its class. The queues are served in order of
+	    priority, so that control messages are sent ahead of any others, and
+	    normal messages ahead of bulk ones. Control messages are sent even
+	    when credit has run out. Messages within a class are always sent in
+	    the order in which they were committed.
+	    
+	    Messages of more than fragmentSize bytes are sent in fragments, each
+	    framed as it is written, and other messages are sent between the
+	    fragments as their priority requires. Fragments are keyed by route
+	    code and message, and the first also carries the size of the whole
+	    message. The receiver appends each fragment to the buffer of its
+	    message as it arrives, so that a buffer only ever holds what has
+	    actually been received, and reads the message from that buffer,
+	    without a further copy, once it is whole.
+	    
+	    No message larger than maxMessageSize bytes is sent or received.
+	    Committing one raises MessageTooLarge, so that the sender learns of
+	    it at once. The receiver drops any message declared larger, and
+	    any whose fragments would take the bytes held for reassembly over
+	    maxReassembly, which by default has room for a message of the
+	    largest size in each priority class. Both ends should therefore be
+	    given the same maxMessageSize.
+	"""
+	# Bytes that the peer may have in flight to this end
+	receiveWindow = INITIAL_CREDIT
+	
+	# Bytes queued for sending, over the Transport and over any one Route, at
+	# which commits are held back, and to which the queue must drain before
+	# they are released
+	highWater = 1 << 22
+	lowWater = 1 << 20
+	routeHighWater = 1 << 21
+	routeLowWater = 1 << 19
+	
+	# Largest message sent in a single frame
+	fragmentSize = 1 << 16
+	
+	def __init__(self, readPacket, writePacket, coalesce = False,
+	             maxMessageSize = 1 << 30, maxReassembly = None):
 		super().__init__()
 		self.readPacket = readPacket
 		self.writePacket = writePacket
+		self.coalesce = coalesce
+		
+		# The largest message, and the most bytes held in all the messages
+		# being reassembled at once
+		self.maxMessageSize = maxMessageSize
+		if maxReassembly is None:
+			maxReassembly = maxMessageSize * (PRIORITY_BULK + 1)
+		self.maxReassembly = maxReassembly
+		
+		# Messages waiting to be written, by priority, and the writer
+		self.sendQueues = [collections.deque() for _ in range(PRIORITY_BULK + 1)]
+		self.writer = None
+		
+		# Fragmented messages, being sent and being received, and the bytes
+		# held in those being received
+		self.fragmentCount = -1
+		self.fragments = collections.OrderedDict()
+		self.reassemblyBytes = 0
+		
+		# Credit, granted by the peer and not yet granted to it
+		self.sendCredit = INITIAL_CREDIT
+		self.creditWaiter = None
+		self.unreported = 0
+		
+		# Bytes queued, in total and by route code, and the commits held back
+		self.queuedBytes = 0
+		self.routeBytes = {}
+		self.congested = False
+		self.congestedRoutes = set()
+		self.heldWriters = []
+		self.sendingFailed = False
 	
 	@asynchronous
 	def release(self):
 		raise(NotImplementedError)
 	
+	@asynchronous
 	def masterBootstrapIO(self, busID, neonateID, masterToken, masterID):
 		outStream = self.openBuffer(b"BOOTSTRP")
 		ConnectionID.serialize(neonateID, outStream)
 		RouteToken.serialize(masterToken, outStream)
 		ConnectionID.serialize(masterID, outStream)
 		BusID.serialize(busID, outStream)
-		outStream.commitSync()
+		yield from self.writePacket(outStream.getvalue())
 		
-		inPacket = await(self.readPacket())
-		inStream = io.BytesIO(inPacket)
+		inPacket = yield from self.readPacket()
+		inStream = ReadBuffer(inPacket)
 		shiboleth = inStream.read(8)
 		assert shiboleth == b"BOOTSTRP"
 		
 		clientToken = RouteToken.deserialize(inStream)
 		return clientToken
 	
+	@asynchronous
 	def clientBootstrapIO(self, clientToken):
 		outStream = self.openBuffer(b"BOOTSTRP")
 		RouteToken.serialize(clientToken, outStream)
-		outStream.commitSync()
+		yield from self.writePacket(outStream.getvalue())
 		
-		inPacket = await(self.readPacket())
-		inStream = io.BytesIO(inPacket)
+		inPacket = yield from self.readPacket()
+		inStream = ReadBuffer(inPacket)
 		shiboleth = inStream.read(8)
 		assert shiboleth == b"BOOTSTRP"
 		
@@ -67,38 +179,345 @@ class PacketTransport(BootstrapTransport):
 	def engageTransport(self, remoteBusID):
 		self.remoteBusID = remoteBusID
 		self.worker = async(self.ioLoop())
+		if self.receiveWindow > INITIAL_CREDIT:
+			self.grantCredit(self.receiveWindow - INITIAL_CREDIT)
 	
-	def openBuffer(self, shiboleth):
-		return PacketBuffer(self, shiboleth)
+	def openBuffer(self, shiboleth, priority = PRIORITY_NORMAL):
+		return PacketBuffer(self, shiboleth, priority)
 	
 	def ioLoop(self):
 		try:
 			while True:
 				inPacket = yield from self.readPacket()
-				inStream = io.BytesIO(inPacket)
-				routeCode = SerialID.deserialize(inStream)
-				if routeCode in self.routeEndpoints:
-					route = self.routeEndpoints[routeCode]
-					callSoon(route.connection.handleReceived, route, inStream)
-		except StreamClosed:
-			pass
-	
-	def sendError(self, error):
-		# TODO THIS IS A KLUDGE
-		print(error)
-		while True:pass
+				code = inPacket[:2]
+				if code == CREDIT_CODE:
+					self.receiveCredit(inPacket)
+					continue
+				if code == BATCH_CODE:
+					self.splitBatch(inPacket)
+				elif code in FRAGMENT_CODES:
+					self.receiveFragment(code, inPacket)
+				else:
+					self.dispatchPacket(ReadBuffer(inPacket))
+				
+				# Credit is granted back once the messages have been handled
+				callSoon(self.consumed, len(inPacket))
+		except StreamClosed as error:
+			self.fragments.clear()
+			self.reassemblyBytes = 0
+			self.failSending(error)
+			self.transportClosed()
+	
+	def dispatchPacket(self, inStream):
+		""" Pass a single received message on to the Route it is coded for.
+		
+		    The time of arrival is recorded on the stream so that deadlines
+		    can be measured from it, rather than from when it is processed.
+		"""
+		inStream.received = time.monotonic()
+		routeCode = SerialID.deserialize(inStream)
+		if routeCode in self.routeEndpoints:
+			route = self.routeEndpoints[routeCode]
+			callSoon(route.connection.handleReceived, route, inStream)
+	
+	def splitBatch(self, inPacket):
+		""" Split a coalesced frame into its messages and dispatch each one.
+		
+		    Each message in the frame is prefixed by its length, as a SerialID,
+		    and is dispatched as a ReadBuffer bounded to that message, sharing
+		    the memory of the frame.
+		"""
+		inStream = ReadBuffer(inPacket, len(BATCH_CODE))
+		size = len(inPacket)
+		while inStream.tell() < size:
+			length = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			start = inStream.tell()
+			self.dispatchPacket(ReadBuffer(inPacket, start, start + length))
+			inStream.seek(start + length)
+	
+	def receiveFragment(self, code, inPacket):
+		""" Add a fragment to its message, dispatching it once it is whole.
+		
+		    A fragment consists of the route code and fragment ID of the
+		    message, followed, in the first fragment, by the size of the
+		    message, and then by the bytes of the fragment. Fragments of a
+		    message that is too large, that is coded for an unknown Route,
+		    that overruns its size or that would take the bytes held for
+		    reassembly over maxReassembly are dropped, as are any fragments
+		    that follow them. A first fragment for a message that is already
+		    being reassembled starts it afresh.
+		    
+		    The peer sends no more than one message at a time in fragments
+		    in each priority class, so if a first fragment arrives while that
+		    many are being reassembled, the oldest has lost its end and is
+		    dropped.
+		"""
+		inStream = ReadBuffer(inPacket, len(code))
+		key = SerialID.deserialize(inStream), SerialID.deserialize(inStream)
+		if code == FRAGMENT_START_CODE:
+			self.dropFragments(key)
+			while len(self.fragments) > PRIORITY_BULK:
+				self.dropFragments(next(iter(self.fragments)))
+			size = SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			if size <= self.maxMessageSize and key[0] in self.routeEndpoints:
+				self.fragments[key] = [bytearray(), size]
+		
+		message = self.fragments.get(key)
+		if message is None:
+			return
+		buffer, size = message
+		chunk = inStream.view[inStream.tell():]
+		if (len(buffer) + len(chunk) > size
+		    or self.reassemblyBytes + len(chunk) > self.maxReassembly):
+			self.dropFragments(key)
+			return
+		buffer += chunk
+		self.reassemblyBytes += len(chunk)
+		
+		if code == FRAGMENT_END_CODE:
+			self.dropFragments(key)
+			if len(buffer) == size:
+				self.dispatchPacket(ReassembledBuffer(buffer))
+	
+	def dropFragments(self, key):
+		""" Forget a message being reassembled, if there is one.
+		"""
+		message = self.fragments.pop(key, None)
+		if message is not None:
+			self.reassemblyBytes -= len(message[0])
+	
+	def unregisterRoute(self, route):
+		super().unregisterRoute(route)
+		for key in [key for key in self.fragments if key[0] == route.token]:
+			self.dropFragments(key)
+	
+	def queuePacket(self, packet, routeCode, priority = PRIORITY_NORMAL):
+		""" Queue an outgoing message to be written as credit allows.
+		
+		    Returns None if there is room to queue more, and otherwise a
+		    Future which is done once the queue has drained. Nothing is
+		    queued once sending has failed.
+		"""
+		if self.sendingFailed:
+			return
+		size = len(packet)
+		if size > self.fragmentSize:
+			self.fragmentCount += 1
+			fragmentID = SerialID.integerToBytes(self.fragmentCount)
+		else:
+			fragmentID = None
+		self.sendQueues[priority].append((packet, routeCode, fragmentID, 0))
+		self.queuedBytes += size
+		routeBytes = self.routeBytes.get(routeCode, 0) + size
+		self.routeBytes[routeCode] = routeBytes
+		if self.writer is None:
+			self.writer = async(self.writeQueued())
+		elif priority == PRIORITY_CONTROL:
+			self.wakeWriter()
+		
+		if self.queuedBytes > self.highWater:
+			self.congested = True
+		if routeBytes > self.routeHighWater:
+			self.congestedRoutes.add(routeCode)
+		if self.congested or routeCode in self.congestedRoutes:
+			fut = Future()
+			self.heldWriters.append((routeCode, fut))
+			return fut
+	
+	@asynchronous
+	def writeQueued(self):
+		""" Write out the queued messages, for as long as there are any.
+		
+		    Each frame waits for credit, unless it is a control message, and
+		    is then written even if it is larger than the credit remaining,
+		    so that no frame is held back forever. With coalesce set, as many
+		    queued messages are packed into each frame as credit allows. If a
+		    write fails, then sending fails as a whole.
+		"""
+		queues = self.sendQueues
+		control = queues[PRIORITY_CONTROL]
+		try:
+			while not self.sendingFailed:
+				queue = next((queue for queue in queues if queue), None)
+				if queue is None:
+					break
+				if self.sendCredit <= 0 and queue is not control:
+					self.creditWaiter = Future()
+					yield from self.creditWaiter
+					continue
+				
+				packet, routeCode, fragmentID, offset = queue.popleft()
+				if fragmentID is None:
+					packets = [(packet, routeCode, fragmentID, offset)]
+					if self.coalesce:
+						self.gatherPackets(packets)
+					frame = self.packFrame(packets)
+					sent = [(routeCode, len(packet))
+					        for packet, routeCode, _, _ in packets]
+				else:
+					# Only the next fragment is framed, and the rest of the
+					# message goes back to the head of its queue
+					end = min(offset + self.fragmentSize, len(packet))
+					frame = self.packFragment(packet, routeCode, fragmentID,
+					                          offset, end)
+					if end < len(packet):
+						queue.appendleft((packet, routeCode, fragmentID, end))
+					sent = [(routeCode, end - offset)]
+				self.sendCredit -= len(frame)
+				yield from self.writePacket(frame)
+				self.dequeued(sent)
+		except Exception as error:
+			self.failSending(error)
+		finally:
+			self.writer = None
+	
+	def gatherPackets(self, packets):
+		""" Add further whole messages to a frame, in order of priority.
+		"""
+		size = len(packets[0][0])
+		for queue in self.sendQueues:
+			while queue:
+				if (queue[0][2] is not None
+				    or size + len(queue[0][0]) >= self.sendCredit):
+					return
+				size += len(queue[0][0])
+				packets.append(queue.popleft())
+	
+	def packFrame(self, packets):
+		""" Pack queued messages into a single frame.
+		"""
+		if len(packets) == 1:
+			return packets[0][0]
+		outStream = io.BytesIO()
+		outStream.write(BATCH_CODE)
+		for packet, _, _, _ in packets:
+			SerialID.serialize(SerialID.integerToBytes(len(packet)), outStream)
+			outStream.write(packet)
+		return outStream.getvalue()
+	
+	def packFragment(self, packet, routeCode, fragmentID, offset, end):
+		""" Frame the fragment of a message between offset and end.
+		"""
+		if offset == 0:
+			header = (FRAGMENT_START_CODE + routeCode + fragmentID
+			          + SerialID.integerToBytes(len(packet)))
+		elif end == len(packet):
+			header = FRAGMENT_END_CODE + routeCode + fragmentID
+		else:
+			header = FRAGMENT_CODE + routeCode + fragmentID
+		return b"".join((header, memoryview(packet)[offset:end]))
+	
+	def dequeued(self, sent):
+		""" Account for written bytes, releasing held commits if able.
+		
+		    sent holds the route code and size of each message, or fragment
+		    of a message, that was written.
+		"""
+		if self.sendingFailed:
+			return
+		routeBytes = self.routeBytes
+		for routeCode, size in sent:
+			self.queuedBytes -= size
+			remaining = routeBytes[routeCode] - size
+			if remaining:
+				routeBytes[routeCode] = remaining
+			else:
+				del routeBytes[routeCode]
+			if remaining <= self.routeLowWater:
+				self.congestedRoutes.discard(routeCode)
+		if self.queuedBytes <= self.lowWater:
+			self.congested = False
+		
+		if self.heldWriters and not self.congested:
+			held = self.heldWriters
+			self.heldWriters = [(routeCode, fut) for routeCode, fut in held
+			                    if routeCode in self.congestedRoutes]
+			for routeCode, fut in held:
+				if routeCode not in self.congestedRoutes:
+					fut.setResult(None)
+	
+	def failSending(self, error):
+		""" Give up sending, once the stream is lost or a write has failed.
+		
+		    Everything queued is dropped, and each commit held back, and the
+		    writer if it is waiting for credit, fails with error.
+		"""
+		self.sendingFailed = True
+		for queue in self.sendQueues:
+			queue.clear()
+		self.queuedBytes = 0
+		self.routeBytes.clear()
+		self.congested = False
+		self.congestedRoutes.clear()
+		
+		held, self.heldWriters = self.heldWriters, []
+		for _, fut in held:
+			fut.setError(error)
+		waiter, self.creditWaiter = self.creditWaiter, None
+		if waiter is not None:
+			waiter.setError(error)
+	
+	def wakeWriter(self):
+		waiter = self.creditWaiter
+		self.creditWaiter = None
+		if waiter is not None:
+			waiter.setResult(None)
+	
+	def receiveCredit(self, inPacket):
+		""" Add the credit granted by the peer, waking the writer.
+		"""
+		inStream = ReadBuffer(inPacket, len(CREDIT_CODE))
+		self.sendCredit += SerialID.bytesToInteger(
+		                                   SerialID.deserialize(inStream))
+		self.wakeWriter()
+	
+	def consumed(self, size):
+		""" Account for a handled frame, granting credit in batches.
+		"""
+		self.unreported += size
+		if self.unreported >= self.receiveWindow // 2:
+			self.grantCredit(self.unreported)
+			self.unreported = 0
+	
+	def grantCredit(self, size):
+		if not self.sendingFailed:
+			async(self.writeCredit(size))
+	
+	@asynchronous
+	def writeCredit(self, size):
+		frame = CREDIT_CODE + SerialID.integerToBytes(size)
+		try:
+			yield from self.writePacket(frame)
+		except Exception as error:
+			self.failSending(error)
 
 
 class PacketBuffer(io.BytesIO):
-	def __init__(self, transport, shiboleth):
+	def __init__(self, transport, shiboleth, priority = PRIORITY_NORMAL):
 		super().__init__()
 		self.transport = transport
+		self.routeCode = shiboleth
+		self.priority = priority
 		self.write(shiboleth)
 	
 	def commit(self):
-		transport = self.transport
-		val = self.getvalue()
-		wrapFutureErrors(transport.sendError, async(transport.writePacket(val)))
+		""" Queue the message for sending.
+		
+		    Returns None, or a Future to wait on before committing more if
+		    the Transport, or the Route, is congested. A message large enough
+		    to be fragmented is sent straight from this buffer, uncopied. A
+		    message larger than the Transport carries raises MessageTooLarge.
+		"""
+		size, limit = self.tell(), self.transport.maxMessageSize
+		if size > limit:
+			raise(MessageTooLarge("Message of %d bytes exceeds the limit of "
+			                      "%d bytes"%(size, limit)))
+		if size > self.transport.fragmentSize:
+			packet = self.getbuffer()
+		else:
+			packet = self.getvalue()
+		return self.transport.queuePacket(packet, self.routeCode,
+		                                  self.priority)
 	
 	def commitSync(self):
 		val = self.getvalue()
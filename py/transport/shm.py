@@ -0,0 +1,266 @@
+# System imports
+import asyncio
+import collections
+import mmap
+import socket
+import struct
+
+# Local imports
+from ..backend   import *
+from .packet     import PacketTransport
+
+# Exports
+__all__ = ["RingBuffer", "SharedMemoryTransport", "SharedMemoryPair"]
+
+# Each ring starts with a header holding the total bytes ever written (head,
+# at offset 0) and read (tail, at offset 8), followed by the flags each side
+# raises before sleeping. Both ends are on one host, so native order is used.
+lengthPacker = struct.Struct("=I")
+HEADER_SIZE = 64
+READER_WAITING = 16
+WRITER_WAITING = 17
+
+
+class RingBuffer:
+	""" A single-producer, single-consumer ring of frames in shared memory.
+	
+	    The ring occupies a shared mapping: a fixed header followed by the
+	    data area of `capacity' bytes. Frames are written as a 4-byte length
+	    followed by the frame itself, wrapping around the end of the data
+	    area. Only the producer moves the head and only the consumer moves the
+	    tail, so no lock is needed between the two processes.
+	"""
+	def __init__(self, mem):
+		self.mem = mem
+		self.capacity = len(mem) - HEADER_SIZE
+	
+	@classmethod
+	def anonymous(cls, capacity):
+		""" Create a ring in an anonymous mapping, shared with children.
+		"""
+		return cls(mmap.mmap(-1, HEADER_SIZE + capacity))
+	
+	def getHead(self):
+		return struct.unpack_from("=Q", self.mem, 0)[0]
+	
+	def getTail(self):
+		return struct.unpack_from("=Q", self.mem, 8)[0]
+	
+	def getFlag(self, flag):
+		return self.mem[flag]
+	
+	def setFlag(self, flag, value):
+		self.mem[flag] = value
+	
+	def isEmpty(self):
+		return self.getHead() == self.getTail()
+	
+	def copyIn(self, position, data):
+		start = position % self.capacity
+		first = min(len(data), self.capacity - start)
+		base = HEADER_SIZE
+		self.mem[base + start:base + start + first] = data[:first]
+		if first < len(data):
+			self.mem[base:base + len(data) - first] = data[first:]
+	
+	def copyOut(self, position, size):
+		start = position % self.capacity
+		first = min(size, self.capacity - start)
+		base = HEADER_SIZE
+		data = self.mem[base + start:base + start + first]
+		if first < size:
+			data += self.mem[base:base + size - first]
+		return data
+	
+	def write(self, packet):
+		""" Write a frame if there is room, returning whether it was written.
+		"""
+		size = 4 + len(packet)
+		if size > self.capacity:
+			raise(ValueError("Frame of %d bytes exceeds ring capacity"
+			                 %len(packet)))
+		head = self.getHead()
+		if size > self.capacity - (head - self.getTail()):
+			return False
+		self.copyIn(head, lengthPacker.pack(len(packet)))
+		self.copyIn(head + 4, packet)
+		struct.pack_into("=Q", self.mem, 0, head + size)
+		return True
+	
+	def read(self):
+		""" Read the next frame, or return None if the ring is empty.
+		"""
+		tail = self.getTail()
+		if self.getHead() == tail:
+			return None
+		length, = lengthPacker.unpack(self.copyOut(tail, 4))
+		packet = self.copyOut(tail + 4, length)
+		struct.pack_into("=Q", self.mem, 8, tail + 4 + length)
+		return packet
+
+
+class SharedMemoryTransport(PacketTransport):
+	""" A PacketTransport exchanging frames through shared-memory rings.
+	
+	    Frames are read from one RingBuffer and written to another, with no
+	    copy through the kernel. A connected socket serves only as a doorbell:
+	    a side raises its waiting flag before sleeping and the other side sends
+	    a single byte to wake it, so no system call is made while both sides
+	    are busy. Since raising a flag and checking the ring are not atomic
+	    between processes, the rings are also checked every pollInterval
+	    seconds, which bounds the delay of a missed wake-up.
+	
+	    This transport waits on the doorbell with the asyncio event loop and
+	    so requires the asyncio backend.
+	"""
+	def __init__(self, readRing, writeRing, doorbell, coalesce = False,
+	             pollInterval = .05):
+		super().__init__(self.receiveFrame, self.sendFrame, coalesce)
+		self.readRing = readRing
+		self.writeRing = writeRing
+		self.doorbell = doorbell
+		self.readWaiter = None
+		self.blockedWriters = collections.deque()
+		self.closed = False
+		
+		doorbell.setblocking(False)
+		asyncio.get_event_loop().add_reader(doorbell.fileno(),
+		                                    self.answerDoorbell)
+		self.poll = RecurringEvent(pollInterval, self.checkRings)
+		self.poll.begin()
+	
+	@asynchronous
+	def receiveFrame(self):
+		ring = self.readRing
+		while True:
+			packet = ring.read()
+			if packet is not None:
+				ring.setFlag(READER_WAITING, 0)
+				if ring.getFlag(WRITER_WAITING):
+					ring.setFlag(WRITER_WAITING, 0)
+					self.ringDoorbell()
+				return packet
+			if self.closed:
+				raise(StreamClosed)
+			
+			# Raise the flag before sleeping and check the ring once more, in
+			# case the peer wrote before it could see the flag.
+			if not ring.getFlag(READER_WAITING):
+				ring.setFlag(READER_WAITING, 1)
+				continue
+			self.readWaiter = Future()
+			yield from self.readWaiter
+	
+	@asynchronous
+	def sendFrame(self, packet):
+		if self.closed:
+			raise(StreamClosed)
+		if self.blockedWriters or not self.writeRing.write(packet):
+			# Writers wait in order so that frames are never reordered.
+			fut = Future()
+			self.blockedWriters.append((packet, fut))
+			self.writeRing.setFlag(WRITER_WAITING, 1)
+			self.drainWriters()
+			yield from fut
+		else:
+			self.notifyReader()
+	
+	def drainWriters(self):
+		""" Write out as many blocked frames as the ring now has room for.
+		"""
+		ring = self.writeRing
+		written = False
+		while self.blockedWriters:
+			packet, fut = self.blockedWriters[0]
+			if not ring.write(packet):
+				break
+			self.blockedWriters.popleft()
+			fut.setResult(None)
+			written = True
+		if not self.blockedWriters:
+			ring.setFlag(WRITER_WAITING, 0)
+		if written:
+			self.notifyReader()
+	
+	def notifyReader(self):
+		ring = self.writeRing
+		if ring.getFlag(READER_WAITING):
+			ring.setFlag(READER_WAITING, 0)
+			self.ringDoorbell()
+	
+	def ringDoorbell(self):
+		try:
+			self.doorbell.send(b"\x00")
+		except BlockingIOError:
+			# The peer already has wake-ups waiting to be read.
+			pass
+		except OSError:
+			self.close()
+	
+	def answerDoorbell(self):
+		try:
+			while True:
+				if not self.doorbell.recv(4096):
+					self.close()
+					return
+		except BlockingIOError:
+			pass
+		self.checkRings()
+	
+	def checkRings(self):
+		""" Wake the reader and any blocked writers if they can proceed.
+		"""
+		waiter = self.readWaiter
+		if waiter is not None and (self.closed or
+		                           not self.readRing.isEmpty()):
+			self.readWaiter = None
+			waiter.setResult(None)
+		if self.blockedWriters:
+			self.drainWriters()
+	
+	def close(self):
+		if self.closed:
+			return
+		self.closed = True
+		self.poll.end()
+		asyncio.get_event_loop().remove_reader(self.doorbell.fileno())
+		self.doorbell.close()
+		while self.blockedWriters:
+			_, fut = self.blockedWriters.popleft()
+			fut.setError(StreamClosed())
+		self.checkRings()
+	
+	def transportClosed(self):
+		""" Close the doorbell and the poll along with the stream.
+		"""
+		self.close()
+		super().transportClosed()
+	
+	@asynchronous
+	def release(self):
+		self.close()
+		yield from self.worker
+
+
+class SharedMemoryPair:
+	""" A pair of shared-memory rings for a parent and a child process.
+	
+	    As with SocketPair, this is created before forking. Afterwards the
+	    parent calls parent() and the child calls child() to obtain its
+	    SharedMemoryTransport. The transports are then used with awaitClient
+	    and Bus.bootstrapOnTransport exactly as any other BootstrapTransport.
+	"""
+	def __init__(self, capacity = 1 << 22):
+		self.toParent = RingBuffer.anonymous(capacity)
+		self.toChild = RingBuffer.anonymous(capacity)
+		self.parentSocket, self.childSocket = socket.socketpair()
+	
+	def parent(self):
+		self.childSocket.close()
+		return SharedMemoryTransport(self.toParent, self.toChild,
+		                             self.parentSocket)
+	
+	def child(self):
+		self.parentSocket.close()
+		return SharedMemoryTransport(self.toChild, self.toParent,
+		                             self.childSocket)
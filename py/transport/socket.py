@@ -7,18 +7,32 @@ from unstuck import *
 # Local imports
 from ..serialize import *
 from ..core_impl import TransportServer, OpenTransport
+from .base       import removeStaleSocket
 from .packet     import *
 
 class SocketStreamServer(TransportServer):
+	""" A TransportServer listening on TCP or on a Unix socket.
+	
+	    The listen address is a port number, a (host, port) pair, or a string
+	    giving the filesystem path of a Unix socket.
+	"""
 	def __init__(self, listenAddress, connectionURI = None, backlog = 2):
 		if isinstance(listenAddress, int):
 			listenAddress = ("localhost",listenAddress)
-		if connectionURI is None:
-			connectionURI = ("tcp://%s:%d"%listenAddress)
+		
+		if isinstance(listenAddress, str):
+			if connectionURI is None:
+				connectionURI = ("unix://%s"%listenAddress)
+			removeStaleSocket(listenAddress)
+			self.listener = USocket(socket.AF_UNIX)
+		else:
+			if connectionURI is None:
+				connectionURI = ("tcp://%s:%d"%listenAddress)
+			self.listener = USocket()
+			self.listener.setsockopt(socket.SOL_SOCKET,
+			                         socket.SO_REUSEADDR, 1)
 		super().__init__(connectionURI)
 		
-		self.listener = USocket()
-		self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 		self.listener.bind(listenAddress)
 		self.listener.listen(backlog)
 		
@@ -52,13 +66,14 @@ class SocketStreamServer(TransportServer):
 			
 			elif self.entryShiboleth is not None:
 				transport = SocketStreamTransport(socket)
-				transport.awaitClient(self.entryConnection)
+				yield from transport.awaitClientCoro(self.entryConnection)
 
 
 class SocketStreamTransport(PacketTransport):
-	def __init__(self, socket):
+	def __init__(self, socket, coalesce = False):
 		self.socket = socket
-		super().__init__(socket.reader.readPacket4, socket.writer.writePacket4)
+		super().__init__(socket.reader.readPacket4, socket.writer.writePacket4,
+		                 coalesce)
 	
 	@asynchronous
 	def release(self):
@@ -72,18 +87,53 @@ class SocketStreamTransport(PacketTransport):
 		port = int(port)
 		return cls.oneStepConnect((addr,port), shiboleth)
 	
+	@classmethod
+	def protocolConnectUnix(cls, path, shiboleth):
+		return cls.oneStepConnect(path, shiboleth)
+	
 	@classmethod
 	def oneStepConnect(cls, address, shiboleth):
 		return await(cls._makeConnect(address, shiboleth))
 	
+	@classmethod
+	def fromSocket(cls, sock):
+		""" Wrap an already connected plain socket as a Transport.
+		"""
+		return cls(USocket(sock.family, sock.type, fileno = sock.detach()))
+	
 	@asynchronous
 	@classmethod
 	def _makeConnect(cls, remoteAddress, shiboleth):
-		socket = USocket()
-		yield from socket.connect(remoteAddress)
-		yield from socket.writer.writePacket4(shiboleth)
-		return cls(socket)
+		if isinstance(remoteAddress, str):
+			sock = USocket(socket.AF_UNIX)
+		else:
+			sock = USocket()
+		yield from sock.connect(remoteAddress)
+		yield from sock.writer.writePacket4(shiboleth)
+		return cls(sock)
+
+
+class SocketPair:
+	""" A connected pair of sockets for a parent and a child process.
+	
+	    The SocketPair is created before forking. Afterwards, the parent calls
+	    parent() and the child calls child() to obtain its Transport, which
+	    closes the other process's end. No entry server or shiboleth is
+	    involved: the parent offers a master Connection with awaitClient and
+	    the child passes its Transport to Bus.bootstrapOnTransport.
+	"""
+	def __init__(self):
+		self.parentSocket, self.childSocket = socket.socketpair()
+	
+	def parent(self):
+		self.childSocket.close()
+		return SocketStreamTransport.fromSocket(self.parentSocket)
+	
+	def child(self):
+		self.parentSocket.close()
+		return SocketStreamTransport.fromSocket(self.childSocket)
 
 
 OpenTransport.registerProtocol("tcp", SocketStreamTransport.protocolConnect)
+OpenTransport.registerProtocol("unix", SocketStreamTransport.protocolConnectUnix)
 
@@ -53,12 +53,12 @@ class WebsocketServer(TransportServer):
 		
 		elif self.entryShiboleth is not None:
 			transport = WebsocketTransport(websocket)
-			transport.awaitClient(self.entryConnection)
+			yield from transport.awaitClientCoro(self.entryConnection)
 
 
 class WebsocketTransport(PacketTransport):
-	def __init__(self, websocket):
-		super().__init__(websocket.recv, websocket.send)
+	def __init__(self, websocket, coalesce = False):
+		super().__init__(websocket.recv, websocket.send, coalesce)
 		self.websocket = websocket
 	
 	@asynchronous
@@ -66,11 +66,6 @@ class WebsocketTransport(PacketTransport):
 		yield from self.websocket.close()
 		yield from self.worker
 	
-	def sendError(self, error):
-		# TODO THIS IS A KLUDGE
-		print(error)
-		while True:pass
-	
 	@classmethod
 	def oneStepConnect(cls, address, shiboleth):
 		return await(cls._makeConnect(address, shiboleth))
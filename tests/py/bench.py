@@ -0,0 +1,341 @@
+""" Module: bench
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file benchmarks the Ripley call path. It measures the round-trip
+    latency and throughput of EVAL calls and the delivery latency and
+    throughput of NOTIFY calls, over the loopback, TCP and WebSocket
+    transports. It also measures the cost of serializing each built-in type
+    and the time taken to bootstrap a bus and to open a route to a service.
+
+    Results are written as JSON, one record per line, to stdout or to the
+    file given with --output, so that runs may be compared by script. Each
+    remote suite runs its client in a forked process against a server bound
+    to a free port, and finishes as soon as the client does.
+
+    Usage: python bench.py [--suite NAME]... [--count N] [--output PATH]
+"""
+
+# System imports
+import argparse
+import io
+import json
+import os
+import platform
+import socket
+import sys
+import time
+
+# Local imports
+from ripley import *
+from ripley.backend import *
+from ripley.bus import *
+from ripley.transport import *
+
+from bench_iface import BenchService
+
+if backendName == "asyncio":
+	tcpServer = AsyncioStreamServer
+	websocketServer = None
+else:
+	tcpServer = SocketStreamServer
+	websocketServer = WebsocketServer
+
+# Number of routes opened when timing service discovery
+ROUTE_COUNT = 10
+
+pingLatencies = []
+
+
+def microseconds():
+	return int(time.monotonic() * 1000000)
+
+
+def echo(msg):
+	return msg
+
+
+def add(a, b, c, d):
+	return a + b + c + d
+
+
+def ping(sentAt):
+	pingLatencies.append(microseconds() - sentAt)
+
+
+def pingStats():
+	latencies = json.dumps(pingLatencies)
+	del pingLatencies[:]
+	return latencies
+
+
+benchService = BenchService.implementation(
+	echo = echo,
+	sum = add,
+	ping = ping,
+	pingStats = pingStats)
+
+
+serialSamples = [
+	(Int8, -100),
+	(Int16, -30000),
+	(Int32, -2000000000),
+	(Int64, -9000000000000000000),
+	(UInt8, 200),
+	(UInt16, 60000),
+	(UInt32, 4000000000),
+	(UInt64, 18000000000000000000),
+	(UnicodeString, "The quick brown fox jumps over the lazy dog"),
+	(URI, "tcp://localhost:1292"),
+	(TransverseID, b"BusMaster::requestConnection"),
+	(MessageID, SerialID.integerToBytes(300)),
+	(ConnectionID, SerialID.integerToBytes(70000)),
+	(BusID, SerialID.integerToBytes(5)),
+	(RouteToken, SerialID.integerToBytes(123456789)),
+	(Reference, (SerialID.integerToBytes(70000),
+	             SerialID.integerToBytes(300)))]
+
+
+class Results:
+	""" Writes benchmark records as lines of JSON.
+	"""
+	def __init__(self, stream):
+		self.stream = stream
+	
+	def emit(self, **record):
+		self.stream.write(json.dumps(record, sort_keys = True) + "\n")
+	
+	def flush(self):
+		self.stream.flush()
+
+
+def summarize(samples):
+	""" Reduce durations in seconds to summary statistics in microseconds.
+	"""
+	ordered = sorted(samples)
+	def percentile(fraction):
+		index = min(len(ordered) - 1, int(fraction * len(ordered)))
+		return ordered[index] * 1e6
+	return {
+		"count" : len(ordered),
+		"mean"  : sum(ordered) / len(ordered) * 1e6,
+		"p50"   : percentile(.5),
+		"p90"   : percentile(.9),
+		"p99"   : percentile(.99),
+		"max"   : ordered[-1] * 1e6}
+
+
+def benchSerialize(count, results):
+	""" Time serialization and deserialization of each built-in type.
+	"""
+	packed = PackedRun(Int32, Int32, Int32, Int32)
+	samples = serialSamples + [(packed, (1, 2, 3, 4))]
+	for cls, value in samples:
+		name = getattr(cls, "__name__", "PackedRun(Int32*4)")
+		outStream = io.BytesIO()
+		start = time.perf_counter()
+		for _ in range(count):
+			outStream.seek(0)
+			cls.serialize(value, outStream)
+		serialTime = time.perf_counter() - start
+		
+		data = outStream.getvalue()
+		start = time.perf_counter()
+		for _ in range(count):
+			decoded = cls.deserialize(ReadBuffer(data))
+		deserialTime = time.perf_counter() - start
+		assert decoded == value, name
+		
+		results.emit(suite = "serialize", type = name, bytes = len(data),
+		             serializeNs = serialTime / count * 1e9,
+		             deserializeNs = deserialTime / count * 1e9)
+
+
+def benchRoutes(client, transport, results):
+	""" Time opening routes to the BenchService and return the last one.
+	"""
+	samples = []
+	for _ in range(ROUTE_COUNT):
+		start = time.perf_counter()
+		gateway = BenchService.on(client)
+		samples.append(time.perf_counter() - start)
+	results.emit(suite = "setup", transport = transport,
+	             metric = "serviceConnect", unit = "us", **summarize(samples))
+	return gateway
+
+
+def benchCalls(gateway, transport, count, results):
+	""" Time EVAL and NOTIFY calls made through gateway.
+	"""
+	# Warm up, so that resolution of the TransverseIDs is not counted
+	gateway.echo("warm")
+	gateway.sum(1, 2, 3, 4)
+	gateway.ping(microseconds())
+	gateway.pingStats()
+	
+	# EVAL: sequential round trips, then as many calls as possible in flight
+	samples = []
+	for _ in range(count):
+		start = time.perf_counter()
+		gateway.echo("x")
+		samples.append(time.perf_counter() - start)
+	results.emit(suite = "call", transport = transport, kind = "eval",
+	             metric = "latency", unit = "us", **summarize(samples))
+	
+	start = time.perf_counter()
+	futures = [gateway.echo.async("x") for _ in range(count)]
+	for fut in futures:
+		await(fut)
+	elapsed = time.perf_counter() - start
+	results.emit(suite = "call", transport = transport, kind = "eval",
+	             metric = "throughput", unit = "calls/s",
+	             value = count / elapsed)
+	
+	start = time.perf_counter()
+	futures = [gateway.sum.async(1, 2, 3, 4) for _ in range(count)]
+	for fut in futures:
+		await(fut)
+	elapsed = time.perf_counter() - start
+	results.emit(suite = "call", transport = transport, kind = "evalPacked",
+	             metric = "throughput", unit = "calls/s",
+	             value = count / elapsed)
+	
+	# NOTIFY has no reply, so latency is one-way, from the timestamp carried
+	# in the call to its receipt. Each notification is fenced by an EVAL so
+	# that it does not queue behind the last.
+	for _ in range(count):
+		gateway.ping(microseconds())
+		gateway.echo("")
+	samples = [latency / 1e6 for latency in json.loads(gateway.pingStats())]
+	results.emit(suite = "call", transport = transport, kind = "notify",
+	             metric = "oneWayLatency", unit = "us", **summarize(samples))
+	
+	start = time.perf_counter()
+	for _ in range(count):
+		gateway.ping(microseconds())
+	delivered = len(json.loads(gateway.pingStats()))
+	elapsed = time.perf_counter() - start
+	results.emit(suite = "call", transport = transport, kind = "notify",
+	             metric = "throughput", unit = "calls/s",
+	             value = delivered / elapsed)
+
+
+def benchLoopback(count, results):
+	""" Benchmark calls between two Connections on a single Bus.
+	"""
+	bus = FullBus()
+	start = time.perf_counter()
+	connection = bus.bootstrapOnLocalMaster(BusMaster(bus))
+	results.emit(suite = "setup", transport = "loopback",
+	             metric = "bootstrap", unit = "us",
+	             value = (time.perf_counter() - start) * 1e6)
+	
+	benchService.offerOn(connection)
+	client = bus.connection()
+	gateway = benchRoutes(client, "loopback", results)
+	benchCalls(gateway, "loopback", count, results)
+
+
+def benchRemote(transport, serverClass, uriFormat, count, results):
+	""" Benchmark calls from a forked client to a Bus served over transport.
+	"""
+	if serverClass is None:
+		results.emit(suite = "call", transport = transport,
+		             skipped = "not available with the %s backend"%backendName)
+		return
+	
+	bus = FullBus()
+	connection = bus.bootstrapOnLocalMaster(BusMaster(bus))
+	port = freePort()
+	server = serverClass(port)
+	server.entryServer(connection)
+	benchService.offerOn(connection)
+	
+	# The asyncio server only listens once its worker has run
+	if backendName == "asyncio":
+		await(server.worker)
+	
+	results.flush()
+	pid = os.fork()
+	if pid == 0:
+		afterFork()
+		try:
+			benchClient(transport, uriFormat%port, count, results)
+		except Exception as error:
+			results.emit(suite = "call", transport = transport,
+			             error = repr(error))
+		finally:
+			results.flush()
+			os._exit(0)
+	
+	while os.waitpid(pid, os.WNOHANG) == (0, 0):
+		await(sleep(.05))
+
+
+def benchClient(transport, uri, count, results):
+	bus = FullBus()
+	start = time.perf_counter()
+	bus.bootstrapOnURI(uri)
+	client = bus.connection()
+	results.emit(suite = "setup", transport = transport,
+	             metric = "bootstrap", unit = "us",
+	             value = (time.perf_counter() - start) * 1e6)
+	
+	gateway = benchRoutes(client, transport, results)
+	benchCalls(gateway, transport, count, results)
+
+
+def afterFork():
+	""" Give the forked child an event loop of its own.
+	"""
+	if backendName == "unstuck":
+		from unstuck import forkDispatcher
+		forkDispatcher()
+	else:
+		import asyncio
+		asyncio.set_event_loop(asyncio.new_event_loop())
+
+
+def freePort():
+	with socket.socket() as sock:
+		sock.bind(("localhost", 0))
+		return sock.getsockname()[1]
+
+
+suites = {
+	"serialize" : lambda count, results:
+		benchSerialize(count * 10, results),
+	"loopback"  : benchLoopback,
+	"tcp"       : lambda count, results:
+		benchRemote("tcp", tcpServer, "tcp://localhost:%d", count, results),
+	"websocket" : lambda count, results:
+		benchRemote("websocket", websocketServer, "ws://localhost:%d", count,
+		            results)}
+
+
+def main():
+	parser = argparse.ArgumentParser(description = "Benchmark Ripley")
+	parser.add_argument("--suite", dest = "suites", action = "append",
+	                    choices = sorted(suites),
+	                    help = "suite to run, may be repeated (default: all)")
+	parser.add_argument("--count", type = int, default = 1000,
+	                    help = "calls per measurement")
+	parser.add_argument("--output", default = "-",
+	                    help = "file to write results to (default: stdout)")
+	args = parser.parse_args()
+	
+	if args.output == "-":
+		stream = sys.stdout
+	else:
+		stream = open(args.output, "w")
+	results = Results(stream)
+	results.emit(suite = "meta", backend = backendName, count = args.count,
+	             python = platform.python_version(), time = time.time())
+	
+	for name in args.suites or sorted(suites):
+		suites[name](args.count, results)
+	results.flush()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,98 @@
+from ripley.serialize import *
+from ripley.interface import *
+from ripley.service import *
+
+
+__all__ = [
+	"BenchService"]
+
+
+class echoProxy(EvaluationProxy):
+	@staticmethod
+	def serializeArguments(cxn, args, outStream):
+		UnicodeString.serialize(args[0], outStream)
+	@staticmethod
+	def deserializeReturn(cxn, inStream):
+		ret0 = UnicodeString.deserialize(inStream)
+		return ret0
+
+
+class sumProxy(EvaluationProxy):
+	argPack0 = PackedRun(Int32, Int32, Int32, Int32)
+	def serializeArguments(self, cxn, args, outStream):
+		self.argPack0.serialize((args[0], args[1], args[2], args[3]), outStream)
+	@staticmethod
+	def deserializeReturn(cxn, inStream):
+		ret0 = Int64.deserialize(inStream)
+		return ret0
+
+
+class pingProxy(NotificationProxy):
+	@staticmethod
+	def serializeArguments(cxn, args, outStream):
+		UInt64.serialize(args[0], outStream)
+
+
+class pingStatsProxy(EvaluationProxy):
+	@staticmethod
+	def serializeArguments(cxn, args, outStream):
+		pass
+	@staticmethod
+	def deserializeReturn(cxn, inStream):
+		ret0 = UnicodeString.deserialize(inStream)
+		return ret0
+
+
+class echoExposed(ExposedCall):
+	transverseID = b"::echo"
+	def __call__(self, cxn, inStream, outStream):
+		arg0 = UnicodeString.deserialize(inStream)
+		return self.complete(self.call(arg0), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
+		UnicodeString.serialize(ret0, outStream)
+
+
+class sumExposed(ExposedCall):
+	transverseID = b"::sum"
+	argPack0 = PackedRun(Int32, Int32, Int32, Int32)
+	def __call__(self, cxn, inStream, outStream):
+		arg0, arg1, arg2, arg3 = self.argPack0.deserialize(inStream)
+		return self.complete(self.call(arg0, arg1, arg2, arg3), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
+		Int64.serialize(ret0, outStream)
+
+
+class pingExposed(ExposedCall):
+	transverseID = b"::ping"
+	def __call__(self, cxn, inStream):
+		arg0 = UInt64.deserialize(inStream)
+		return self.complete(self.call(arg0), cxn, None)
+
+
+class pingStatsExposed(ExposedCall):
+	transverseID = b"::pingStats"
+	def __call__(self, cxn, inStream, outStream):
+		return self.complete(self.call(), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
+		UnicodeString.serialize(ret0, outStream)
+
+
+class BenchService(Service):
+	transverseID = b"@73cf75f8"
+	echo = echoProxy(b"::echo")
+	sum = sumProxy(b"::sum")
+	ping = pingProxy(b"::ping")
+	pingStats = pingStatsProxy(b"::pingStats")
+	@classmethod
+	def getExposed(cls):
+		return {
+			"echo" : echoExposed,
+			"sum" : sumExposed,
+			"ping" : pingExposed,
+			"pingStats" : pingStatsExposed
+		}
+
+
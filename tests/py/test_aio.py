@@ -0,0 +1,62 @@
+""" Module: test_aio
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests opening a Route to a Service offered on another Bus, over
+    TCP, with the asyncio backend. Both Busses share the one event loop, so
+    the BusMaster must connect the Route without blocking it.
+
+    Usage: RIPLEY_BACKEND=asyncio python -m unittest test_aio
+"""
+
+# System imports
+import socket
+import unittest
+
+# Local imports
+from ripley import *
+from ripley.backend import *
+from ripley.bus import FullBus
+from ripley.transport import *
+from bench_iface import BenchService
+
+
+def freePort():
+	with socket.socket() as sock:
+		sock.bind(("localhost", 0))
+		return sock.getsockname()[1]
+
+
+@unittest.skipUnless(backendName == "asyncio", "needs the asyncio backend")
+class CrossBusTest(unittest.TestCase):
+	def setUp(self):
+		self.masterBus = FullBus()
+		connection = self.masterBus.bootstrapOnLocalMaster(
+		                                          BusMaster(self.masterBus))
+		self.server = AsyncioStreamServer(freePort())
+		self.server.entryServer(connection)
+		await(self.server.worker)
+		BenchService.implementation(echo = lambda msg: msg,
+		                            sum = lambda a, b, c, d: a + b + c + d,
+		                            ping = lambda sentAt: None,
+		                            pingStats = lambda: "[]"
+		                            ).offerOn(connection)
+		
+		self.bus = FullBus()
+		self.bus.bootstrapOnURI(self.server.connectionURI)
+		self.client = self.bus.connection()
+	
+	def tearDown(self):
+		self.server.worker.result().close()
+	
+	def test_on(self):
+		gateway = BenchService.on(self.client)
+		self.assertEqual(gateway.echo("across"), "across")
+		self.assertEqual(gateway.sum(1, 2, 3, 4), 10)
+	
+	def test_onCoro(self):
+		@asynchronous
+		def openAndCall():
+			gateway = yield from BenchService.onCoro(self.client)
+			return (yield from gateway.echo.coro("across"))
+		self.assertEqual(await(openAndCall()), "across")
@@ -0,0 +1,102 @@
+""" Module: test_cache
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests the eviction of resolved TransverseIDs from the
+    ResolutionCache, both by recency of use and when the Transport to the
+    Bus they were resolved on is closed.
+
+    Usage: python -m unittest test_cache
+"""
+
+# System imports
+import unittest
+
+# Local imports
+from ripley.backend import StreamClosed
+from ripley.bus import FullBus
+from ripley.cache import ResolutionCache
+from ripley.transport.packet import PacketTransport
+
+
+class ResolutionCacheTest(unittest.TestCase):
+	def test_leastRecentlyUsed(self):
+		cache = ResolutionCache(3)
+		for name in (b"a", b"b", b"c"):
+			cache.put(b"\x01", name, name.upper())
+		self.assertEqual(cache.get(b"\x01", b"a"), b"A")
+		cache.put(b"\x01", b"d", b"D")
+		self.assertIsNone(cache.get(b"\x01", b"b"))
+		self.assertEqual([cache.get(b"\x01", name) for name in (b"a", b"c", b"d")],
+		                 [b"A", b"C", b"D"])
+		self.assertEqual((cache.hits, cache.misses, cache.evictions), (4, 1, 1))
+		self.assertEqual(len(cache), 3)
+	
+	def test_putRefreshes(self):
+		cache = ResolutionCache(2)
+		cache.put(b"\x01", b"a", 1)
+		cache.put(b"\x01", b"b", 2)
+		cache.put(b"\x01", b"a", 3)
+		cache.put(b"\x01", b"c", 4)
+		self.assertEqual(cache.get(b"\x01", b"a"), 3)
+		self.assertIsNone(cache.get(b"\x01", b"b"))
+		self.assertEqual(cache.evictions, 1)
+	
+	def test_evictionForgetsBus(self):
+		cache = ResolutionCache(2)
+		cache.put(b"\x01", b"a", 1)
+		cache.put(b"\x02", b"a", 2)
+		cache.put(b"\x02", b"b", 3)
+		self.assertNotIn(b"\x01", cache.busEntries)
+		cache.invalidateBus(b"\x02")
+		self.assertEqual(len(cache), 0)
+		self.assertEqual(cache.busEntries, {})
+	
+	def test_invalidateBus(self):
+		cache = ResolutionCache()
+		cache.put(b"\x01", b"a", 1)
+		cache.put(b"\x02", b"a", 2)
+		cache.invalidateBus(b"\x01")
+		cache.invalidateBus(b"\x03")
+		self.assertIsNone(cache.get(b"\x01", b"a"))
+		self.assertEqual(cache.get(b"\x02", b"a"), 2)
+
+
+class TransportCloseTest(unittest.TestCase):
+	def setUp(self):
+		def readPacket():
+			raise(StreamClosed)
+			yield
+		def writePacket(packet):
+			raise(StreamClosed)
+			yield
+		self.bus = FullBus()
+		self.transport = PacketTransport(readPacket, writePacket)
+		self.transport.remoteBusID = b"\x05"
+		self.cache = ResolutionCache()
+		self.cache.put(b"\x05", b"a", 1)
+		self.cache.put(b"\x06", b"a", 2)
+		self.transport.resolutionCaches.add(self.cache)
+		self.bus.registerTransport(b"\x05", self.transport)
+	
+	def close(self):
+		# Run the read loop, which ends at once as the stream is closed
+		for _ in self.transport.ioLoop():
+			pass
+	
+	def test_closeEvicts(self):
+		self.close()
+		self.assertIsNone(self.cache.get(b"\x05", b"a"))
+		self.assertEqual(self.cache.get(b"\x06", b"a"), 2)
+		self.assertNotIn(b"\x05", self.bus.transports)
+	
+	def test_replacedTransportKept(self):
+		replacement = PacketTransport(None, None)
+		self.bus.registerTransport(b"\x05", replacement)
+		self.close()
+		self.assertIsNone(self.cache.get(b"\x05", b"a"))
+		self.assertIs(self.bus.transports[b"\x05"], replacement)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,205 @@
+""" Module: test_cancel
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests that cancelling the Future of a call in flight frees
+    its message ID and sends a CANCEL to the callee, whether the call is
+    waiting for its reply or is still held back by a congested Transport,
+    and that a reply is sent even when its task runs as soon as it is
+    scheduled.
+
+    Usage: python -m unittest test_cancel
+"""
+
+# System imports
+import collections
+import unittest
+import unittest.mock
+
+# Local imports
+from ripley import *
+from ripley.backend import *
+from ripley import connection
+from ripley.bus import FullBus
+from ripley.headers import HEADER_CANCEL
+from ripley.transport.packet import PacketTransport
+from bench_iface import BenchService
+
+
+class Pipe:
+	""" One direction of an in-memory packet stream.
+	"""
+	def __init__(self):
+		self.packets = collections.deque()
+		self.waiter = None
+	
+	@asynchronous
+	def write(self, packet):
+		self.packets.append(bytes(packet))
+		waiter, self.waiter = self.waiter, None
+		if waiter is not None:
+			waiter.setResult(None)
+		if False:
+			yield
+	
+	@asynchronous
+	def read(self):
+		while not self.packets:
+			self.waiter = Future()
+			yield from self.waiter
+		return self.packets.popleft()
+
+
+def abandon(fut):
+	""" Complete fut as cancelled, without touching the call behind it.
+	
+	    This is what unstuck does on cancelling a Task. An asyncio Task can
+	    only be completed by its own coroutine, so the tests using this are
+	    skipped with the asyncio backend.
+	"""
+	fut.setError(CancelledError())
+
+
+def eagerAsync(coro):
+	""" Run coro at once, as some backends do on scheduling it.
+	
+	    The coroutine must complete without waiting.
+	"""
+	fut = Future()
+	try:
+		coro.send(None)
+	except StopIteration as done:
+		fut.setResult(done.value)
+		return fut
+	raise(AssertionError("the coroutine waited"))
+
+
+skipAbandon = unittest.skipIf(backendName == "asyncio",
+                              "asyncio Tasks cannot be completed from outside")
+
+
+class CancelTest(unittest.TestCase):
+	def setUp(self):
+		self.log = []
+		def echo(message):
+			def later():
+				try:
+					yield from sleep(float(message))
+				except BaseException:
+					self.log.append("interrupted")
+					raise
+				self.log.append("finished")
+				return message
+			return later()
+		implementation = BenchService.implementation(
+		                          echo = echo, sum = None, ping = None,
+		                          pingStats = None)
+		self.bus = FullBus()
+		self.server = self.bus.bootstrapOnLocalMaster(BusMaster(self.bus))
+		implementation.offerOn(self.server)
+		self.client = self.bus.connection()
+		self.service = BenchService.on(self.client)
+		self.assertEqual(self.service.echo("0"), "0")
+	
+	def cancelInFlight(self, cancelWith):
+		fut = self.service.echo.async(".5")
+		await(sleep(.05))
+		self.assertEqual(len(self.bus.pendingMessages), 1)
+		cancelWith(fut)
+		await(sleep(.05))
+		self.assertEqual(self.bus.pendingMessages, {})
+		self.assertEqual(self.server.runningCalls, {})
+		self.assertEqual(self.log, ["finished", "interrupted"])
+	
+	def sendBatch(self):
+		batch = Batch(self.client, self.service.echo.route)
+		futures = [batch.call(self.service.echo, ".5") for _ in range(2)]
+		batch.send()
+		await(sleep(.05))
+		self.assertEqual(len(self.bus.pendingMessages), 1)
+		return batch, futures
+	
+	def test_cancelBatch(self):
+		batch, futures = self.sendBatch()
+		batch.cancel()
+		await(sleep(.05))
+		self.assertEqual(self.bus.pendingMessages, {})
+		self.assertEqual(self.server.runningCalls, {})
+		self.assertEqual(self.log, ["finished", "interrupted", "interrupted"])
+	
+	def test_cancelBatchCalls(self):
+		# The batch is cancelled at the callee only once every call is
+		batch, futures = self.sendBatch()
+		cancel(futures[0])
+		await(sleep(.05))
+		self.assertEqual(len(self.bus.pendingMessages), 1)
+		cancel(futures[1])
+		await(sleep(.05))
+		self.assertEqual(self.bus.pendingMessages, {})
+		self.assertEqual(self.server.runningCalls, {})
+		self.assertEqual(self.log, ["finished", "interrupted", "interrupted"])
+	
+	def test_cancel(self):
+		self.cancelInFlight(cancel)
+	
+	@skipAbandon
+	def test_abandon(self):
+		self.cancelInFlight(abandon)
+	
+	def cancelCongested(self, cancelWith):
+		toServer, toClient = Pipe(), Pipe()
+		serverSide = PacketTransport(toServer.read, toClient.write)
+		clientSide = PacketTransport(toClient.read, toServer.write)
+		async(serverSide.awaitClientCoro(self.server))
+		clientBus = FullBus()
+		client = await(clientBus.bootstrapOnTransportCoro(clientSide))
+		service = BenchService.on(client)
+		self.assertEqual(service.echo("0"), "0")
+		
+		# Hold every message back, for want of credit and room
+		clientSide.sendCredit = 0
+		clientSide.highWater = 0
+		fut = service.echo.async(".5")
+		await(sleep(.05))
+		self.assertEqual(len(clientSide.heldWriters), 1)
+		self.assertEqual(len(clientBus.pendingMessages), 1)
+		
+		cancelWith(fut)
+		await(sleep(.05))
+		self.assertEqual(clientBus.pendingMessages, {})
+		queued = [bytes(packet) for queue in clientSide.sendQueues
+		          for packet, *_ in queue]
+		self.assertEqual(sum(HEADER_CANCEL in packet for packet in queued), 1)
+	
+	def test_cancelCongested(self):
+		self.cancelCongested(cancel)
+	
+	@skipAbandon
+	def test_abandonCongested(self):
+		self.cancelCongested(abandon)
+
+
+class EagerReplyTest(unittest.TestCase):
+	def setUp(self):
+		def echo(message):
+			done = Future()
+			done.setResult(message)
+			return done
+		implementation = BenchService.implementation(
+		                          echo = echo, sum = None, ping = None,
+		                          pingStats = None)
+		self.bus = FullBus()
+		self.server = self.bus.bootstrapOnLocalMaster(BusMaster(self.bus))
+		implementation.offerOn(self.server)
+		self.client = self.bus.connection()
+		self.service = BenchService.on(self.client)
+	
+	def test_reply(self):
+		with unittest.mock.patch.object(connection, "async", eagerAsync):
+			self.assertEqual(self.service.echo("now"), "now")
+		self.assertEqual(self.bus.pendingMessages, {})
+		self.assertEqual(self.server.runningCalls, {})
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,103 @@
+""" Module: test_deadline
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests that the deadline of a call stays active for the whole
+    of an implementation which completes later, across each of its resumes.
+
+    Usage: python -m unittest test_deadline
+"""
+
+# System imports
+import threading
+import time
+import unittest
+
+# Local imports
+from ripley.interface import CallDeadline
+
+
+class Waiting:
+	""" Stands in for whatever an implementation waits on.
+	"""
+	def __iter__(self):
+		return (yield self)
+
+
+class CallDeadlineTest(unittest.TestCase):
+	def setUp(self):
+		self.seen = []
+	
+	def implementation(self):
+		self.seen.append(CallDeadline.get())
+		first = yield from Waiting()
+		self.seen.append(CallDeadline.get())
+		try:
+			yield from Waiting()
+		except KeyError:
+			self.seen.append(CallDeadline.get())
+		return first
+	
+	def test_resumes(self):
+		deadline = time.monotonic() + 60
+		steps = CallDeadline.within(deadline, self.implementation())
+		self.assertIsInstance(next(steps), Waiting)
+		self.assertIsNone(CallDeadline.get())
+		steps.send("first")
+		self.assertIsNone(CallDeadline.get())
+		with self.assertRaises(StopIteration) as stop:
+			steps.throw(KeyError())
+		self.assertEqual(stop.exception.value, "first")
+		self.assertEqual(self.seen, [deadline] * 3)
+		self.assertIsNone(CallDeadline.get())
+	
+	def test_inherit(self):
+		deadline = time.monotonic() + 60
+		def implementation():
+			yield from Waiting()
+			return CallDeadline.inherit(None), CallDeadline.inherit(5)
+		steps = CallDeadline.within(deadline, implementation())
+		next(steps)
+		self.assertIsNone(CallDeadline.inherit(None))
+		with self.assertRaises(StopIteration) as stop:
+			steps.send(None)
+		remaining, given = stop.exception.value
+		self.assertTrue(0 < remaining <= 60)
+		self.assertEqual(given, 5)
+	
+	def test_nested(self):
+		outer = time.monotonic() + 120
+		CallDeadline.set(outer)
+		try:
+			steps = CallDeadline.within(outer - 60, self.implementation())
+			next(steps)
+			self.assertEqual(CallDeadline.get(), outer)
+		finally:
+			CallDeadline.set(None)
+		steps.close()
+		self.assertEqual(self.seen, [outer - 60])
+	
+	def test_perThread(self):
+		deadline = time.monotonic() + 60
+		seen = []
+		def worker():
+			seen.append(CallDeadline.get())
+			CallDeadline.set(deadline + 60)
+			seen.append(CallDeadline.get())
+		CallDeadline.set(deadline)
+		try:
+			thread = threading.Thread(target = worker)
+			thread.start()
+			thread.join()
+			self.assertEqual(CallDeadline.get(), deadline)
+		finally:
+			CallDeadline.set(None)
+		self.assertEqual(seen, [None, deadline + 60])
+	
+	def test_noDeadline(self):
+		pending = self.implementation()
+		self.assertIs(CallDeadline.within(None, pending), pending)
+
+
+if __name__ == "__main__":
+	unittest.main()
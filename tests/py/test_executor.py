@@ -0,0 +1,124 @@
+""" Module: test_executor
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests that results computed on the worker threads of a
+    ThreadExecutor all reach the event loop, and that each worker sees the
+    deadline of the call it is running, and that a ProcessExecutor refuses
+    calls that pass objects by reference.
+
+    Usage: python -m unittest test_executor
+"""
+
+# System imports
+import threading
+import time
+import unittest
+
+# Local imports
+from ripley.backend import *
+from ripley.executor import ThreadExecutor, ProcessExecutor
+from ripley.interface import CallDeadline, ExposedCall
+from ripley.serialize import *
+from bench_iface import echoExposed
+from test_iface import Test
+
+
+class ThreadExecutorTest(unittest.TestCase):
+	def setUp(self):
+		self.executor = ThreadExecutor(8)
+	
+	def tearDown(self):
+		self.executor.shutdown()
+	
+	@asynchronous
+	def gather(self, futures):
+		results = []
+		for fut in futures:
+			results.append((yield from fut))
+		return results
+	
+	def test_manyCalls(self):
+		loopThread = threading.get_ident()
+		def work(value):
+			self.assertNotEqual(threading.get_ident(), loopThread)
+			time.sleep(.001 * (value % 3))
+			return value * value
+		futures = [self.executor.submit(work, value) for value in range(1000)]
+		results = await(self.gather(futures))
+		self.assertEqual(results, [value * value for value in range(1000)])
+	
+	def test_errors(self):
+		def work(value):
+			if value % 2:
+				raise(KeyError(value))
+			return value
+		futures = [self.executor.submit(work, value) for value in range(20)]
+		for value, fut in enumerate(futures):
+			if value % 2:
+				with self.assertRaises(KeyError):
+					await(fut)
+			else:
+				self.assertEqual(await(fut), value)
+	
+	def test_deadline(self):
+		deadline = time.monotonic() + 60
+		CallDeadline.set(deadline)
+		try:
+			within = self.executor.submit(CallDeadline.get)
+		finally:
+			CallDeadline.set(None)
+		without = self.executor.submit(CallDeadline.get)
+		self.assertEqual(await(self.gather([within, without])), [deadline, None])
+
+
+class passObjectExposed(ExposedCall):
+	transverseID = b"passObject"
+	def __call__(self, cxn, inStream, outStream):
+		arg0 = cxn.deserializeObject(inStream, Test)
+		return self.complete(self.call(arg0), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		Int32.serialize(ret, outStream)
+
+
+class returnObjectExposed(ExposedCall):
+	transverseID = b"returnObject"
+	def __call__(self, cxn, inStream, outStream):
+		arg0 = Int32.deserialize(inStream)
+		return self.complete(self.call(arg0), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
+		cxn.serializeObject(ret0, outStream)
+
+
+class getConnectionExposed(ExposedCall):
+	transverseID = b"getConnection"
+	def __call__(self, cxn, inStream):
+		arg0 = GetMyConnection.deserialize(cxn, inStream)
+		return self.complete(self.call(arg0), cxn, None)
+
+
+def echo(msg):
+	return msg
+
+
+class ProcessExecutorTest(unittest.TestCase):
+	def setUp(self):
+		self.executor = ProcessExecutor(1)
+	
+	def tearDown(self):
+		self.executor.shutdown()
+	
+	def test_values(self):
+		call = self.executor.expose(echoExposed, echo)
+		self.assertEqual(call.transverseID, echoExposed.transverseID)
+	
+	def test_byReference(self):
+		for iface in (passObjectExposed, returnObjectExposed,
+		              getConnectionExposed):
+			with self.assertRaisesRegex(TypeError, "cannot be run in a ProcessExecutor"):
+				self.executor.expose(iface, echo)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,89 @@
+""" Module: test_exports
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests the export of objects by identity through the
+    ExportTable, and the reuse of the slots of removed objects, including
+    those whose object IDs take more than one byte.
+
+    Usage: python -m unittest test_exports
+"""
+
+# System imports
+import unittest
+
+# Local imports
+from ripley.exports import ExportTable
+from ripley.serialize import SerialID
+
+
+class Unhashable:
+	__hash__ = None
+	
+	def __eq__(self, other):
+		raise(AssertionError("compared by equality"))
+
+
+class ExportTableTest(unittest.TestCase):
+	def setUp(self):
+		self.table = ExportTable()
+		self.objects = [Unhashable() for _ in range(300)]
+		self.objectIDs = [self.table.export(obj) for obj in self.objects]
+	
+	def test_identity(self):
+		for objectID, obj in zip(self.objectIDs, self.objects):
+			self.assertIs(self.table.export(obj), objectID)
+			self.assertIs(self.table.lookup(objectID), obj)
+		self.assertEqual(len(self.table), len(self.objects))
+	
+	def test_slotIDs(self):
+		for slot, objectID in enumerate(self.objectIDs):
+			self.assertEqual(SerialID.bytesToInteger(objectID), slot)
+		self.assertEqual(len(self.objectIDs[127]), 1)
+		self.assertEqual(len(self.objectIDs[128]), 2)
+	
+	def test_remove(self):
+		objectID = self.objectIDs[200]
+		self.table.remove(objectID)
+		self.assertNotIn(objectID, self.table)
+		with self.assertRaises(KeyError):
+			self.table.lookup(objectID)
+		self.table.remove(objectID)
+		self.table.remove(SerialID.integerToBytes(5000))
+		self.assertEqual(len(self.table), len(self.objects) - 1)
+	
+	def test_reuseOldestFirst(self):
+		freed = [255, 128, 3, 129]
+		for slot in freed:
+			self.table.remove(self.objectIDs[slot])
+		replacements = [Unhashable() for _ in freed]
+		reused = [self.table.export(obj) for obj in replacements]
+		self.assertEqual(reused, [self.objectIDs[slot] for slot in freed])
+		for objectID, obj in zip(reused, replacements):
+			self.assertIs(self.table.lookup(objectID), obj)
+		self.assertEqual(SerialID.bytesToInteger(self.table.export(Unhashable())),
+		                 len(self.objects))
+	
+	def test_reuseAbove128(self):
+		# Slots of 128 and above have multi-byte IDs, which must decode back
+		# to the slot they were freed from
+		for slot in range(128, 300):
+			self.table.remove(self.objectIDs[slot])
+		self.assertEqual(len(self.table), 128)
+		for slot in range(128, 300):
+			obj = Unhashable()
+			objectID = self.table.export(obj)
+			self.assertEqual(objectID, self.objectIDs[slot])
+			self.assertIs(self.table.lookup(objectID), obj)
+		self.assertEqual(len(self.table.slots), len(self.objects))
+	
+	def test_reexport(self):
+		obj = self.objects[150]
+		self.table.remove(self.objectIDs[150])
+		self.table.remove(self.objectIDs[151])
+		self.assertEqual(self.table.export(obj), self.objectIDs[150])
+		self.assertIs(self.table.export(obj), self.objectIDs[150])
+
+
+if __name__ == "__main__":
+	unittest.main()
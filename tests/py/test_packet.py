@@ -0,0 +1,431 @@
+""" Module: test_packet
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests the PacketTransport over an in-memory stream: the
+    fragmentation and reassembly of large messages, the refusal of those
+    too large to send, the priority class in which a batch is answered, and
+    what becomes of the messages queued for sending once the stream is lost.
+
+    Usage: python -m unittest test_packet
+"""
+
+# System imports
+import collections
+import unittest
+
+# Local imports
+from ripley import BusMaster, Batch
+from ripley.backend import *
+from ripley.bus import FullBus
+from ripley.headers import PRIORITY_CONTROL, PRIORITY_NORMAL, PRIORITY_BULK
+from ripley.serialize import SerialID
+from ripley.transport.packet import PacketTransport, MessageTooLarge
+from ripley.transport.packet import (FRAGMENT_START_CODE, FRAGMENT_CODE,
+                                     FRAGMENT_END_CODE)
+from bench_iface import BenchService, echoProxy
+
+
+class Pipe:
+	""" One direction of an in-memory packet stream.
+	
+	    Writes can be paused, to hold up the writer, and the stream can be
+	    closed.
+	"""
+	def __init__(self):
+		self.packets = collections.deque()
+		self.waiter = None
+		self.paused = None
+		self.closed = False
+	
+	@asynchronous
+	def write(self, packet):
+		while self.paused is not None:
+			yield from self.paused
+		if self.closed:
+			raise(StreamClosed)
+		self.packets.append(bytes(packet))
+		self.wake()
+	
+	def pause(self):
+		self.paused = Future()
+	
+	def resume(self):
+		paused, self.paused = self.paused, None
+		paused.setResult(None)
+	
+	@asynchronous
+	def read(self):
+		while not self.packets:
+			if self.closed:
+				raise(StreamClosed)
+			self.waiter = Future()
+			yield from self.waiter
+		return self.packets.popleft()
+	
+	def close(self):
+		self.closed = True
+		self.wake()
+	
+	def wake(self):
+		waiter, self.waiter = self.waiter, None
+		if waiter is not None:
+			waiter.setResult(None)
+
+
+class Endpoint:
+	""" Stands in for the Route, and its Connection, that messages reach.
+	"""
+	def __init__(self):
+		self.connection = self
+		self.received = []
+	
+	def handleReceived(self, route, inStream):
+		self.received.append(bytes(inStream.read()))
+
+
+class FragmentTest(unittest.TestCase):
+	def setUp(self):
+		self.toReceiver = toReceiver = Pipe()
+		toSender = Pipe()
+		self.sender = PacketTransport(toSender.read, toReceiver.write)
+		self.receiver = PacketTransport(toReceiver.read, toSender.write)
+		for transport in (self.sender, self.receiver):
+			transport.fragmentSize = 1000
+			transport.engageTransport(b"\x01")
+		self.endpoint = Endpoint()
+		self.receiver.routeEndpoints[b"\x05"] = self.endpoint
+	
+	def send(self, payload, priority = PRIORITY_NORMAL, routeCode = b"\x05"):
+		outStream = self.sender.openBuffer(routeCode, priority)
+		outStream.write(payload)
+		outStream.commit()
+	
+	def payload(self, size, seed):
+		return bytes((seed + index) % 251 for index in range(size))
+	
+	def test_roundTrip(self):
+		sizes = [999, 1000, 1001, 2000, 2001, 25000]
+		payloads = [self.payload(size, seed)
+		            for seed, size in enumerate(sizes)]
+		for payload in payloads:
+			self.send(payload)
+		await(sleep(.05))
+		self.assertEqual(self.endpoint.received, payloads)
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_interleaved(self):
+		# Messages of a higher priority go out between the fragments of a
+		# large one, while those of its own class wait for it to finish
+		large = self.payload(10000, 1)
+		self.toReceiver.pause()
+		self.send(large, PRIORITY_BULK)
+		await(sleep(.01))
+		self.send(b"control", PRIORITY_CONTROL)
+		self.send(b"bulk", PRIORITY_BULK)
+		self.toReceiver.resume()
+		await(sleep(.05))
+		self.assertEqual(self.endpoint.received, [b"control", large, b"bulk"])
+	
+	def test_concurrent(self):
+		# Large messages of different priorities are reassembled side by side
+		first = self.payload(5000, 2)
+		second = self.payload(3000, 3)
+		self.toReceiver.pause()
+		self.send(first, PRIORITY_BULK)
+		await(sleep(.01))
+		self.send(second, PRIORITY_NORMAL)
+		self.toReceiver.resume()
+		await(sleep(.05))
+		self.assertEqual(self.endpoint.received, [second, first])
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_unknownRoute(self):
+		self.send(self.payload(5000, 4), routeCode = b"\x06")
+		self.send(b"after")
+		await(sleep(.05))
+		self.assertEqual(self.endpoint.received, [b"after"])
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_tooLarge(self):
+		self.sender.maxMessageSize = 5000
+		with self.assertRaises(MessageTooLarge):
+			self.send(self.payload(5000, 5))
+		self.assertEqual(self.sender.queuedBytes, 0)
+		self.send(self.payload(4999, 6))
+		await(sleep(.05))
+		self.assertEqual(self.endpoint.received, [self.payload(4999, 6)])
+
+
+class bulkEchoProxy(echoProxy):
+	priority = PRIORITY_BULK
+
+
+class BulkBenchService(BenchService):
+	echo = bulkEchoProxy(b"::echo")
+
+
+class RemoteTest(unittest.TestCase):
+	""" Calls between two Busses over PacketTransports.
+	"""
+	# Keyword arguments for both PacketTransports
+	options = {}
+	
+	def setUp(self):
+		bus = FullBus()
+		server = bus.bootstrapOnLocalMaster(BusMaster(bus))
+		BenchService.implementation(echo = lambda message: message,
+		                            sum = None, ping = None, pingStats = None
+		                            ).offerOn(server)
+		toServer, toClient = Pipe(), Pipe()
+		self.serverSide = PacketTransport(toServer.read, toClient.write,
+		                                  **self.options)
+		self.clientSide = PacketTransport(toClient.read, toServer.write,
+		                                  **self.options)
+		async(self.serverSide.awaitClientCoro(server))
+		self.bus = FullBus()
+		client = await(self.bus.bootstrapOnTransportCoro(self.clientSide))
+		self.service = BenchService.on(client)
+		self.assertEqual(self.service.echo("0"), "0")
+	
+	def recordPriorities(self, transport):
+		""" Record the priority class of each message transport queues.
+		"""
+		priorities = []
+		queuePacket = transport.queuePacket
+		def record(packet, routeCode, priority = PRIORITY_NORMAL):
+			priorities.append(priority)
+			return queuePacket(packet, routeCode, priority)
+		transport.queuePacket = record
+		return priorities
+
+
+class BatchPriorityTest(RemoteTest):
+	def sendBatch(self, service):
+		batch = Batch(service.destination.connection, service.destination)
+		futures = [batch.call(service.echo, str(index)) for index in range(3)]
+		batch.send()
+		self.assertEqual([await(fut) for fut in futures], ["0", "1", "2"])
+	
+	def test_normal(self):
+		sent = self.recordPriorities(self.clientSide)
+		replied = self.recordPriorities(self.serverSide)
+		self.sendBatch(self.service)
+		self.assertEqual((sent, replied), ([PRIORITY_NORMAL], [PRIORITY_NORMAL]))
+	
+	def test_bulk(self):
+		# The reply comes back in the class the batch was sent in
+		sent = self.recordPriorities(self.clientSide)
+		replied = self.recordPriorities(self.serverSide)
+		self.sendBatch(BulkBenchService(self.service.destination))
+		self.assertEqual((sent, replied), ([PRIORITY_BULK], [PRIORITY_BULK]))
+	
+	def test_mostUrgent(self):
+		batch = Batch(self.service.destination.connection,
+		              self.service.destination)
+		bulk = BulkBenchService(self.service.destination)
+		batch.call(bulk.echo, "bulk")
+		self.assertEqual(batch.priority, PRIORITY_BULK)
+		batch.call(self.service.echo, "normal")
+		self.assertEqual(batch.priority, PRIORITY_NORMAL)
+		batch.abandon()
+
+
+class MessageLimitTest(RemoteTest):
+	""" Calls over Transports with a small limit on the size of messages.
+	"""
+	options = {"maxMessageSize" : 10000}
+	
+	def test_defaults(self):
+		transport = PacketTransport(None, None, maxMessageSize = 1000)
+		self.assertEqual(transport.maxReassembly, 1000 * (PRIORITY_BULK + 1))
+		self.assertEqual(PacketTransport(None, None).maxMessageSize, 1 << 30)
+	
+	def test_callTooLarge(self):
+		# The caller sees the failure at once, rather than at its deadline
+		with self.assertRaises(MessageTooLarge):
+			self.service.echo("x" * 20000)
+		await(sleep(.01))
+		self.assertEqual(self.bus.pendingMessages, {})
+		self.assertEqual(self.service.echo("x" * 9000), "x" * 9000)
+
+
+class ReassemblyTest(unittest.TestCase):
+	""" Feeds fragments straight to a receiver, as a faulty peer might.
+	"""
+	def setUp(self):
+		self.receiver = PacketTransport(None, None)
+		self.receiver.fragmentSize = 1000
+		self.endpoint = Endpoint()
+		self.receiver.routeEndpoints[b"\x05"] = self.endpoint
+	
+	def frames(self, size, fragmentID, routeCode = b"\x05"):
+		""" Return the frames of a message of size bytes, after its route code.
+		"""
+		packet = routeCode + bytes(index % 251 for index in range(size))
+		fragmentID = SerialID.integerToBytes(fragmentID)
+		offsets = list(range(0, len(packet), 1000)) + [len(packet)]
+		return [self.receiver.packFragment(packet, routeCode, fragmentID,
+		                                   start, end)
+		        for start, end in zip(offsets, offsets[1:])]
+	
+	def frame(self, code, fragmentID, chunk, size = None):
+		""" Frame a single fragment by hand, declaring any size at all.
+		"""
+		header = code + b"\x05" + SerialID.integerToBytes(fragmentID)
+		if size is not None:
+			header += SerialID.integerToBytes(size)
+		return header + chunk
+	
+	def receive(self, *frames):
+		for frame in frames:
+			self.receiver.receiveFragment(frame[:2], frame)
+		await(sleep(.01))
+		held = sum(len(buffer) for buffer, _ in self.receiver.fragments.values())
+		self.assertEqual(self.receiver.reassemblyBytes, held)
+		return [len(message) for message in self.endpoint.received]
+	
+	def test_whole(self):
+		self.assertEqual(self.receive(*self.frames(2500, 1)), [2500])
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_growsAsReceived(self):
+		# Declaring a large message allocates nothing ahead of its bytes
+		declared = self.receiver.maxMessageSize
+		self.receive(self.frame(FRAGMENT_START_CODE, 1, b"\x05abc", declared))
+		buffer, size = self.receiver.fragments[b"\x05", b"\x01"]
+		self.assertEqual((len(buffer), size), (4, declared))
+		self.assertEqual(self.receiver.reassemblyBytes, 4)
+	
+	def test_oversizeStart(self):
+		self.receiver.maxMessageSize = 2000
+		self.assertEqual(self.receive(*self.frames(2500, 1)), [])
+		self.assertEqual(self.receiver.fragments, {})
+		self.assertEqual(self.receive(*self.frames(1500, 2)), [1500])
+	
+	def test_overrun(self):
+		frames = [self.frame(FRAGMENT_START_CODE, 1, b"\x05" + b"x" * 999, 1500),
+		          self.frame(FRAGMENT_CODE, 1, b"x" * 1000),
+		          self.frame(FRAGMENT_END_CODE, 1, b"")]
+		self.assertEqual(self.receive(*frames), [])
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_shortEnd(self):
+		frames = [self.frame(FRAGMENT_START_CODE, 1, b"\x05" + b"x" * 999, 3000),
+		          self.frame(FRAGMENT_END_CODE, 1, b"x" * 1000)]
+		self.assertEqual(self.receive(*frames), [])
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_missingEnd(self):
+		# A message that loses its end is dropped once more messages are
+		# being reassembled than the peer could send at once
+		lost = self.frames(2500, 1)
+		self.receive(*lost[:-1])
+		started = [self.frames(2500, fragmentID)
+		           for fragmentID in range(2, PRIORITY_BULK + 3)]
+		for frames in started[:-1]:
+			self.receive(frames[0])
+		self.assertIn((b"\x05", b"\x01"), self.receiver.fragments)
+		self.receive(started[-1][0])
+		self.assertNotIn((b"\x05", b"\x01"), self.receiver.fragments)
+		self.assertEqual(len(self.receiver.fragments), PRIORITY_BULK + 1)
+		
+		self.assertEqual(self.receive(lost[-1]), [])
+		for frames in started:
+			self.receive(*frames[1:])
+		self.assertEqual(self.receive(), [2500] * len(started))
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_restart(self):
+		# A repeated first fragment starts its message afresh
+		frames = self.frames(2500, 1)
+		self.assertEqual(self.receive(frames[0], frames[1], *frames), [2500])
+	
+	def test_interleaved(self):
+		first, second = self.frames(3500, 1), self.frames(2500, 2)
+		frames = [frame for pair in zip(first, second) for frame in pair]
+		frames.append(first[-1])
+		self.assertEqual(self.receive(*frames), [2500, 3500])
+		self.assertEqual(self.receiver.fragments, {})
+	
+	def test_sameIDOtherRoute(self):
+		self.receiver.routeEndpoints[b"\x06"] = Endpoint()
+		first, second = self.frames(2500, 1), self.frames(1500, 1, b"\x06")
+		frames = [frame for pair in zip(first, second) for frame in pair]
+		frames.append(first[-1])
+		self.assertEqual(self.receive(*frames), [2500])
+		self.assertEqual(len(self.receiver.routeEndpoints[b"\x06"].received), 1)
+	
+	def test_reassemblyCap(self):
+		self.receiver.maxReassembly = 4000
+		first, second = self.frames(2500, 1), self.frames(2500, 2)
+		frames = [frame for pair in zip(first, second) for frame in pair]
+		self.assertEqual(self.receive(*frames), [2500])
+		self.assertEqual(self.receiver.fragments, {})
+		self.assertEqual(self.receive(*second), [2500, 2500])
+	
+	def test_unregisterRoute(self):
+		route = Endpoint()
+		route.token = b"\x05"
+		self.receive(*self.frames(2500, 1)[:-1])
+		self.receiver.unregisterRoute(route)
+		self.assertEqual(self.receiver.fragments, {})
+		self.assertEqual(self.receiver.reassemblyBytes, 0)
+
+
+class StreamClosedTest(unittest.TestCase):
+	def setUp(self):
+		self.incoming, self.outgoing = Pipe(), Pipe()
+		self.transport = PacketTransport(self.incoming.read,
+		                                 self.outgoing.write)
+		self.transport.engageTransport(b"\x01")
+		self.transport.highWater = 0
+	
+	def commit(self, size = 100):
+		outStream = self.transport.openBuffer(b"\x01")
+		outStream.write(b"x" * size)
+		return outStream.commit()
+	
+	def assertSendingFailed(self, held):
+		transport = self.transport
+		for room in held:
+			with self.assertRaises(StreamClosed):
+				await(room)
+		self.assertTrue(transport.sendingFailed)
+		self.assertEqual([len(queue) for queue in transport.sendQueues],
+		                 [0] * len(transport.sendQueues))
+		self.assertEqual(transport.queuedBytes, 0)
+		self.assertEqual(transport.routeBytes, {})
+		self.assertEqual(transport.heldWriters, [])
+		self.assertIsNone(transport.creditWaiter)
+		self.assertIsNone(transport.writer)
+		
+		# Nothing more is queued, or held back
+		self.assertIsNone(self.commit())
+		self.assertEqual(transport.queuedBytes, 0)
+	
+	def test_lostWaitingForCredit(self):
+		self.transport.sendCredit = 0
+		held = [self.commit(), self.commit()]
+		await(sleep(.01))
+		self.assertIsNotNone(self.transport.creditWaiter)
+		self.assertEqual(len(self.transport.heldWriters), 2)
+		self.incoming.close()
+		await(sleep(.01))
+		self.assertSendingFailed(held)
+	
+	def test_writeFails(self):
+		self.outgoing.close()
+		held = [self.commit(), self.commit()]
+		await(sleep(.01))
+		self.assertSendingFailed(held)
+	
+	def test_creditGrantFails(self):
+		self.outgoing.close()
+		self.transport.grantCredit(100)
+		await(sleep(.01))
+		self.assertTrue(self.transport.sendingFailed)
+
+
+if __name__ == "__main__":
+	unittest.main()
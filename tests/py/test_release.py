@@ -0,0 +1,118 @@
+""" Module: test_release
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests that an object passed by reference is released by its
+    owner once the proxy for it is collected, including when the proxy has
+    been passed back to the owner in the meantime.
+
+    Usage: python -m unittest test_release
+"""
+
+# System imports
+import gc
+import unittest
+
+# Local imports
+from ripley import *
+from ripley.backend import *
+from ripley.bus import FullBus
+from ripley.interface import *
+from ripley.serialize import *
+from ripley.service import *
+from test_iface import Test
+
+
+class makeProxy(EvaluationProxy):
+	@staticmethod
+	def serializeArguments(cxn, args, outStream):
+		pass
+	@staticmethod
+	def deserializeReturn(cxn, inStream):
+		ret0 = cxn.deserializeObject(inStream, Test)
+		return ret0
+
+
+class giveProxy(EvaluationProxy):
+	@staticmethod
+	def serializeArguments(cxn, args, outStream):
+		cxn.serializeObject(args[0], outStream)
+	@staticmethod
+	def deserializeReturn(cxn, inStream):
+		ret0 = UInt8.deserialize(inStream)
+		return ret0
+
+
+class makeExposed(ExposedCall):
+	transverseID = b"::make"
+	def __call__(self, cxn, inStream, outStream):
+		return self.complete(self.call(), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
+		cxn.serializeObject(ret0, outStream)
+
+
+class giveExposed(ExposedCall):
+	transverseID = b"::give"
+	def __call__(self, cxn, inStream, outStream):
+		arg0 = cxn.deserializeObject(inStream, Test)
+		return self.complete(self.call(arg0), cxn, outStream)
+	def serializeReturn(self, cxn, ret, outStream):
+		ret0 = ret
+		UInt8.serialize(ret0, outStream)
+
+
+class KeeperService(Service):
+	transverseID = b"@5a1e0c3d"
+	make = makeProxy(b"::make")
+	give = giveProxy(b"::give")
+	@classmethod
+	def getExposed(cls):
+		return {
+			"make" : makeExposed,
+			"give" : giveExposed
+		}
+
+
+class ReleaseTest(unittest.TestCase):
+	def setUp(self):
+		self.made = []
+		def make():
+			self.made.append(Test())
+			return self.made[-1]
+		def give(obj):
+			return obj in self.made
+		self.bus = FullBus()
+		self.server = self.bus.bootstrapOnLocalMaster(BusMaster(self.bus))
+		KeeperService.implementation(make = make, give = give
+		                             ).offerOn(self.server)
+		self.client = self.bus.connection()
+		self.service = KeeperService.on(self.client)
+	
+	def make(self):
+		proxy = self.service.make()
+		objectID, = self.server.objectRefCounts
+		return proxy, objectID
+	
+	def assertReleased(self, objectID):
+		gc.collect()
+		await(sleep(.05))
+		self.assertEqual(self.server.objectRefCounts, {})
+		self.assertNotIn(objectID, self.server.exportedObjects)
+		self.assertEqual(self.client.heldReferences, set())
+	
+	def test_release(self):
+		proxy, objectID = self.make()
+		del proxy
+		self.assertReleased(objectID)
+	
+	def test_passedBack(self):
+		proxy, objectID = self.make()
+		self.assertEqual(self.service.give(proxy), 1)
+		self.assertEqual(self.server.objectRefCounts, {objectID: 1})
+		del proxy
+		self.assertReleased(objectID)
+
+
+if __name__ == "__main__":
+	unittest.main()
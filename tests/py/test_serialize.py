@@ -0,0 +1,163 @@
+""" Module: test_serialize
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests the round trip of values through the serialization
+    layer, and in particular the values at and beyond the boundaries of
+    their encodings.
+
+    Usage: python -m unittest test_serialize
+"""
+
+# System imports
+import io
+import struct
+import unittest
+
+# Local imports
+from ripley.serialize import *
+
+
+class SerialIDTest(unittest.TestCase):
+	def roundTrip(self, value):
+		encoded = SerialID.integerToBytes(value)
+		self.assertEqual(SerialID.bytesToInteger(encoded), value)
+		return encoded
+	
+	def test_singleByte(self):
+		for value in (0, 1, 0x7F):
+			self.assertEqual(len(self.roundTrip(value)), 1)
+	
+	def test_multiByte(self):
+		for value in (0x80, 0x81, 0xFF, 0x3FFF, 0x4000, 0x1FFFFF, 0x200000,
+		              1 << 32, (1 << 64) - 1):
+			self.roundTrip(value)
+	
+	def test_continuationLength(self):
+		self.assertEqual(len(self.roundTrip(0x80)), 2)
+		self.assertEqual(len(self.roundTrip(0x3FFF)), 2)
+		self.assertEqual(len(self.roundTrip(0x4000)), 3)
+	
+	def test_everyTwoByteValue(self):
+		for value in range(0x80, 0x4000):
+			self.roundTrip(value)
+	
+	def test_deserializeStream(self):
+		outStream = io.BytesIO()
+		values = (5, 200, 70000)
+		for value in values:
+			SerialID.serialize(SerialID.integerToBytes(value), outStream)
+		for inStream in (io.BytesIO(outStream.getvalue()),
+		                 ReadBuffer(outStream.getvalue())):
+			decoded = [SerialID.bytesToInteger(SerialID.deserialize(inStream))
+			           for _ in values]
+			self.assertEqual(decoded, list(values))
+
+
+class FixedWidthTest(unittest.TestCase):
+	limits = [(Int8, -1 << 7, (1 << 7) - 1),
+	          (Int16, -1 << 15, (1 << 15) - 1),
+	          (Int32, -1 << 31, (1 << 31) - 1),
+	          (Int64, -1 << 63, (1 << 63) - 1),
+	          (UInt8, 0, (1 << 8) - 1),
+	          (UInt16, 0, (1 << 16) - 1),
+	          (UInt32, 0, (1 << 32) - 1),
+	          (UInt64, 0, (1 << 64) - 1)]
+	
+	def roundTrip(self, typ, value):
+		outStream = io.BytesIO()
+		typ.serialize(value, outStream)
+		data = outStream.getvalue()
+		self.assertEqual(len(data), typ.packer.size)
+		self.assertEqual(typ.deserialize(ReadBuffer(data)), value)
+		self.assertEqual(typ.deserialize(io.BytesIO(data)), value)
+	
+	def test_limits(self):
+		for typ, low, high in self.limits:
+			for value in (low, high, 0, 1):
+				self.roundTrip(typ, value)
+	
+	def test_outOfRange(self):
+		for typ, low, high in self.limits:
+			for value in (low - 1, high + 1):
+				with self.assertRaises(struct.error):
+					typ.serialize(value, io.BytesIO())
+	
+	def test_truncated(self):
+		outStream = io.BytesIO()
+		UInt32.serialize(0xDEADBEEF, outStream)
+		data = outStream.getvalue()
+		with self.assertRaises(DecodingError):
+			UInt32.deserialize(ReadBuffer(data, 0, 3))
+		with self.assertRaises(DecodingError):
+			UInt32.deserialize(ReadBuffer(data, 1))
+
+
+class PackedRunTest(unittest.TestCase):
+	types = (Int8, UInt16, Int32, UInt64)
+	values = (-128, 0xFFFF, -1 << 31, (1 << 64) - 1)
+	
+	def setUp(self):
+		self.run = PackedRun(*self.types)
+		outStream = io.BytesIO()
+		self.run.serialize(self.values, outStream)
+		self.data = outStream.getvalue()
+	
+	def test_roundTrip(self):
+		self.assertEqual(len(self.data), sum(typ.packer.size
+		                                     for typ in self.types))
+		self.assertEqual(self.run.deserialize(ReadBuffer(self.data)),
+		                 self.values)
+		self.assertEqual(self.run.deserialize(io.BytesIO(self.data)),
+		                 self.values)
+	
+	def test_atEnd(self):
+		# A run ending exactly at the end of a bounded buffer is read whole,
+		# and the run after it in the same frame is not touched
+		frame = self.data + self.data
+		inStream = ReadBuffer(frame, 0, len(self.data))
+		self.assertEqual(self.run.deserialize(inStream), self.values)
+		self.assertEqual(inStream.tell(), len(self.data))
+		with self.assertRaises(DecodingError):
+			self.run.deserialize(inStream)
+		self.assertEqual(inStream.tell(), len(self.data))
+	
+	def test_pastEnd(self):
+		inStream = ReadBuffer(self.data + self.data, 0, len(self.data) - 1)
+		with self.assertRaises(DecodingError):
+			self.run.deserialize(inStream)
+	
+	def test_afterField(self):
+		outStream = io.BytesIO()
+		SerialID.serialize(SerialID.integerToBytes(300), outStream)
+		self.run.serialize(self.values, outStream)
+		inStream = ReadBuffer(outStream.getvalue())
+		self.assertEqual(SerialID.bytesToInteger(SerialID.deserialize(inStream)),
+		                 300)
+		self.assertEqual(self.run.deserialize(inStream), self.values)
+
+
+class ReadBufferTest(unittest.TestCase):
+	def test_serialWithinBound(self):
+		# The continuation byte at the bound belongs to the next message
+		data = SerialID.integerToBytes(1 << 20)
+		inStream = ReadBuffer(data + data, 0, len(data) - 1)
+		with self.assertRaises(DecodingError):
+			SerialID.deserialize(inStream)
+		inStream = ReadBuffer(data + data, len(data))
+		self.assertEqual(SerialID.deserialize(inStream), data)
+		with self.assertRaises(DecodingError):
+			SerialID.deserialize(inStream)
+	
+	def test_split(self):
+		data = b"abcdef"
+		inStream = ReadBuffer(data)
+		part = inStream.split(4)
+		self.assertEqual(inStream.read(), b"ef")
+		self.assertEqual(part.read(2), b"ab")
+		self.assertEqual(part.read(), b"cd")
+		self.assertEqual(part.read(), b"")
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,54 @@
+""" Module: test_shm
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests that a SharedMemoryTransport releases its doorbell and
+    its poll, and fails its blocked writers, when it is closed, whatever
+    has become of its sending beforehand.
+
+    Usage: RIPLEY_BACKEND=asyncio python -m unittest test_shm
+"""
+
+# System imports
+import socket
+import unittest
+
+# Local imports
+from ripley.backend import *
+from ripley.transport import *
+
+
+@unittest.skipUnless(backendName == "asyncio", "needs the asyncio backend")
+class CloseTest(unittest.TestCase):
+	def setUp(self):
+		toA, toB = RingBuffer.anonymous(1 << 12), RingBuffer.anonymous(1 << 12)
+		doorbellA, doorbellB = socket.socketpair()
+		self.a = SharedMemoryTransport(toA, toB, doorbellA)
+		self.b = SharedMemoryTransport(toB, toA, doorbellB)
+		
+		# Fill the ring to b, so that the next write blocks
+		while self.a.writeRing.write(b"x" * 1000):
+			pass
+		self.blocked = async(self.a.sendFrame(b"x" * 1000))
+		await(sleep(.01))
+		self.assertEqual(len(self.a.blockedWriters), 1)
+	
+	def tearDown(self):
+		self.a.close()
+		self.b.close()
+	
+	def assertClosed(self, transport):
+		self.assertEqual(transport.doorbell.fileno(), -1)
+		self.assertIsNone(transport.poll.handle)
+		self.assertEqual(len(transport.blockedWriters), 0)
+		with self.assertRaises(StreamClosed):
+			await(self.blocked)
+	
+	def test_closeAfterFailedSend(self):
+		self.a.failSending(StreamClosed())
+		self.a.close()
+		self.assertClosed(self.a)
+	
+	def test_transportClosed(self):
+		self.a.transportClosed()
+		self.assertClosed(self.a)
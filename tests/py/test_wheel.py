@@ -0,0 +1,95 @@
+""" Module: test_wheel
+    Authors: 2015 - Trevor Hinkley (trevor@hinkley.email)
+    License: MIT
+
+    This file tests that the timer wheel expires every key on the tick of
+    its deadline, whichever level it was first placed on.
+
+    Usage: python -m unittest test_wheel
+"""
+
+# System imports
+import random
+import unittest
+
+# Local imports
+from ripley.bus.wheel import TimerWheel
+
+
+class TimerWheelTest(unittest.TestCase):
+	def expiries(self, wheel, ticks):
+		found = {}
+		for _ in range(ticks):
+			for key in wheel.tick():
+				self.assertNotIn(key, found)
+				found[key] = wheel.now
+		return found
+	
+	def test_everyDelay(self):
+		# A small wheel, so that every delay and starting phase is covered
+		wheel = TimerWheel(1, slotBits = 2, levels = 3)
+		for start in range(wheel.maxTicks + 1):
+			for delay in range(1, wheel.maxTicks + 1):
+				wheel.schedule((start, delay), delay)
+			found = self.expiries(wheel, wheel.maxTicks)
+			self.assertEqual(len(wheel), 0)
+			for (_, delay), expiry in found.items():
+				self.assertEqual(expiry, wheel.now - wheel.maxTicks + delay)
+			self.assertEqual(len(found), wheel.maxTicks)
+			wheel.tick()
+	
+	def test_cascade(self):
+		wheel = TimerWheel(1, slotBits = 2, levels = 3)
+		wheel.schedule("key", 37)
+		self.assertIs(wheel.locations["key"], wheel.levels[2][37 >> 4])
+		self.expiries(wheel, 32)
+		self.assertIs(wheel.locations["key"], wheel.levels[1][(37 >> 2) & 3])
+		self.expiries(wheel, 4)
+		self.assertIs(wheel.locations["key"], wheel.levels[0][37 & 3])
+		self.assertEqual(self.expiries(wheel, 1), {"key": 37})
+	
+	def test_expiryOrder(self):
+		wheel = TimerWheel(1)
+		rng = random.Random(1)
+		delays = {key: rng.randrange(1, 50000) for key in range(2000)}
+		for key, delay in delays.items():
+			wheel.schedule(key, delay)
+		found = self.expiries(wheel, 50000)
+		self.assertEqual(found, delays)
+		order = sorted(found, key = found.get)
+		self.assertEqual([found[key] for key in order],
+		                 sorted(delays.values()))
+	
+	def test_rounding(self):
+		wheel = TimerWheel(.5)
+		wheel.schedule("zero", 0)
+		wheel.schedule("part", .7)
+		wheel.schedule("whole", 1)
+		self.assertEqual(self.expiries(wheel, 3),
+		                 {"zero": 1, "part": 2, "whole": 2})
+	
+	def test_clamped(self):
+		wheel = TimerWheel(1, slotBits = 2, levels = 2)
+		wheel.schedule("far", 1000)
+		self.assertEqual(self.expiries(wheel, 20), {"far": wheel.maxTicks})
+	
+	def test_cancel(self):
+		wheel = TimerWheel(1, slotBits = 2, levels = 3)
+		wheel.schedule("kept", 40)
+		wheel.schedule("dropped", 40)
+		self.expiries(wheel, 20)
+		wheel.cancel("dropped")
+		wheel.cancel("unknown")
+		self.assertEqual(len(wheel), 1)
+		self.assertEqual(self.expiries(wheel, 30), {"kept": 40})
+	
+	def test_reschedule(self):
+		wheel = TimerWheel(1)
+		wheel.schedule("key", 100)
+		wheel.cancel("key")
+		wheel.schedule("key", 5)
+		self.assertEqual(self.expiries(wheel, 200), {"key": 5})
+
+
+if __name__ == "__main__":
+	unittest.main()